@@ -15,8 +15,10 @@ import streamlit as st
 import sys
 import os
 import traceback
-import shutil
 from src.interview_prep.utils.interview_manager import InterviewManager
+from src.interview_prep.utils.schemas import feedback_markdown
+from src.interview_prep.utils.storage import get_store
+from src.interview_prep.utils.sessions import clear_session_dir, get_session_dir, start_session_gc
 
 # Gestione delle sessioni - aggiungi questo dopo gli import
 import uuid
@@ -27,6 +29,9 @@ if 'session_id' not in st.session_state:
     # time dovrebbe essere già importato
     st.session_state.session_start_time = time.time()
 
+# Rimuove in background i dati delle sessioni scadute (un solo thread per processo)
+start_session_gc(store=get_store())
+
 # IMPORTANTE: set_page_config MUST be the first Streamlit instruction
 st.set_page_config(
     page_title="Assistente AI per la Preparazione ai Colloqui",
@@ -67,44 +72,26 @@ def sanitize_input(text):
 
 def get_session_path():
     """Ottiene il percorso della directory specifica per questa sessione."""
-    base_dir = "output"
-    # Se non stiamo più usando gli ID di sessione, restituisci direttamente la directory di base
-    # session_dir = os.path.join(base_dir, st.session_state.session_id)
-    session_dir = base_dir  # Semplificato
-
-    # Crea la directory se non esiste
-    os.makedirs(session_dir, exist_ok=True)
-    os.makedirs(os.path.join(session_dir, "feedback"), exist_ok=True)
-
-    return session_dir
+    # Ogni sessione ha la sua directory in output/sessions/<session_id>
+    return get_session_dir(st.session_state.session_id,
+                           st.session_state.session_start_time)
 
 
 def clear_all_data():
     """
-    Cancella completamente tutti i dati generati nella directory di output.
-    Garantisce che nessun dato rimanga accessibile ad altri utenti.
+    Cancella tutti i dati generati da questa sessione.
+    Le directory delle altre sessioni non vengono toccate.
     """
     # Ottieni il percorso della directory di output
     output_dir = get_session_path()
 
     try:
-        # 1. Cancella tutti i file nella directory principale
-        for filename in os.listdir(output_dir):
-            file_path = os.path.join(output_dir, filename)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-                print(f"Rimosso file: {file_path}")
-            elif os.path.isdir(file_path) and filename != ".session":
-                # Rimuovi le sottodirectory, ma preserva .session
-                shutil.rmtree(file_path)
-                print(f"Rimossa directory: {file_path}")
-
-        # 2. Ricrea le directory necessarie
-        os.makedirs(os.path.join(output_dir, "feedback"), exist_ok=True)
-
-        # 3. Opzionale: scrivi un file vuoto o di placeholder
-        with open(os.path.join(output_dir, ".clean"), "w") as f:
-            f.write(f"Directory cleaned on {time.ctime()}")
+        # 1. Cancella file e sottodirectory della sessione
+        clear_session_dir(output_dir)
+        print(f"Rimossi i dati della sessione: {output_dir}")
+
+        # 2. Cancella i dati della sessione dal database
+        get_store().delete_session(st.session_state.session_id)
 
         return True, "Tutti i dati sono stati cancellati con successo."
 
@@ -199,12 +186,20 @@ if os.path.exists(src_path) and src_path not in sys.path:
 
 # Ora facciamo gli import DOPO set_page_config e setup path
 try:
-    from src.interview_prep.crew import InterviewPrepCrew
+    from src.interview_prep.practice import FeedbackPrefetcher, grade_answers, save_graded_answers
+    from src.interview_prep.utils.crew_events import stream_kickoff
+    from src.interview_prep.utils.resilience import CircuitOpenError
+    from src.interview_prep.jobs import (
+        get_job_runner, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_INTERRUPTED)
     # st.success("Import riuscito con percorso src.interview_prep")
 except ImportError as e:
     try:
         # Try direct import if package is installed
-        from interview_prep.crew import InterviewPrepCrew
+        from interview_prep.practice import FeedbackPrefetcher, grade_answers, save_graded_answers
+        from interview_prep.utils.crew_events import stream_kickoff
+        from interview_prep.utils.resilience import CircuitOpenError
+        from interview_prep.jobs import (
+            get_job_runner, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_INTERRUPTED)
         st.success("Import riuscito con percorso interview_prep")
     except ImportError as e:
         st.error(f"Errore di importazione: {e}")
@@ -238,7 +233,10 @@ if 'current_question' not in st.session_state:
 # Inizializza l'InterviewManager nella sessione
 if 'interview_manager' not in st.session_state:
     st.session_state.interview_manager = InterviewManager(
-        output_dir=get_session_path())
+        output_dir=get_session_path(), store=get_store(),
+        session_id=st.session_state.session_id)
+if 'feedback_prefetcher' not in st.session_state:
+    st.session_state.feedback_prefetcher = FeedbackPrefetcher()
 
 
 def load_questions(job_position):
@@ -303,125 +301,250 @@ def save_feedback(question_num, question, answer, feedback):
     return file_path
 
 
-def run_research(company, interviewer, job_position, industry, country, job_description):
-    """Run the research and question generation phase."""
+def render_crew_stream(events, label):
+    """Show streamed crew output on the page and return the final result."""
+    status = st.status(label, expanded=True)
+    live = {}
+    buffers = {}
+    last_render = 0.0
+
+    for event in events:
+        name = event.task_name or "crew"
+        if event.kind == 'task_started':
+            live[name] = status.empty()
+            buffers[name] = ""
+        elif event.kind == 'chunk':
+            buffers[name] = buffers.get(name, "") + event.data['chunk']
+            if name not in live:
+                live[name] = status.empty()
+            # Limita i refresh della pagina: un aggiornamento ogni 100ms basta
+            if time.time() - last_render > 0.1:
+                live[name].markdown(f"**{name}**\n\n{buffers[name][-2000:]}")
+                last_render = time.time()
+        elif event.kind == 'task_completed':
+            if name in live:
+                live[name].empty()
+            output = event.data.get('output')
+            length = len(output.raw) if output is not None else 0
+            status.markdown(f"✅ **{name}** completato ({length} caratteri)")
+        elif event.kind == 'error':
+            status.update(label=label, state="error")
+            raise event.data['error']
+        elif event.kind == 'done':
+            status.update(label=label, state="complete", expanded=False)
+            metrics = event.data.get('metrics')
+            if metrics is not None:
+                st.caption(f"{metrics.wall_s:.1f}s, "
+                           f"{sum(task.llm_calls for task in metrics.tasks)} chiamate LLM, "
+                           f"costo stimato ${metrics.cost_usd:.4f}")
+            return event.data['result']
+
+
+def run_research(company, interviewer, job_position, industry, country, job_description, force_refresh=False):
+    """Start the research and question generation phase as a background job."""
     output_dir = get_session_path()
     os.makedirs(output_dir, exist_ok=True)
 
-    # Usa l'InterviewManager
+    inputs = {
+        'company': company,
+        'interviewer': interviewer,
+        'job_position': job_position,
+        'industry': industry,
+        'country': country,
+        'job_description': job_description
+    }
+
+    # Il job continua anche se lo script viene rieseguito o la tab chiusa:
+    # in sessione (e nell'URL, per riprenderlo) teniamo solo l'id
+    job_id = get_job_runner().submit_research(
+        inputs, output_dir, force_refresh=force_refresh,
+        session_id=st.session_state.session_id)
+    st.session_state.research_job_id = job_id
+    st.query_params["job"] = job_id
+    return job_id
+
+
+def show_run_metrics(metrics):
+    """Show the per-task timing, token and cost summary of a crew run."""
+    if not metrics:
+        return
+    with st.expander(f"Metriche dell'esecuzione ({metrics['wall_s']:.1f}s, "
+                     f"~${metrics['cost_usd']:.4f})"):
+        st.table([{
+            "Task": task['task_name'],
+            "Agente": task['agent'],
+            "Stato": task['status'],
+            "Attesa (s)": round(task['queued_s'], 2),
+            "Durata (s)": round(task['wall_s'], 2),
+            "Chiamate LLM": task['llm_calls'],
+            "Token (prompt/output)": f"{task['prompt_tokens']}/{task['completion_tokens']}",
+            "Strumenti": task['tool_calls'],
+            "Tempo strumenti (s)": round(task['tool_s'], 2),
+            "Costo stimato ($)": round(task['cost_usd'], 4),
+        } for task in metrics['tasks']])
+        usage = metrics.get('usage') or {}
+        if usage.get('total_tokens'):
+            st.caption(f"Token riportati dal provider: {usage['total_tokens']} "
+                       f"({usage['successful_requests']} richieste)")
+
+
+def finish_research(job):
+    """Load the questions produced by a completed research job."""
     manager = st.session_state.interview_manager
-    # Aggiorna la directory di output
+    # Il job può essere stato avviato da un'altra sessione: usa i file salvati per questa
+    saved = job['result'].get('sessions', {}).get(st.session_state.session_id, {
+        'output_dir': job['params']['output_dir'],
+        'job_position': job['params']['inputs']['job_position'],
+        'files': job['result']['files']})
+    output_dir = saved['output_dir']
     manager.output_dir = output_dir
-
-    try:
-        # Crea una nuova istanza per la ricerca
-        crew_instance = InterviewPrepCrew()
-        crew = crew_instance.research_crew()
-
-        inputs = {
-            'company': company,
-            'interviewer': interviewer,
-            'job_position': job_position,
-            'industry': industry,
-            'country': country,
-            'job_description': job_description
-        }
-
-        with st.spinner("Ricerca e generazione di domande in corso... Questo potrebbe richiedere diversi minuti."):
-            result = crew.kickoff(inputs=inputs)
-
-        # Debug info
-        st.write(f"Task completate: {len(result.tasks_output)}")
-
-        for i, task_output in enumerate(result.tasks_output):
+    job_position = saved['job_position']
+    outputs = job['result']['outputs']
+
+    st.write(f"Task completate: {len(outputs)}")
+    show_run_metrics(job['result'].get('metrics'))
+
+    # Elimina l'altro file se esiste per evitare duplicati
+    questions_file = saved['files'].get('questions')
+    default_questions_file = os.path.join(
+        output_dir, "interview_questions.md")
+    if os.path.exists(default_questions_file) and default_questions_file != questions_file:
+        try:
+            os.remove(default_questions_file)
             st.write(
-                f"Task {i}: {task_output.task_name if hasattr(task_output, 'task_name') else 'Unknown'}")
-            st.write(f"Output length: {len(task_output.raw)}")
-
-            if i == 0:  # Company research
-                company_file = manager.save_company_report(
-                    task_output.raw, company)
-            elif i == 1:  # Interviewer research
-                interviewer_file = manager.save_interviewer_report(
-                    task_output.raw, interviewer)
-            elif i == 2:  # Questions
-                questions_file = manager.save_questions(
-                    task_output.raw, job_position)
-
-                # Elimina l'altro file se esiste per evitare duplicati
-                default_questions_file = os.path.join(
-                    output_dir, "interview_questions.md")
-                if os.path.exists(default_questions_file) and default_questions_file != questions_file:
-                    try:
-                        os.remove(default_questions_file)
-                        st.write(
-                            f"Rimosso file duplicato: {default_questions_file}")
-                    except Exception as e:
-                        st.write(
-                            f"Impossibile rimuovere il file duplicato: {e}")
-            else:
-                continue
+                f"Rimosso file duplicato: {default_questions_file}")
+        except Exception as e:
+            st.write(
+                f"Impossibile rimuovere il file duplicato: {e}")
 
-        # Carica le domande
-        st.write("Caricamento domande...")
-        manager.load_questions(job_position)
-        st.session_state.questions = manager.questions
-        st.session_state.asked_questions = set()
-        st.session_state.question_number = 1
+    # Carica le domande
+    st.write("Caricamento domande...")
+    manager.load_questions(job_position)
+    st.session_state.questions = manager.questions
+    st.session_state.asked_questions = set()
+    st.session_state.question_number = 1
 
-        return len(st.session_state.questions)
+    return len(st.session_state.questions)
+
+
+def handle_research_error(job):
+    """Show the error of a failed research job."""
+    error_message = job.get('error') or ""
+
+    # Controlla se è un errore di autenticazione
+    if "AuthenticationError" in error_message or "Incorrect API key" in error_message:
+        st.error(
+            "⚠️ Errore di autenticazione API: La chiave API di OpenAI non è valida o è scaduta.")
+        st.warning(
+            "Per favore, controlla la tua chiave API di OpenAI e assicurati che sia corretta e attiva.")
+        # Rimuovi la chiave dalla sessione così l'utente può inserirla di nuovo
+        if 'OPENAI_API_KEY' in st.session_state:
+            del st.session_state['OPENAI_API_KEY']
+        os.environ.pop('OPENAI_API_KEY', None)
+    elif error_message.startswith("CircuitOpenError"):
+        # Il provider continua a fallire: i report già completati sono nella cache
+        st.warning(
+            "Il servizio del modello AI non è al momento disponibile. Riprova tra qualche minuto: "
+            "le ricerche già completate non verranno ripetute.")
+    elif job['status'] == JOB_INTERRUPTED:
+        st.error(
+            "La ricerca è stata interrotta (riavvio del server). Per favore avviala di nuovo.")
+    else:
+        st.error(
+            f"Si è verificato un errore durante la ricerca: {error_message}")
+        with st.expander("Dettagli errore"):
+            st.code(job.get('traceback', ''))
+
+
+@st.fragment(run_every=2)
+def show_research_job(job_id):
+    """Poll a research job and show its per-task progress."""
+    job = get_job_runner().get(job_id)
+    if job is None:
+        st.warning(f"Job di ricerca {job_id} non trovato.")
+        st.session_state.pop('research_job_id', None)
+        st.query_params.clear()
+        return
+
+    if job['status'] in (JOB_QUEUED, JOB_RUNNING):
+        st.info("Ricerca e generazione di domande in corso... Questo potrebbe richiedere diversi minuti. "
+                "Puoi cambiare pagina o ricaricarla: il lavoro continua in background.")
+        icons = {"pending": "⏳", "running": "🔄",
+                 "completed": "✅", "cached": "⚡", "failed": "❌"}
+        for task_name, task_status in job['progress'].items():
+            st.write(f"{icons.get(task_status, '•')} **{task_name}**: {task_status}")
+            partial = job['partial'].get(task_name)
+            if partial:
+                st.caption(partial[-500:])
+        return
+
+    # Job concluso: smetti di seguirlo e aggiorna l'intera pagina
+    st.session_state.pop('research_job_id', None)
+    st.query_params.clear()
+    if job['status'] == JOB_COMPLETED:
+        num_questions = finish_research(job)
+        st.session_state.research_message = num_questions
+    else:
+        handle_research_error(job)
+        if "AuthenticationError" in (job.get('error') or ""):
+            st.rerun()
+        return
+    st.rerun()
 
-    except Exception as e:
-        error_message = str(e)
-        error_traceback = traceback.format_exc()
 
-        # Controlla se è un errore di autenticazione
-        if "AuthenticationError" in error_message or "Incorrect API key" in error_message:
-            st.error(
-                "⚠️ Errore di autenticazione API: La chiave API di OpenAI non è valida o è scaduta.")
-            st.warning(
-                "Per favore, controlla la tua chiave API di OpenAI e assicurati che sia corretta e attiva.")
-            # Rimuovi la chiave dalla sessione così l'utente può inserirla di nuovo
-            if 'OPENAI_API_KEY' in st.session_state:
-                del st.session_state['OPENAI_API_KEY']
-            os.environ.pop('OPENAI_API_KEY', None)
-            st.rerun()
-        else:
-            st.error(
-                f"Si è verificato un errore durante la ricerca: {error_message}")
-            with st.expander("Dettagli errore"):
-                st.code(error_traceback)
+def feedback_base_inputs(company, interviewer, job_position, industry):
+    """Inputs of the feedback crew that don't depend on the question."""
+    return {
+        'company': sanitize_input(company),
+        'interviewer': sanitize_input(interviewer),
+        'job_position': sanitize_input(job_position),
+        'industry': sanitize_input(industry)
+    }
+
 
-        return 0
+def prefetch_feedback(company, interviewer, job_position, industry, question):
+    """Prepare the feedback crew for ``question`` while the user answers."""
+    if question and st.session_state.get('prefetched_question') != question:
+        st.session_state.feedback_prefetcher.prefetch(
+            question, feedback_base_inputs(company, interviewer, job_position, industry))
+        st.session_state.prefetched_question = question
 
 
-def get_feedback(company, interviewer, job_position, industry, question, answer):
+def get_feedback(company, interviewer, job_position, industry, question, answer, next_question=None):
     """Get AI feedback on the answer."""
     try:
-        # Crea una nuova istanza per generare il feedback
-        crew_instance = InterviewPrepCrew()
-        # Debug
-        st.write(f"Agenti disponibili: {len(crew_instance.agents)}")
-
-        crew = crew_instance.feedback_crew()
-
-        inputs = {
-            'company': sanitize_input(company),
-            'interviewer': sanitize_input(interviewer),
-            'job_position': sanitize_input(job_position),
-            'industry': sanitize_input(industry),
-            'job_position_report': question,
-            'user_answer': answer
-        }
-
-        with st.spinner("Generating feedback..."):
-            result = crew.kickoff(inputs=inputs)
-
-        # Salva e restituisci il feedback
-        save_feedback(st.session_state.question_number,
-                      question, answer, result.raw)
-        return result.raw
-
+        base_inputs = feedback_base_inputs(
+            company, interviewer, job_position, industry)
+        prefetcher = st.session_state.feedback_prefetcher
+
+        # Crew e input preparati in anticipo mentre l'utente scriveva la risposta
+        turn = prefetcher.take(question, base_inputs)
+        crew = turn.crew
+        inputs = turn.feedback_inputs(answer)
+
+        # Mentre il feedback viene generato, prepara già il turno successivo
+        if next_question:
+            prefetcher.prefetch(next_question, base_inputs)
+        st.session_state.prefetched_question = next_question
+
+        # Il salvataggio avviene nel thread della crew tramite l'InterviewManager,
+        # quindi niente accessi a st.session_state nella callback
+        manager = st.session_state.interview_manager
+        manager.output_dir = get_session_path()
+        question_num = st.session_state.question_number
+
+        def save_result(result):
+            manager.save_feedback(question_num, question, answer, result.raw)
+
+        result = render_crew_stream(
+            stream_kickoff(crew, inputs, on_complete=save_result,
+                           metrics_kind="feedback"),
+            "Generazione del feedback in corso...")
+        return feedback_markdown(result.raw)
+
+    except CircuitOpenError as e:
+        # Il provider non risponde: niente traceback, il messaggio viene mostrato come feedback
+        return f"Il servizio del modello AI non è al momento disponibile. Riprova tra {e.retry_in:.0f} secondi."
     except Exception as e:
         st.error(f"Error generating feedback: {e}")
         traceback_str = traceback.format_exc()
@@ -429,6 +552,93 @@ def get_feedback(company, interviewer, job_position, industry, question, answer)
         return f"Si è verificato un errore durante la generazione del feedback: {str(e)}"
 
 
+def show_feedback_summary():
+    """Show the feedback summary once, right after it has been generated."""
+    if st.session_state.get('show_summary', False):
+        st.session_state.show_summary = False  # Reset flag
+
+        # Get the summary file
+        feedback_dir = os.path.join(get_session_path(), "feedback")
+        summary_file = os.path.join(feedback_dir, "feedback_summary.md")
+
+        if os.path.exists(summary_file):
+            with open(summary_file, 'r', encoding='utf-8') as f:
+                summary_content = f.read()
+
+            st.write("## Riepilogo Completo del Feedback")
+            st.markdown(summary_content)
+
+            st.download_button(
+                label="Scarica il Riepilogo Completo",
+                data=summary_content,
+                file_name="riepilogo_feedback_colloquio.md",
+                mime="text/markdown"
+            )
+
+            # Add a button to restart practice
+            if st.button("Inizia una Nuova Sessione"):
+                st.session_state.asked_questions = set()
+                st.session_state.question_number = 1
+                st.session_state.current_question = None
+                st.session_state.feedback = ""
+                st.rerun()
+
+
+def mock_interview_page():
+    """Mock interview: answer every question first, then grade all answers at once."""
+    answers = st.session_state.setdefault('mock_answers', [])
+
+    st.write(
+        f"Risposte date: {len(answers)} su {MAX_PRACTICE_QUESTIONS}. Il feedback arriverà alla fine della simulazione.")
+
+    finished = len(answers) >= MAX_PRACTICE_QUESTIONS
+    if not finished:
+        if not st.session_state.current_question:
+            st.session_state.current_question = get_random_question()
+        question = st.session_state.current_question
+
+        if question:
+            st.markdown(
+                f"### Domanda {len(answers) + 1}:\n**{question}**")
+            with st.form("mock_answer_form"):
+                answer = st.text_area("La tua risposta", value="", height=200)
+                submit_answer = st.form_submit_button("Invia Risposta")
+
+            if submit_answer:
+                answer = sanitize_input(answer)
+                if not answer:
+                    st.error("Per favore dai una risposta prima di inviare.")
+                else:
+                    answers.append((question, answer))
+                    st.session_state.current_question = None
+                    st.rerun()
+        else:
+            st.info("Non ci sono altre domande disponibili.")
+            finished = True
+
+    if answers and (finished or st.button("Termina la simulazione e ricevi il feedback")):
+        base_inputs = feedback_base_inputs(
+            st.session_state.get('company', 'Unknown Company'),
+            st.session_state.get('interviewer', ''),
+            st.session_state.get('job_position', 'Unknown Position'),
+            st.session_state.get('industry', 'Unknown Industry'))
+
+        # Tutte le risposte vengono valutate in parallelo: il tempo totale è
+        # quello della chiamata più lenta, non la somma
+        with st.spinner(f"Generazione del feedback per {len(answers)} risposte..."):
+            graded = grade_answers(answers, base_inputs)
+            manager = st.session_state.interview_manager
+            manager.output_dir = get_session_path()
+            summary_path = save_graded_answers(manager, graded)
+
+        st.session_state.mock_answers = []
+        st.session_state.current_question = None
+        if summary_path and os.path.exists(summary_path):
+            st.session_state.show_summary = True
+
+    show_feedback_summary()
+
+
 def main():
     """Main Streamlit application."""
     st.title("Assistente AI per la Preparazione ai Colloqui")
@@ -477,7 +687,8 @@ def main():
 
             # Reinizializza l'InterviewManager
             st.session_state.interview_manager = InterviewManager(
-                output_dir=get_session_path())
+                output_dir=get_session_path(), store=get_store(),
+                session_id=st.session_state.session_id)
 
             st.sidebar.success("✅ " + message)
         else:
@@ -560,6 +771,8 @@ def main():
                 "Country", value="Italy", help="Inserisci il country in cui si trova l'azienda")
             job_description = st.text_area(
                 "Job Description", value="", height=300, help="Incolla qui la job description completa")
+            force_refresh = st.checkbox(
+                "Ignora la ricerca in cache", value=False, help="Ripeti la ricerca su azienda e intervistatore senza usare le cache (ricerche, pagine web e risposte del modello)")
             submit_research = st.form_submit_button("Genera le Domande")
 
         if submit_research:
@@ -581,29 +794,37 @@ def main():
                 st.session_state['job_position'] = job_position
                 st.session_state['industry'] = industry
 
-                # Salva anche in un file per persistere tra sessioni
-                session_dir = os.path.join("output", ".session")
-                os.makedirs(session_dir, exist_ok=True)
-                session_file = os.path.join(session_dir, "last_session.txt")
+                # Salva anche nel database, legate a questa sessione
                 try:
-                    with open(session_file, "w") as f:
-                        f.write(f"company={company}\n")
-                        f.write(f"interviewer={interviewer}\n")
-                        f.write(f"job_position={job_position}\n")
-                        f.write(f"industry={industry}\n")
+                    get_store().save_session(st.session_state.session_id, {
+                        'company': company,
+                        'interviewer': interviewer,
+                        'job_position': job_position,
+                        'industry': industry,
+                    })
                 except Exception as e:
                     st.warning(f"Could not save session info: {e}")
 
-                num_questions = run_research(
-                    company, interviewer, job_position, industry, country, job_description)
-                if num_questions > 0:
-                    st.success(
-                        f"Ricerca completata! Generate {num_questions} domande per il colloquio.")
-                    st.write(
-                        "Vai alla pagina 'Pratica' per iniziare ad esercitarti con queste domande.")
-                else:
-                    st.error(
-                        "Impossibile generare domande. Controlla i log o riprova con informazioni più dettagliate.")
+                run_research(
+                    company, interviewer, job_position, industry, country, job_description,
+                    force_refresh=force_refresh)
+
+        # Segui il job di ricerca in corso (anche dopo un refresh, tramite l'URL)
+        research_job_id = st.session_state.get(
+            'research_job_id') or st.query_params.get("job")
+        if research_job_id:
+            show_research_job(research_job_id)
+
+        if 'research_message' in st.session_state:
+            num_questions = st.session_state.pop('research_message')
+            if num_questions > 0:
+                st.success(
+                    f"Ricerca completata! Generate {num_questions} domande per il colloquio.")
+                st.write(
+                    "Vai alla pagina 'Pratica' per iniziare ad esercitarti con queste domande.")
+            else:
+                st.error(
+                    "Impossibile generare domande. Controlla i log o riprova con informazioni più dettagliate.")
 
     elif page == "Pratica":
         st.write("## Fase di Pratica")
@@ -637,6 +858,11 @@ def main():
             return
 
         st.write("### Pratica per l'intevista")
+
+        if st.toggle("Modalità simulazione: rispondi a tutte le domande e ricevi il feedback alla fine", key="mock_mode"):
+            mock_interview_page()
+            return
+
         remaining = max(0, MAX_PRACTICE_QUESTIONS -
                         (st.session_state.question_number - 1))
         st.write(f"Domande rimanenti in questa sessione: {remaining}")
@@ -664,6 +890,17 @@ def main():
         st.markdown(
             f"### Domanda {st.session_state.question_number}:\n**{st.session_state.current_question}**")
 
+        # Assicurati che i dettagli necessari per il feedback siano presenti
+        company = st.session_state.get('company', 'Unknown Company')
+        interviewer = st.session_state.get('interviewer', '')
+        job_position = st.session_state.get(
+            'job_position', 'Unknown Position')
+        industry = st.session_state.get('industry', 'Unknown Industry')
+
+        # Prepara la crew di feedback mentre l'utente scrive la risposta
+        prefetch_feedback(company, interviewer, job_position,
+                          industry, st.session_state.current_question)
+
         with st.form("answer_form"):
             answer = st.text_area("La tua risposta", value="", height=200)
             submit_answer = st.form_submit_button("Invia Risposta")
@@ -675,28 +912,28 @@ def main():
             if not answer:
                 st.error("Per favore dai una risposta prima di inviare.")
             else:
-                # Assicurati che i dettagli necessari per il feedback siano presenti
-                company = st.session_state.get('company', 'Unknown Company')
-                interviewer = st.session_state.get('interviewer', '')
-                job_position = st.session_state.get(
-                    'job_position', 'Unknown Position')
-                industry = st.session_state.get('industry', 'Unknown Industry')
-
                 if company == 'Unknown Company' or job_position == 'Unknown Position':
                     st.warning(
                         "Some job details are missing (Company/Job Position). Feedback might be less specific. Please ensure you ran the Research phase or loaded questions correctly.")
 
+                # Scegli già la prossima domanda: il suo turno viene preparato
+                # in background mentre arriva il feedback
+                next_question = None
+                if st.session_state.question_number < MAX_PRACTICE_QUESTIONS:
+                    next_question = get_random_question()
+
                 feedback = get_feedback(
                     company,
                     interviewer,
                     job_position,
                     industry,
                     st.session_state.current_question,
-                    answer
+                    answer,
+                    next_question=next_question
                 )
                 st.session_state.feedback = feedback
                 st.session_state.question_number += 1
-                st.session_state.current_question = None
+                st.session_state.current_question = next_question
                 st.rerun()
 
         if st.session_state.feedback:
@@ -739,8 +976,9 @@ def main():
 
             with col2:
                 if st.button(next_button_label, key="next_question"):
+                    # current_question è già la domanda scelta (e preparata) all'invio
+                    # della risposta: si azzera solo il feedback
                     st.session_state.feedback = ""
-                    st.session_state.current_question = None
 
                     # If this was the last question, generate summary feedback
                     if st.session_state.question_number > MAX_PRACTICE_QUESTIONS:
@@ -754,35 +992,8 @@ def main():
                             st.session_state.show_summary = True
 
                     st.rerun()
-         # Check if we should show the summary
-    if st.session_state.get('show_summary', False):
-        st.session_state.show_summary = False  # Reset flag
-
-        # Get the summary file
-        feedback_dir = os.path.join(get_session_path(), "feedback")
-        summary_file = os.path.join(feedback_dir, "feedback_summary.md")
-
-        if os.path.exists(summary_file):
-            with open(summary_file, 'r', encoding='utf-8') as f:
-                summary_content = f.read()
-
-            st.write("## Riepilogo Completo del Feedback")
-            st.markdown(summary_content)
-
-            st.download_button(
-                label="Scarica il Riepilogo Completo",
-                data=summary_content,
-                file_name="riepilogo_feedback_colloquio.md",
-                mime="text/markdown"
-            )
-
-            # Add a button to restart practice
-            if st.button("Inizia una Nuova Sessione"):
-                st.session_state.asked_questions = set()
-                st.session_state.question_number = 1
-                st.session_state.current_question = None
-                st.session_state.feedback = ""
-                st.rerun()
+    # Check if we should show the summary
+    show_feedback_summary()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+import os
+
+# Il benchmark gira offline: niente telemetria e nessuna chiave reale
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+# Le iterazioni ripetono gli stessi prompt: la cache delle risposte falserebbe i tempi
+os.environ.setdefault("INTERVIEW_LLM_CACHE", "off")
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, List, Optional, Type
+from crewai import BaseLLM
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+from interview_prep.crew import kickoff_research
+from interview_prep.crew_factory import CrewFactory
+from interview_prep.utils.interview_manager import InterviewManager
+from interview_prep.utils.schemas import Feedback, InterviewQuestion, QuestionList
+
+BENCH_INPUTS = {
+    'company': "Acme Srl",
+    'interviewer': "Mario Rossi",
+    'job_position': "Backend Engineer",
+    'industry': "Software",
+    'country': "Italy",
+    'job_description': "Sviluppo di servizi backend in Python.",
+}
+
+QUESTION_CATEGORIES = [
+    "Cultura e adattamento al Team",
+    "Adattamento alla Posizione di Lavoro",
+    "Background e modalità di lavoro",
+    "Mentalità di Crescita",
+]
+
+
+def fake_questions_json(count: int = 20) -> str:
+    """Questions in the structured format produced by define_questions_task."""
+    return QuestionList(questions=[
+        InterviewQuestion(
+            text=f"Domanda di prova numero {i + 1}: come affronteresti questa situazione?",
+            category=QUESTION_CATEGORIES[(i // 5) % len(QUESTION_CATEGORIES)],
+            difficulty=("facile", "media", "difficile")[i % 3])
+        for i in range(count)]).model_dump_json()
+
+
+FAKE_FEEDBACK = Feedback(
+    strengths=["La risposta è chiara."], improvements=["Manca un esempio concreto."],
+    suggestions=["Usa il metodo STAR."], alternatives=["Parti dal risultato ottenuto."]).model_dump_json()
+
+
+class FakeLLM(BaseLLM):
+    """Deterministic offline LLM with a fixed latency per call.
+
+    Agents with tools first get a search action, then a final answer;
+    the final answer depends on the task (questions, feedback or report).
+    """
+
+    def __init__(self, latency: float = 0.05):
+        super().__init__(model="fake-benchmark-llm", temperature=0)
+        self.latency = latency
+        self.stream = False
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None) -> str:
+        time.sleep(self.latency)
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        # I risultati degli strumenti tornano come messaggi dell'assistente
+        searched = any(message.get("role") == "assistant" and "Observation:" in str(message.get("content", ""))
+                       for message in messages)
+
+        if "Search the internet" in prompt and not searched:
+            return ("Thought: Devo cercare informazioni\n"
+                    "Action: Search the internet with Serper\n"
+                    'Action Input: {"search_query": "azienda"}')
+        if "Un elenco di 20 domande" in prompt:
+            answer = fake_questions_json()
+        elif "Rivedi la risposta" in prompt:
+            answer = FAKE_FEEDBACK
+        else:
+            answer = "## Report\n\n" + "Informazioni di prova sull'azienda. " * 20
+        return f"Thought: Ho tutte le informazioni\nFinal Answer: {answer}"
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+
+class _SearchInput(BaseModel):
+    search_query: str = Field(..., description="Query di ricerca")
+
+
+class _ScrapeInput(BaseModel):
+    website_url: str = Field(..., description="URL da leggere")
+
+
+class FakeSearchTool(BaseTool):
+    """Stand-in for SerperDevTool with a fixed latency."""
+    name: str = "Search the internet with Serper"
+    description: str = "Cerca su internet (risultati finti per il benchmark)."
+    args_schema: Type[BaseModel] = _SearchInput
+    latency: float = 0.05
+
+    def _run(self, search_query: str) -> str:
+        time.sleep(self.latency)
+        return json.dumps({"organic": [
+            {"title": f"Risultato {i} per {search_query}",
+             "link": f"https://example.com/{i}",
+             "snippet": "Testo di esempio " * 10}
+            for i in range(5)]})
+
+
+class FakeScrapeTool(BaseTool):
+    """Stand-in for ScrapeWebsiteTool with a fixed latency."""
+    name: str = "Read website content"
+    description: str = "Legge il contenuto di un sito (testo finto per il benchmark)."
+    args_schema: Type[BaseModel] = _ScrapeInput
+    latency: float = 0.05
+
+    def _run(self, website_url: str) -> str:
+        time.sleep(self.latency)
+        return f"Contenuto di {website_url}. " + "Paragrafo di esempio. " * 200
+
+
+@dataclass
+class BenchResult:
+    """Timing statistics of one benchmark."""
+    name: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    throughput_per_s: float
+    peak_memory_kb: float
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name: str, func: Callable[[], Any], iterations: int,
+            setup: Optional[Callable[[], None]] = None) -> BenchResult:
+    """Run ``func`` ``iterations`` times and collect its statistics.
+
+    ``setup`` runs before each iteration, outside the timed section.
+    Peak memory is the tracemalloc peak over all iterations.
+    """
+    durations = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    total = sum(durations)
+    return BenchResult(
+        name=name,
+        iterations=iterations,
+        p50_ms=_percentile(durations, 0.50) * 1000,
+        p95_ms=_percentile(durations, 0.95) * 1000,
+        mean_ms=total / iterations * 1000,
+        throughput_per_s=iterations / total if total else float("inf"),
+        peak_memory_kb=peak / 1024,
+    )
+
+
+def run_benchmarks(iterations: int = 5, llm_latency: float = 0.05,
+                   tool_latency: float = 0.05, questions: int = 200,
+                   feedback_files: int = 50,
+                   only: Optional[List[str]] = None) -> List[BenchResult]:
+    """Run the benchmark suite in a temporary directory and return the results."""
+    results = []
+
+    def selected(name: str) -> bool:
+        return not only or name in only
+
+    factory = CrewFactory(
+        llm=FakeLLM(latency=llm_latency),
+        tools=[FakeSearchTool(latency=tool_latency), FakeScrapeTool(latency=tool_latency)])
+
+    with tempfile.TemporaryDirectory(prefix="interview-bench-") as work_dir:
+        cwd = os.getcwd()
+        os.chdir(work_dir)  # i task scrivono i loro output_file in ./output
+        try:
+            # Le crew stampano i loro passaggi: non fanno parte del report
+            with open(os.devnull, 'w') as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    if selected("research_crew"):
+                        results.append(measure(
+                            "research_crew",
+                            lambda: kickoff_research(factory.research_crew(), BENCH_INPUTS),
+                            iterations))
+                    if selected("feedback_crew"):
+                        feedback_inputs = {**BENCH_INPUTS, 'job_position_report': "Domanda?",
+                                           'user_answer': "Risposta di prova."}
+                        results.append(measure(
+                            "feedback_crew",
+                            lambda: factory.feedback_crew().kickoff(inputs=feedback_inputs),
+                            iterations))
+
+                    manager = InterviewManager(output_dir=os.path.join(work_dir, "bench"))
+                    manager.save_questions(fake_questions_json(questions), BENCH_INPUTS['job_position'])
+                    questions_file = os.path.join(
+                        manager.output_dir, manager.sanitize_filename(
+                            f"{BENCH_INPUTS['job_position']}_questions.json"))
+
+                    if selected("load_questions"):
+                        results.append(measure(
+                            "load_questions",
+                            lambda: manager.load_questions(BENCH_INPUTS['job_position']),
+                            iterations * 20))
+                    if selected("load_questions_cold"):
+                        # Il file cambia a ogni iterazione: niente cache dei risultati
+                        results.append(measure(
+                            "load_questions_cold",
+                            lambda: manager.load_questions(BENCH_INPUTS['job_position']),
+                            iterations * 20,
+                            setup=lambda: os.utime(questions_file, ns=(time.time_ns(), time.time_ns()))))
+                    if selected("get_random_question"):
+                        manager.load_questions(BENCH_INPUTS['job_position'])
+
+                        def draw_all():
+                            manager.asked_questions = set()
+                            while manager.get_random_question() is not None:
+                                pass
+                        results.append(measure("get_random_question (all)", draw_all, iterations * 4))
+
+                    for i in range(1, feedback_files + 1):
+                        manager.save_feedback(i, f"Domanda {i}?", "Risposta di prova.", FAKE_FEEDBACK)
+                    if selected("generate_feedback_summary"):
+                        counter = [feedback_files]
+
+                        def add_feedback():
+                            counter[0] += 1
+                            manager.save_feedback(counter[0], f"Domanda {counter[0]}?",
+                                                  "Risposta di prova.", "Feedback.")
+                        results.append(measure(
+                            "generate_feedback_summary", manager.generate_feedback_summary,
+                            iterations * 4, setup=add_feedback))
+                        results.append(measure(
+                            "generate_feedback_summary (unchanged)",
+                            manager.generate_feedback_summary, iterations * 4))
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+
+def format_results(results: List[BenchResult]) -> str:
+    """Render the results as a text table."""
+    header = f"{'benchmark':<40} {'iter':>5} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'peak KB':>10}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.name:<40} {result.iterations:>5} {result.p50_ms:>10.2f} "
+            f"{result.p95_ms:>10.2f} {result.throughput_per_s:>10.2f} {result.peak_memory_kb:>10.1f}")
+    return "\n".join(lines)
+
+
+def run_benchmark():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="seconds per fake LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.05,
+                        help="seconds per fake search/scrape call")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--feedback-files", type=int, default=50)
+    parser.add_argument("--only", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.llm_latency, args.tool_latency,
+                             args.questions, args.feedback_files, args.only)
+    print(format_results(results))
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+        print(f"Results saved to {args.json_path}")
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmark())
@@ -1,8 +1,132 @@
-from crewai import Agent, Crew, Process, Task
+from crewai import Agent, Crew, LLM, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from typing import List
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool
+from crewai.tasks.task_output import TaskOutput
+from pydantic import PrivateAttr
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from .tools.custom_tool import LocalKnowledgeTool
+from .tools.web_tools import CachedScrapeWebsiteTool, CachedSerperDevTool
+from .utils.context_compactor import get_context_compactor
+from .utils.llm_cache import CachedLLM, LLMResponseCache, get_llm_cache
+from .utils.metrics import collect_metrics
+from .utils.model_router import RoutedLLM, build_guardrail, get_model_router, routed_model
+from .utils.research_cache import ResearchCache
+from .utils.resilience import ResilientLLM, get_retry_policy, kickoff_with_retry
+from .utils.schemas import Feedback, QuestionList
+
+# Ordine completo dei task e dipendenze di context tra di essi: ogni crew
+# costruisce solo il sottografo che le serve
+TASK_ORDER = [
+    'research_company_task',
+    'research_person_task',
+    'define_questions_task',
+    'interview_prep_task',
+    'feedback_task',
+]
+
+TASK_CONTEXT: Dict[str, List[str]] = {
+    'define_questions_task': ['research_company_task', 'research_person_task'],
+    'interview_prep_task': ['define_questions_task'],
+    'feedback_task': ['interview_prep_task'],
+}
+
+# Input usati per scegliere le parti rilevanti delle pagine lette da ogni task
+PAGE_KEYWORD_INPUTS: Dict[str, List[str]] = {
+    'research_company_task': ['company', 'industry', 'country', 'job_position'],
+    'research_person_task': ['interviewer', 'company', 'job_position'],
+}
+
+# Task con output strutturato: il raw diventa il JSON compatto del modello
+STRUCTURED_OUTPUTS: Dict[str, Any] = {
+    'define_questions_task': QuestionList,
+    'feedback_task': Feedback,
+}
+
+# Input usati per scegliere i fatti da tenere quando il context viene compattato
+CONTEXT_KEYWORD_INPUTS = ['company', 'interviewer', 'job_position', 'industry', 'country',
+                          'job_description']
+
+# Tempo massimo predefinito per un'esecuzione asincrona della crew (secondi)
+DEFAULT_ASYNC_TIMEOUT = 15 * 60
+# Chiamate di feedback contemporanee in feedback_many
+DEFAULT_ASYNC_CONCURRENCY = 4
+
+T = TypeVar('T')
+
+
+def _idle_event() -> threading.Event:
+    event = threading.Event()
+    event.set()
+    return event
+
+
+class PrepTask(Task):
+    """Task whose async execution reports failures to the waiting crew.
+
+    CrewAI runs ``async_execution`` tasks in a thread that never resolves
+    its future when the task raises, so the crew would wait forever for a
+    failed (or cancelled) research task.
+
+    Each run also selects the model for its LLM calls (see ModelRouter);
+    after a failed guardrail validation the retry uses the escalation model.
+    With ``context_token_budget`` the outputs of the context tasks are
+    compacted to that many tokens before reaching the agent.
+
+    Structured outputs (``output_pydantic``) replace the raw LLM text with
+    the compact JSON of the model, so downstream tasks and the saved files
+    get the same serialization.
+
+    ``wait_idle`` waits for an async execution still running after its
+    crew stopped (e.g. the other research task when one of them failed).
+    """
+    # Chiave dell'agente in agents.yaml, per il routing dei modelli
+    agent_name: Optional[str] = None
+    context_token_budget: Optional[int] = None
+    _run_inputs: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _idle: threading.Event = PrivateAttr(default_factory=_idle_event)
+
+    def interpolate_inputs_and_add_conversation_history(self, inputs: Dict[str, Any]) -> None:
+        self._run_inputs = dict(inputs or {})
+        super().interpolate_inputs_and_add_conversation_history(inputs)
+
+    def _execute_core(self, agent, context, tools) -> TaskOutput:
+        # CrewAI ripete il task richiamando _execute_core dopo aver incrementato
+        # retry_count, con l'errore di validazione come context
+        retrying = self.retry_count > 0
+        if context and self.context and self.context_token_budget and not retrying:
+            context = get_context_compactor().compact_context(
+                [_context_text(context_task.output) for context_task in self.context
+                 if context_task.output is not None],
+                [self._run_inputs.get(name) or "" for name in CONTEXT_KEYWORD_INPUTS],
+                self.context_token_budget)
+
+        model = get_model_router().select(self.name, self.agent_name, self._run_inputs,
+                                          escalated=retrying)
+        with routed_model(model, self.name):
+            output = super()._execute_core(agent, context, tools)
+        if output.pydantic is not None:
+            output.raw = output.pydantic.model_dump_json()
+        return output
+
+    def execute_async(self, agent=None, context=None, tools=None):
+        self._idle.clear()
+        return super().execute_async(agent, context, tools)
+
+    def _execute_task_async(self, agent, context, tools, future) -> None:
+        try:
+            result = self._execute_core(agent, context, tools)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        finally:
+            self._idle.set()
+        future.set_result(result)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no async execution of the task is running."""
+        return self._idle.wait(timeout)
 
 
 @CrewBase
@@ -13,159 +137,423 @@ class InterviewPrepCrew():
     agents: List[BaseAgent]
     tasks: List[Task]
 
-    def __init__(self):
+    def __init__(self, llm: Optional[Any] = None, tools: Optional[List[Any]] = None,
+                 response_cache: Optional[LLMResponseCache] = None):
+        """
+        Args:
+            llm: LLM used by every agent (None for each agent's configured model)
+            tools: Tools of the research agent (None for the local knowledge
+                base, cached Serper search and website scraping)
+            response_cache: Cache of LLM responses shared by the agents (None
+                for the process-wide one, see get_llm_cache)
+        """
         super().__init__()
+        self._llm = llm
+        self._research_tools = tools
+        self._response_cache = response_cache if response_cache is not None else get_llm_cache()
+        # Con un LLM iniettato (es. nei test) il modello è fisso
+        self._route_models = llm is None
         # Questo viene fatto nel decoratore ma assicuriamoci che sia inizializzato
         if not hasattr(self, 'agents'):
             self.agents = []
         if not hasattr(self, 'tasks'):
             self.tasks = []
+        # Crew di riferimento già costruite, copiate per ogni esecuzione
+        self._crew_templates: Dict[str, Crew] = {}
+        self._crew_templates_lock = threading.Lock()
         # Debug
         print(
             f"InterviewPrepCrew inizializzato con {len(self.agents)} agenti e {len(self.tasks)} task")
 
+    def _llm_kwargs(self) -> Dict[str, Any]:
+        """Agent arguments for the injected LLM, if any."""
+        return {'llm': self._llm} if self._llm is not None else {}
+
+    def _wrap_llm(self, crew_agent: Agent, agent_name: str) -> Agent:
+        """Route the agent's LLM calls by task, with retries and the response cache."""
+        if isinstance(crew_agent.llm, LLM) and crew_agent.llm.timeout is None:
+            # Senza timeout una chiamata bloccata ferma la crew (i client per
+            # gli altri modelli lo ereditano, vedi RoutedLLM)
+            crew_agent.llm.timeout = get_retry_policy().call_timeout
+        if self._route_models and isinstance(crew_agent.llm, LLM):
+            crew_agent.llm = RoutedLLM(crew_agent.llm, agent_name)
+        if not isinstance(crew_agent.llm, (ResilientLLM, CachedLLM)):
+            crew_agent.llm = ResilientLLM(crew_agent.llm)
+        # La cache sta all'esterno: le risposte già note non passano dal circuit breaker
+        if self._response_cache is not None and not isinstance(crew_agent.llm, CachedLLM):
+            crew_agent.llm = CachedLLM(crew_agent.llm, self._response_cache)
+        return crew_agent
+
     @agent
     def research_agent(self) -> Agent:
         """Create a research agent with tools."""
         # Create agent WITHOUT referencing tools from config
         agent = Agent(
             config=self.agents_config['research_agent'],
-            verbose=True
+            verbose=True,
+            **self._llm_kwargs()
         )
 
         # Add tools directly to the agent
-        agent.tools = [SerperDevTool(), ScrapeWebsiteTool()]
+        if self._research_tools is not None:
+            agent.tools = list(self._research_tools)
+        else:
+            # La knowledge base locale per prima: risponde senza andare sul web
+            agent.tools = [LocalKnowledgeTool(), CachedSerperDevTool(), CachedScrapeWebsiteTool()]
 
-        return agent
+        return self._wrap_llm(agent, 'research_agent')
 
     @agent
     def interview_coach(self) -> Agent:
         """Create an interview coach agent."""
-        return Agent(
+        return self._wrap_llm(Agent(
             config=self.agents_config['interview_coach'],
-            verbose=True
-        )
+            verbose=True,
+            **self._llm_kwargs()
+        ), 'interview_coach')
 
     @agent
     def interview_agent(self) -> Agent:
         """Create an interviewer agent."""
-        return Agent(
+        return self._wrap_llm(Agent(
             config=self.agents_config['interview_agent'],
-            verbose=True
+            verbose=True,
+            **self._llm_kwargs()
+        ), 'interview_agent')
+
+    def _create_task(self, name: str) -> Task:
+        """Create a fresh task from its config, without context."""
+        task_config = self.tasks_config[name].copy()
+        # Il context viene collegato da _build_tasks in base al grafo TASK_CONTEXT
+        task_config.pop('context', None)
+        context_token_budget = task_config.pop('context_token_budget', None)
+
+        if name == 'define_questions_task':
+            # Rimuovi l'output_file dalla configurazione se presente
+            task_config.pop('output_file', None)
+
+        agent_name = next((key for key, config in self.agents_config.items()
+                           if task_config.get('agent') is not None
+                           and config.get('role', '').strip() == task_config['agent'].role.strip()),
+                          None)
+        extra: Dict[str, Any] = {}
+        if self._route_models:
+            # La validazione dell'output fa scattare il passaggio al modello di riserva
+            route = get_model_router().task_route(name)
+            guardrail = build_guardrail(route.validation)
+            if guardrail is not None:
+                extra['guardrail'] = guardrail
+                if route.max_retries is not None:
+                    extra['max_retries'] = route.max_retries
+
+        return PrepTask(config=task_config, name=name, agent_name=agent_name,
+                        context_token_budget=context_token_budget,
+                        output_pydantic=STRUCTURED_OUTPUTS.get(name), **extra)
+
+    def _build_tasks(self, task_names: List[str]) -> List[Task]:
+        """Build each requested task once, wiring context only between them.
+
+        Dependencies outside ``task_names`` are skipped: they never run in the
+        crew being built, so they would contribute no output anyway.
+        """
+        registry: Dict[str, Task] = {}
+        for name in task_names:
+            crew_task = self._create_task(name)
+            crew_task.context = [registry[dependency]
+                                 for dependency in TASK_CONTEXT.get(name, [])
+                                 if dependency in registry]
+            registry[name] = crew_task
+        return [registry[name] for name in task_names]
+
+    def _crew_for(self, tasks: List[Task]) -> Crew:
+        """Create a sequential crew with only the agents its tasks need."""
+        agents = []
+        for crew_task in tasks:
+            if crew_task.agent is not None and all(crew_task.agent is not a for a in agents):
+                agents.append(crew_task.agent)
+
+        return Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=True,
         )
 
     @task
     def research_company_task(self) -> Task:
         """Create a task to research the company."""
-        return Task(
-            config=self.tasks_config['research_company_task']
-        )
+        return self._create_task('research_company_task')
 
     @task
     def research_person_task(self) -> Task:
         """Create a task to research the interviewer."""
-        return Task(
-            config=self.tasks_config['research_person_task']
-        )
+        return self._create_task('research_person_task')
 
     @task
     def define_questions_task(self) -> Task:
         """Create a task to define interview questions."""
-        task_config = self.tasks_config['define_questions_task'].copy()
-
-        # Rimuovi l'output_file dalla configurazione se presente
-        if 'output_file' in task_config:
-            del task_config['output_file']
-
-        return Task(
-            config=task_config,
-            context=[self.research_company_task(), self.research_person_task()]
-        )
+        return self._create_task('define_questions_task')
 
     @task
     def interview_prep_task(self) -> Task:
         """Create a task for interview preparation."""
-        return Task(
-            config=self.tasks_config['interview_prep_task'],
-            context=[self.define_questions_task()]
-        )
+        return self._create_task('interview_prep_task')
 
     @task
     def feedback_task(self) -> Task:
         """Create a task for feedback on interview answers."""
-        return Task(
-            config=self.tasks_config['feedback_task'],
-            context=[self.interview_prep_task()]
-        )
+        return self._create_task('feedback_task')
 
     @crew
     def crew(self) -> Crew:
         """Creates the Interview Preparation crew"""
-        # Assicurati che agenti e task siano inizializzati
-        if not self.agents or len(self.agents) == 0:
-            self.agents = [self.research_agent(
-            ), self.interview_coach(), self.interview_agent()]
+        return self._crew_for(self._build_tasks(TASK_ORDER))
 
-        return Crew(
-            agents=self.agents,
-            tasks=self.tasks,
-            process=Process.sequential,
-            verbose=True,
-        )
+    def research_crew(self, parallel: bool = True) -> Crew:
+        """Creates a crew specifically for research and question generation.
 
-    def research_crew(self) -> Crew:
-        """Creates a crew specifically for research and question generation"""
-        # Assicurati che gli agenti siano stati inizializzati
-        if not self.agents or len(self.agents) == 0:
-            self.agents = [self.research_agent(
-            ), self.interview_coach(), self.interview_agent()]
+        With ``parallel=True`` the company and interviewer research run
+        concurrently and ``define_questions_task`` starts once both are done.
+        """
+        research_tasks = self._build_tasks([
+            'research_company_task',
+            'research_person_task',
+            'define_questions_task'
+        ])
 
-        research_tasks = [
-            self.research_company_task(),
-            self.research_person_task(),
-            self.define_questions_task()
-        ]
+        # Le due ricerche sono indipendenti: come task asincroni vengono
+        # eseguite in parallelo e define_questions_task (sincrono, con entrambe
+        # nel context) attende il completamento di tutte e due. Sono PrepTask:
+        # se una ricerca fallisce l'errore arriva alla crew invece di bloccarla.
+        for research_task in research_tasks[:2]:
+            research_task.async_execution = parallel
 
-        return Crew(
-            agents=self.agents,
-            tasks=research_tasks,
-            process=Process.sequential,
-            verbose=True,
-        )
+        return self._crew_for(research_tasks)
 
     def practice_crew(self) -> Crew:
         """Creates a crew specifically for interview practice"""
-        # Assicurati che gli agenti siano stati inizializzati
-        if not self.agents or len(self.agents) == 0:
-            self.agents = [self.research_agent(
-            ), self.interview_coach(), self.interview_agent()]
-
-        practice_tasks = [
-            self.interview_prep_task(),
-            self.feedback_task()
-        ]
-
-        return Crew(
-            agents=self.agents,
-            tasks=practice_tasks,
-            process=Process.sequential,
-            verbose=True,
-        )
+        return self._crew_for(self._build_tasks([
+            'interview_prep_task',
+            'feedback_task'
+        ]))
 
     def feedback_crew(self) -> Crew:
         """Creates a crew specifically for feedback generation"""
-        # Assicurati che gli agenti siano stati inizializzati
-        if not self.agents or len(self.agents) == 0:
-            self.agents = [self.research_agent(
-            ), self.interview_coach(), self.interview_agent()]
+        return self._crew_for(self._build_tasks(['feedback_task']))
 
-        feedback_tasks = [
-            self.feedback_task()
-        ]
+    def crew_copy(self, name: str, **kwargs) -> Crew:
+        """Return a fresh copy of the ``<name>_crew`` crew.
 
-        return Crew(
-            agents=self.agents,
-            tasks=feedback_tasks,
-            process=Process.sequential,
-            verbose=True,
-        )
+        The crew is built once per set of arguments; each call gets a
+        ``Crew.copy()`` (agents and tasks are cloned, tools and LLM clients
+        are shared), so concurrent runs never share mutable task state.
+        """
+        template_key = f"{name}:{sorted(kwargs.items())}"
+        template = self._crew_templates.get(template_key)
+        if template is None:
+            with self._crew_templates_lock:
+                template = self._crew_templates.get(template_key)
+                if template is None:
+                    template = getattr(self, f"{name}_crew")(**kwargs)
+                    self._crew_templates[template_key] = template
+        return template.copy()
+
+    async def research(self, inputs: Dict[str, str],
+                       cache: Optional[ResearchCache] = None,
+                       force_refresh: bool = False,
+                       timeout: Optional[float] = DEFAULT_ASYNC_TIMEOUT) -> Dict[str, str]:
+        """Run the research crew; returns the raw outputs keyed by task name."""
+        crew = self.crew_copy("research", parallel=True)
+        with collect_metrics(crew, "research"):
+            return await run_crew_async(
+                crew, asyncio.to_thread(kickoff_research, crew, inputs, cache, force_refresh),
+                timeout)
+
+    async def feedback(self, question: str, answer: str, base_inputs: Dict[str, str],
+                       timeout: Optional[float] = DEFAULT_ASYNC_TIMEOUT) -> str:
+        """Return the feedback on ``answer`` to ``question``."""
+        crew = self.crew_copy("feedback")
+        inputs = {**base_inputs, 'job_position_report': question, 'user_answer': answer}
+        with collect_metrics(crew, "feedback"):
+            result = await run_crew_async(
+                crew, asyncio.to_thread(kickoff_with_retry, crew, inputs), timeout)
+        return result.raw
+
+    async def feedback_many(self, answers: List[Tuple[str, str]], base_inputs: Dict[str, str],
+                            max_concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                            timeout: Optional[float] = DEFAULT_ASYNC_TIMEOUT
+                            ) -> List[Union[str, BaseException]]:
+        """Return the feedback for every (question, answer) pair, in order.
+
+        At most ``max_concurrency`` feedback crews run at once; ``timeout``
+        applies to each of them. A failed call yields its exception in place
+        of the feedback, as with ``asyncio.gather(return_exceptions=True)``.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def bounded(question: str, answer: str) -> str:
+            async with semaphore:
+                return await self.feedback(question, answer, base_inputs, timeout)
+
+        return await asyncio.gather(
+            *(bounded(question, answer) for question, answer in answers),
+            return_exceptions=True)
+
+
+def _context_text(output: TaskOutput) -> str:
+    """Text of a context output to compact: markdown for structured outputs."""
+    if output.pydantic is not None and hasattr(output.pydantic, 'to_markdown'):
+        return output.pydantic.to_markdown()
+    return output.raw
+
+
+def _research_cache_key(cache: ResearchCache, task_name: str, inputs: Dict[str, str]) -> Optional[str]:
+    """Return the cache key for a cacheable research task, None otherwise."""
+    if task_name == 'research_company_task':
+        return cache.company_key(inputs.get('company'), inputs.get('country'), inputs.get('industry'))
+    if task_name == 'research_person_task':
+        return cache.person_key(inputs.get('interviewer'), inputs.get('company'))
+    return None
+
+
+def _bind_page_keywords(crew: Crew, inputs: Dict[str, str]) -> None:
+    """Give each research task a scrape tool ranking pages against its own inputs.
+
+    Tools are shared between crew copies, so the task gets a bound copy
+    instead of having the shared instance modified.
+    """
+    for crew_task in crew.tasks:
+        fields = PAGE_KEYWORD_INPUTS.get(crew_task.name)
+        if not fields or not crew_task.tools:
+            continue
+        keywords = [inputs.get(name) or "" for name in fields]
+        crew_task.tools = [tool.with_keywords(keywords) if isinstance(tool, CachedScrapeWebsiteTool)
+                           else tool for tool in crew_task.tools]
+
+
+def _bind_force_refresh(crew: Crew) -> None:
+    """Make the crew's LLM calls and web tools skip their caches, still updating them.
+
+    As for the page keywords, agents and tasks get refreshing copies of
+    the shared tools; each crew copy has its own CachedLLM.
+    """
+    def refreshed(tools):
+        return [tool.model_copy(update={"refresh": True})
+                if isinstance(tool, (CachedSerperDevTool, CachedScrapeWebsiteTool)) else tool
+                for tool in tools]
+
+    for crew_agent in crew.agents:
+        if isinstance(crew_agent.llm, CachedLLM):
+            crew_agent.llm.refresh = True
+        if crew_agent.tools:
+            crew_agent.tools = refreshed(crew_agent.tools)
+    for crew_task in crew.tasks:
+        if crew_task.tools:
+            crew_task.tools = refreshed(crew_task.tools)
+
+
+def kickoff_research(crew: Crew, inputs: Dict[str, str],
+                     cache: Optional[ResearchCache] = None,
+                     force_refresh: bool = False) -> Dict[str, str]:
+    """Run a research crew, skipping research tasks with a fresh cache entry.
+
+    Returns the raw output of every task keyed by task name, in crew order.
+    With ``force_refresh=True`` the research cache, the LLM response cache
+    and the search and page caches are bypassed but still updated.
+    Transient failures re-run only the unfinished tasks (see
+    kickoff_with_retry); if the run still fails, the research outputs
+    completed so far are cached, so the next run starts from them.
+    """
+    tasks = list(crew.tasks)
+    outputs: Dict[str, str] = {}
+    cache_keys: Dict[str, str] = {}
+
+    if cache is not None:
+        pending = []
+        for crew_task in tasks:
+            key = _research_cache_key(cache, crew_task.name, inputs)
+            if key is None:
+                pending.append(crew_task)
+                continue
+
+            cache_keys[crew_task.name] = key
+            cached = None if force_refresh else cache.get(key)
+            if cached is None:
+                pending.append(crew_task)
+                continue
+
+            print(f"Research cache hit per {crew_task.name}")
+            # Il task non viene eseguito, ma il suo output resta disponibile
+            # come context per define_questions_task
+            crew_task.output = TaskOutput(
+                description=crew_task.description,
+                name=crew_task.name,
+                expected_output=crew_task.expected_output,
+                raw=cached,
+                agent=crew_task.agent.role if crew_task.agent else "",
+            )
+            outputs[crew_task.name] = cached
+        crew.tasks = pending
+
+    if crew.tasks:
+        if force_refresh:
+            _bind_force_refresh(crew)
+        _bind_page_keywords(crew, inputs)
+        try:
+            kickoff_with_retry(crew, inputs)
+        finally:
+            for crew_task in crew.tasks:
+                if crew_task.output is None:
+                    continue
+                outputs[crew_task.name] = crew_task.output.raw
+                if crew_task.name in cache_keys and crew_task.output.raw:
+                    cache.set(cache_keys[crew_task.name], crew_task.output.raw,
+                              metadata={'task': crew_task.name})
+
+    # Restituisci gli output nell'ordine originale dei task
+    return {crew_task.name: outputs[crew_task.name]
+            for crew_task in tasks if crew_task.name in outputs}
+
+
+class CrewRunCancelled(TimeoutError):
+    """Raised inside a crew run whose async caller was cancelled or timed out.
+
+    It derives from TimeoutError because CrewAI agents propagate that error
+    without retrying the task.
+    """
+
+
+async def run_crew_async(crew: Crew, run: Awaitable[T],
+                         timeout: Optional[float] = DEFAULT_ASYNC_TIMEOUT) -> T:
+    """Await a crew run with a timeout, stopping the crew if it's abandoned.
+
+    CrewAI runs the crew in a worker thread, which asyncio cannot interrupt.
+    On timeout or cancellation the crew's step and task callbacks start
+    raising CrewRunCancelled, so the run stops at the next agent step
+    instead of spending LLM calls on a result nobody will read.
+    """
+    cancelled = threading.Event()
+
+    def check_cancelled(_output: Any) -> None:
+        if cancelled.is_set():
+            raise CrewRunCancelled("Crew run cancelled by its caller")
+
+    crew.step_callback = _chain_callbacks(crew.step_callback, check_cancelled)
+    crew.task_callback = _chain_callbacks(crew.task_callback, check_cancelled)
+
+    try:
+        return await asyncio.wait_for(run, timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        cancelled.set()
+        raise
+
+
+def _chain_callbacks(first: Optional[Callable[[Any], Any]],
+                     second: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    if first is None:
+        return second
+
+    def chained(output: Any) -> None:
+        first(output)
+        second(output)
+    return chained
@@ -0,0 +1,62 @@
+import threading
+from typing import Any, List, Optional
+from crewai import Crew
+from .crew import InterviewPrepCrew
+from .tools.custom_tool import bind_session
+
+
+class CrewFactory:
+    """Process-wide factory for InterviewPrepCrew crews.
+
+    The YAML configuration, the agents and their tools are built once into
+    template crews; every request gets a cheap ``Crew.copy()`` of a template
+    (agents and tasks are cloned, tools and LLM clients are shared), so
+    concurrent sessions never share mutable task state.
+    """
+
+    def __init__(self, llm: Optional[Any] = None, tools: Optional[List[Any]] = None):
+        """``llm`` and ``tools`` are passed to InterviewPrepCrew (e.g. test stubs)."""
+        self._lock = threading.Lock()
+        self._llm = llm
+        self._tools = tools
+        self._prep: Optional[InterviewPrepCrew] = None
+
+    def prep(self) -> InterviewPrepCrew:
+        """Return the shared InterviewPrepCrew, building it on first use."""
+        if self._prep is None:
+            with self._lock:
+                if self._prep is None:
+                    self._prep = InterviewPrepCrew(llm=self._llm, tools=self._tools)
+        return self._prep
+
+    def research_crew(self, parallel: bool = True, session_dir: Optional[str] = None) -> Crew:
+        """Per-request research and question generation crew.
+
+        The local knowledge base of the crew sees the reports of
+        ``session_dir`` besides the shared sources.
+        """
+        crew = self.prep().crew_copy("research", parallel=parallel)
+        bind_session(crew, session_dir)
+        return crew
+
+    def practice_crew(self) -> Crew:
+        """Per-request interview practice crew."""
+        return self.prep().crew_copy("practice")
+
+    def feedback_crew(self) -> Crew:
+        """Per-request feedback crew."""
+        return self.prep().crew_copy("feedback")
+
+
+_factory: Optional[CrewFactory] = None
+_factory_lock = threading.Lock()
+
+
+def get_crew_factory() -> CrewFactory:
+    """Return the process-wide CrewFactory, creating it on first use."""
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = CrewFactory()
+    return _factory
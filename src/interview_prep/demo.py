@@ -4,6 +4,7 @@ import time
 import re  # Add explicit import for re module
 from dotenv import load_dotenv
 from interview_prep.crew import InterviewPrepCrew
+from interview_prep.utils.schemas import QuestionList, feedback_markdown, parse_output
 
 # Load environment variables
 load_dotenv()
@@ -92,6 +93,9 @@ def run_demo():
         company_report = research_result.tasks_output[0].raw
         interviewer_report = research_result.tasks_output[1].raw
         questions_report = research_result.tasks_output[2].raw
+        structured_questions = parse_output(QuestionList, questions_report)
+        if structured_questions is not None:
+            questions_report = structured_questions.to_markdown()
 
         # Use sanitized filenames
         company_file = os.path.join(
@@ -112,12 +116,13 @@ def run_demo():
 
         print(f"Research outputs saved to output directory")
 
-        # Parse questions using a regular expression for numbered lists
-        # This pattern looks for lines like "1. Question text" or "20. Question text"
-        questions = []
-        numbered_pattern = re.compile(r'^\d+\.\s+(.+)$', re.MULTILINE)
-        numbered_matches = numbered_pattern.findall(questions_report)
-        questions = [match for match in numbered_matches]
+        if structured_questions is not None:
+            questions = [q.text for q in structured_questions.questions]
+        else:
+            # Parse questions using a regular expression for numbered lists
+            # This pattern looks for lines like "1. Question text" or "20. Question text"
+            numbered_pattern = re.compile(r'^\d+\.\s+(.+)$', re.MULTILINE)
+            questions = numbered_pattern.findall(questions_report)
 
         print(f"Found {len(questions)} questions in the report")
 
@@ -179,7 +184,8 @@ def run_demo():
             feedback_result = practice_crew.kickoff(inputs=practice_inputs)
 
             print("\n=== Feedback ===\n")
-            print(feedback_result.raw)
+            feedback = feedback_markdown(feedback_result.raw)
+            print(feedback)
 
             # Save feedback
             feedback_file = os.path.join(
@@ -189,7 +195,7 @@ def run_demo():
                 f.write(f"# Question {question_num}\n\n")
                 f.write(f"**Question:** {question}\n\n")
                 f.write(f"**Sample Answer:**\n\n{answer}\n\n")
-                f.write(f"**Feedback:**\n\n{feedback_result.raw}\n")
+                f.write(f"**Feedback:**\n\n{feedback}\n")
 
         except Exception as e:
             print(f"Error getting feedback for question {question_num}: {e}")
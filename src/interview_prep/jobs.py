@@ -0,0 +1,358 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from .crew import kickoff_research
+from .crew_factory import get_crew_factory
+from .utils.crew_events import CrewEvent, enable_streaming, get_event_router
+from .utils.interview_manager import InterviewManager
+from .utils.metrics import collect_metrics
+from .utils.research_cache import ResearchCache
+from .utils.storage import SESSION_FIELDS, get_store
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+# Job trovati su disco ancora in corso, ma non più presenti in memoria:
+# il processo che li eseguiva è terminato
+JOB_INTERRUPTED = "interrupted"
+
+# Caratteri di output parziale conservati per ogni task in esecuzione
+PARTIAL_OUTPUT_CHARS = 2000
+
+# Job conclusi conservati (in memoria e in jobs_dir): i più recenti, fino a questa età
+MAX_FINISHED_JOBS = 200
+FINISHED_JOB_TTL_SECONDS = 24 * 3600
+
+# Input di una richiesta di ricerca: richieste uguali su tutti (anche sulla
+# job description, da cui nascono le domande) condividono lo stesso job,
+# qualunque sia la sessione
+RESEARCH_INPUTS = ('company', 'interviewer', 'job_position', 'industry',
+                   'country', 'job_description')
+
+
+class JobContext:
+    """Handle given to a job's work function to report per-task progress."""
+
+    def __init__(self, runner: "JobRunner", job: Dict[str, Any]):
+        self._runner = runner
+        self._job = job
+
+    def init_tasks(self, task_names: List[str]) -> None:
+        """Declare the tasks the job is going to run."""
+        with self._runner._lock:
+            self._job["progress"] = {name: "pending" for name in task_names}
+        self._runner._save(self._job)
+
+    def task_status(self, task_name: str) -> Optional[str]:
+        """Return the recorded status of a task."""
+        with self._runner._lock:
+            return self._job["progress"].get(task_name)
+
+    def set_task_status(self, task_name: str, status: str) -> None:
+        """Record the status of a task and persist the job."""
+        with self._runner._lock:
+            self._job["progress"][task_name] = status
+            if status != "running":
+                self._job["partial"].pop(task_name, None)
+        self._runner._save(self._job)
+
+    def close_joins(self) -> List[Dict[str, Any]]:
+        """Stop coalescing requests into this job; return the params of those that joined.
+
+        Identical requests submitted afterwards start a new job.
+        """
+        with self._runner._lock:
+            self._runner._release(self._job)
+            return list(self._job["joined"])
+
+    def on_event(self, event: CrewEvent) -> None:
+        """Crew event callback: update progress and partial output."""
+        if event.kind == "task_started":
+            self.set_task_status(event.task_name, "running")
+        elif event.kind == "task_completed":
+            self.set_task_status(event.task_name, "completed")
+        elif event.kind == "task_failed":
+            self.set_task_status(event.task_name, "failed")
+        elif event.kind == "chunk":
+            # L'output parziale resta in memoria: viene letto solo dal polling
+            with self._runner._lock:
+                partial = self._job["partial"].get(event.task_name, "") + event.data["chunk"]
+                self._job["partial"][event.task_name] = partial[-PARTIAL_OUTPUT_CHARS:]
+
+
+class JobRunner:
+    """Thread pool with a persistent job table for long crew runs.
+
+    Jobs outlive the Streamlit script run that submitted them: the UI keeps
+    only the job id and polls ``get``. Every status change is written to
+    ``jobs_dir/<job_id>.json``, so finished results can be read back after a
+    restart and jobs cut off by one are reported as interrupted.
+
+    Finished jobs are kept for ``finished_ttl`` seconds, at most
+    ``max_finished`` of them; older ones are dropped with their status file.
+    """
+
+    def __init__(self, jobs_dir: str = os.path.join("output", ".jobs"), max_workers: int = 2,
+                 max_finished: int = MAX_FINISHED_JOBS,
+                 finished_ttl: float = FINISHED_JOB_TTL_SECONDS):
+        self.jobs_dir = jobs_dir
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Chiave di coalescenza -> id del job in corso con quella chiave
+        self._inflight: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="interview-job")
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.prune()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        """Persist a job atomically (without the in-memory partial output)."""
+        with self._lock:
+            job["updated_at"] = time.time()
+            data = {key: value for key, value in job.items() if key != "partial"}
+            payload = json.dumps(data, ensure_ascii=False, default=str)
+        path = self._path(job["id"])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not persist job {job['id']}: {e}")
+
+    def prune(self) -> int:
+        """Drop expired and excess finished jobs; return how many were removed.
+
+        Status files of jobs not in memory (left by a previous process) count
+        as finished, dated by their last write.
+        """
+        now = time.time()
+        with self._lock:
+            active = {job_id for job_id, job in self._jobs.items()
+                      if job["status"] in (JOB_QUEUED, JOB_RUNNING)}
+            finished = {job_id: job["updated_at"] for job_id, job in self._jobs.items()
+                        if job_id not in active}
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            names = []
+        for name in names:
+            job_id, ext = os.path.splitext(name)
+            if ext != ".json" or job_id in active or job_id in finished:
+                continue
+            try:
+                finished[job_id] = os.path.getmtime(os.path.join(self.jobs_dir, name))
+            except OSError:
+                continue
+
+        newest_first = sorted(finished, key=finished.get, reverse=True)
+        expired = [job_id for rank, job_id in enumerate(newest_first)
+                   if rank >= self.max_finished or now - finished[job_id] > self.finished_ttl]
+        with self._lock:
+            # Un job inviato nel frattempo può avere già il suo file: non va toccato
+            expired = [job_id for job_id in expired
+                       if self._jobs.get(job_id, {}).get("status") not in (JOB_QUEUED, JOB_RUNNING)]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+        for job_id in expired:
+            try:
+                os.remove(self._path(job_id))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Warning: Could not remove job {job_id}: {e}")
+        return len(expired)
+
+    def _release(self, job: Dict[str, Any]) -> None:
+        """Stop coalescing requests into ``job`` (call with the lock held)."""
+        if self._inflight.get(job.get("coalesce_key")) == job["id"]:
+            del self._inflight[job["coalesce_key"]]
+
+    def submit(self, kind: str, params: Dict[str, Any],
+               work: Callable[[JobContext], Dict[str, Any]],
+               coalesce_key: Optional[str] = None, replace: bool = False) -> str:
+        """Queue ``work`` and return the new job id.
+
+        Requests with the same ``coalesce_key`` as a job still queued or
+        running get that job's id instead of starting another run; their
+        ``params`` are added to the job's ``joined`` list. With ``replace``
+        a new job is started anyway and later requests join that one.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "params": params,
+            "progress": {},
+            "partial": {},
+            "result": None,
+            "error": None,
+            "requests": 1,
+            "joined": [],
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }
+        existing = None
+        with self._lock:
+            if coalesce_key is not None:
+                existing_id = None if replace else self._inflight.get(coalesce_key)
+                if existing_id is not None:
+                    existing = self._jobs[existing_id]
+                    existing["requests"] += 1
+                    existing["joined"].append(params)
+                else:
+                    self._inflight[coalesce_key] = job_id
+                    job["coalesce_key"] = coalesce_key
+            if existing is None:
+                self._jobs[job_id] = job
+        if existing is not None:
+            print(f"Coalesced {kind} request into job {existing['id']}")
+            self._save(existing)
+            return existing["id"]
+        self._save(job)
+        self.prune()
+        self._executor.submit(self._run, job, work)
+        return job_id
+
+    def _run(self, job: Dict[str, Any], work: Callable[[JobContext], Dict[str, Any]]) -> None:
+        with self._lock:
+            job["status"] = JOB_RUNNING
+        self._save(job)
+        try:
+            result = work(JobContext(self, job))
+            with self._lock:
+                job["result"] = result
+                job["status"] = JOB_COMPLETED
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            with self._lock:
+                job["error"] = f"{type(e).__name__}: {e}"
+                job["traceback"] = traceback.format_exc()
+                job["status"] = JOB_FAILED
+        with self._lock:
+            self._release(job)
+        self._save(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of a job, from memory or from disk."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                snapshot = dict(job)
+                snapshot["progress"] = dict(job["progress"])
+                snapshot["partial"] = dict(job["partial"])
+                snapshot["joined"] = list(job["joined"])
+                return snapshot
+
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        snapshot.setdefault("partial", {})
+        if snapshot.get("status") in (JOB_QUEUED, JOB_RUNNING):
+            snapshot["status"] = JOB_INTERRUPTED
+        return snapshot
+
+    def submit_research(self, inputs: Dict[str, str], output_dir: str,
+                        force_refresh: bool = False, session_id: str = "") -> str:
+        """Queue a research job that saves its reports into ``output_dir``.
+
+        A request with the same inputs as a running job joins it, and the
+        reports are saved into the output of every joined session too.
+        ``force_refresh`` always starts a new job.
+        """
+        def work(ctx: JobContext) -> Dict[str, Any]:
+            return run_research_job(ctx, inputs, output_dir, force_refresh, session_id)
+
+        return self.submit("research", {"inputs": inputs, "output_dir": output_dir,
+                                        "force_refresh": force_refresh,
+                                        "session_id": session_id}, work,
+                           coalesce_key=research_coalesce_key(inputs), replace=force_refresh)
+
+
+def research_coalesce_key(inputs: Dict[str, str]) -> str:
+    """Key shared by research requests with the same (normalized) inputs."""
+    parts = [" ".join(str(inputs.get(name) or "").split()).casefold()
+             for name in RESEARCH_INPUTS]
+    return "research:" + hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def run_research_job(ctx: JobContext, inputs: Dict[str, str], output_dir: str,
+                     force_refresh: bool = False, session_id: str = "") -> Dict[str, Any]:
+    """Run the research crew for a job and save its outputs."""
+    crew = get_crew_factory().research_crew(session_dir=output_dir)
+    ctx.init_tasks([task.name for task in crew.tasks])
+    enable_streaming(crew)
+
+    with get_event_router().watch(crew, ctx.on_event), \
+            collect_metrics(crew, "research") as collector:
+        outputs = kickoff_research(crew, inputs, cache=ResearchCache(),
+                                   force_refresh=force_refresh)
+
+    # I task serviti dalla cache non emettono eventi
+    for task_name in outputs:
+        if ctx.task_status(task_name) == "pending":
+            ctx.set_task_status(task_name, "cached")
+
+    # Da qui le richieste uguali avviano un nuovo job, che troverà la ricerca in cache
+    requests = [{"inputs": inputs, "output_dir": output_dir,
+                 "session_id": session_id}] + ctx.close_joins()
+    sessions = {}
+    for request in requests:
+        sessions[request["session_id"]] = {
+            "output_dir": request["output_dir"],
+            "job_position": request["inputs"]["job_position"],
+            "files": save_research_outputs(outputs, request["inputs"],
+                                           request["output_dir"], request["session_id"]),
+        }
+
+    return {"outputs": outputs, "files": sessions[session_id]["files"],
+            "sessions": sessions, "metrics": collector.run.to_dict()}
+
+
+def save_research_outputs(outputs: Dict[str, str], inputs: Dict[str, str],
+                          output_dir: str, session_id: str = "") -> Dict[str, str]:
+    """Save the research outputs for a session; return the written files."""
+    store = get_store()
+    store.save_session(session_id, {field: inputs.get(field) for field in SESSION_FIELDS})
+    manager = InterviewManager(output_dir=output_dir, store=store, session_id=session_id)
+    files = {}
+    if 'research_company_task' in outputs:
+        files['company'] = manager.save_company_report(
+            outputs['research_company_task'], inputs['company'])
+    if 'research_person_task' in outputs:
+        files['interviewer'] = manager.save_interviewer_report(
+            outputs['research_person_task'], inputs['interviewer'])
+    if 'define_questions_task' in outputs:
+        files['questions'] = manager.save_questions(
+            outputs['define_questions_task'], inputs['job_position'])
+    return files
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide JobRunner."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
@@ -1,20 +1,32 @@
 import os
 import sys
+import asyncio
 from dotenv import load_dotenv
-from interview_prep.crew import InterviewPrepCrew
+from interview_prep.crew_factory import get_crew_factory
+from interview_prep.practice import FeedbackPrefetcher, grade_answers_async, save_graded_answers
 from interview_prep.utils.interview_manager import InterviewManager
+from interview_prep.utils.research_cache import ResearchCache
+from interview_prep.utils.resilience import CircuitOpenError
+from interview_prep.utils.schemas import feedback_markdown
+from interview_prep.utils.storage import SESSION_FIELDS, get_store
 
 # Load environment variables
 load_dotenv()
 
 # Constants
 MAX_PRACTICE_QUESTIONS = 5  # Maximum number of questions in a practice session
+CLI_SESSION_ID = "cli"  # Store session shared by all command line runs
+
+
+def create_manager():
+    """Create an InterviewManager backed by the local store."""
+    return InterviewManager(store=get_store(), session_id=CLI_SESSION_ID)
 
 
 def run_research():
     """Run the research and question generation phase."""
     # Crea interview manager
-    manager = InterviewManager()
+    manager = create_manager()
 
     print("\nStarting research and question generation...\n")
 
@@ -56,16 +68,16 @@ def run_research():
         print("Job description is required.")
         return
 
+    refresh = input("Ignore cached research and search again? (y/N): ")
+    force_refresh = refresh.strip().lower() in ("y", "yes")
+
     print(f"\nCompany: {company}")
     print(f"Interviewer: {interviewer}")
     print(f"Job Position: {job_position}")
     print(f"Industry: {industry}")
     print(f"Country: {country}")
 
-    # Create crew for research only
-    crew = InterviewPrepCrew().research_crew()
-
-    # Run crew with inputs
+    # Run research crew with inputs
     inputs = {
         'company': company,
         'interviewer': interviewer,
@@ -75,18 +87,17 @@ def run_research():
         'job_description': job_description
     }
 
-    result = crew.kickoff(inputs=inputs)
+    outputs = asyncio.run(get_crew_factory().prep().research(
+        inputs, cache=ResearchCache(), force_refresh=force_refresh))
 
     # Save outputs to files
-    for i, task_output in enumerate(result.tasks_output):
-        if i == 0:  # Company research
-            manager.save_company_report(task_output.raw, company)
-        elif i == 1:  # Interviewer research
-            manager.save_interviewer_report(task_output.raw, interviewer)
-        elif i == 2:  # Questions
-            manager.save_questions(task_output.raw, job_position)
-        else:
-            continue
+    if 'research_company_task' in outputs:
+        manager.save_company_report(outputs['research_company_task'], company)
+    if 'research_person_task' in outputs:
+        manager.save_interviewer_report(
+            outputs['research_person_task'], interviewer)
+    if 'define_questions_task' in outputs:
+        manager.save_questions(outputs['define_questions_task'], job_position)
 
     print("\nResearch and question generation complete!")
     print("Check the output directory for results.")
@@ -105,45 +116,30 @@ def store_session_info(company, interviewer, job_position, industry, country):
         "country": country
     }
 
-    # Create a simple session file
     try:
-        session_dir = os.path.join("output", ".session")
-        os.makedirs(session_dir, exist_ok=True)
-
-        with open(os.path.join(session_dir, "last_session.txt"), "w") as f:
-            for key, value in session_info.items():
-                f.write(f"{key}={value}\n")
+        get_store().save_session(CLI_SESSION_ID, session_info)
     except Exception as e:
         print(f"Warning: Could not save session info: {e}")
 
 
 def load_session_info():
     """Load previous session information."""
-    session_file = os.path.join("output", ".session", "last_session.txt")
-
-    if not os.path.exists(session_file):
-        return {}
-
-    session_info = {}
     try:
-        with open(session_file, "r") as f:
-            for line in f:
-                if "=" in line:
-                    key, value = line.strip().split("=", 1)
-                    session_info[key] = value
+        session = get_store().get_session(CLI_SESSION_ID)
     except Exception as e:
         print(f"Warning: Could not load session info: {e}")
+        return {}
 
-    return session_info
-
+    if not session:
+        return {}
+    return {key: session[key] for key in SESSION_FIELDS if session.get(key)}
 
-def run_practice():
-    """Run the interview practice session."""
-    # Create interview manager
-    manager = InterviewManager()
 
-    print("\nStarting interview practice...\n")
+def ask_practice_details(manager):
+    """Ask for the job details and load the matching questions.
 
+    Returns the base feedback inputs, or None if no questions are available.
+    """
     # Get user inputs with no defaults
     company = input("Enter the company name: ")
     while not company:
@@ -164,20 +160,32 @@ def run_practice():
     # Load questions
     if not manager.load_questions(job_position):
         print("Please run research first or check if questions file exists.")
-        return
+        return None
 
     if not manager.questions:
         print("No questions found in the file.")
-        return
+        return None
 
     print(f"Loaded {len(manager.questions)} questions.\n")
 
-    # Create crew for interview practice
-    crew = InterviewPrepCrew().crew()
-    crew.tasks = [task for task in crew.tasks if task.name in [
-        "interview_prep_task",
-        "feedback_task"
-    ]]
+    return {
+        'company': company,
+        'interviewer': interviewer,
+        'job_position': job_position,
+        'industry': industry
+    }
+
+
+def run_practice():
+    """Run the interview practice session."""
+    # Create interview manager
+    manager = create_manager()
+
+    print("\nStarting interview practice...\n")
+
+    base_inputs = ask_practice_details(manager)
+    if base_inputs is None:
+        return
 
     # Practice loop
     print("=== Interview Practice ===")
@@ -188,12 +196,18 @@ def run_practice():
 
     question_num = 1
 
+    # La domanda e la crew di feedback del turno successivo vengono preparate
+    # in background mentre l'utente risponde o legge il feedback
+    prefetcher = FeedbackPrefetcher()
+    prefetcher.prefetch_next(manager, base_inputs)
+
     while question_num <= MAX_PRACTICE_QUESTIONS:
         # Get random question
-        question = manager.get_random_question()
-        if not question:
+        turn = prefetcher.next_turn()
+        if turn is None:
             print("No more questions available.")
             break
+        question = turn.question
 
         print(f"\nQuestion {question_num}: {question}")
         print("\nYour answer (type 'quit' to end):")
@@ -205,33 +219,23 @@ def run_practice():
             print("\nEnding interview practice...")
             return
 
-        # Get feedback
         # Get feedback
         print("\nGetting feedback on your answer...")
 
-        # Crea una crew solo per il feedback
-        feedback_crew = InterviewPrepCrew().crew()
-        feedback_crew.tasks = [
-            task for task in feedback_crew.tasks if task.name == "feedback_task"]
-
-        inputs = {
-            'company': company,
-            'interviewer': interviewer,
-            'job_position': job_position,
-            'industry': industry,
-            'job_position_report': question,
-            'user_answer': answer
-        }
+        if question_num < MAX_PRACTICE_QUESTIONS:
+            prefetcher.prefetch_next(manager, base_inputs)
 
         try:
             # Esegui solo la task di feedback
-            result = feedback_crew.kickoff(inputs=inputs)
+            result = turn.kickoff(answer)
 
             print("\n=== Feedback ===\n")
-            print(result.raw)
+            print(feedback_markdown(result.raw))
 
             # Salva feedback
             manager.save_feedback(question_num, question, answer, result.raw)
+        except CircuitOpenError as e:
+            print(f"The model provider is unavailable, try again in {e.retry_in:.0f} seconds.")
         except Exception as e:
             print(f"Error in feedback generation: {e}")
 
@@ -247,6 +251,52 @@ def run_practice():
     print(f"Saved feedback to {os.path.join('output', 'feedback')}")
 
 
+def run_mock_interview():
+    """Run a mock interview: answer every question first, then get all feedback."""
+    manager = create_manager()
+
+    print("\nStarting mock interview...\n")
+
+    base_inputs = ask_practice_details(manager)
+    if base_inputs is None:
+        return
+
+    print("=== Mock Interview ===")
+    print("Answer each question as if you were in a real interview.")
+    print("Feedback on all your answers will be generated at the end.")
+    print("Type 'quit' to stop and get feedback on the answers given so far.\n")
+
+    answers = []
+    while len(answers) < MAX_PRACTICE_QUESTIONS:
+        question = manager.get_random_question()
+        if not question:
+            print("No more questions available.")
+            break
+
+        print(f"\nQuestion {len(answers) + 1}: {question}")
+        answer = input("> ")
+        if answer.lower() == 'quit':
+            break
+        answers.append((question, answer))
+
+    if not answers:
+        print("\nNo answers given, nothing to review.")
+        return
+
+    print(f"\nGetting feedback on {len(answers)} answers...")
+    graded = asyncio.run(grade_answers_async(answers, base_inputs))
+
+    for question_num, item in enumerate(graded, start=1):
+        print(f"\n=== Feedback {question_num}: {item.question} ===\n")
+        print(feedback_markdown(item.feedback) if item.error is None
+              else f"Error in feedback generation: {item.error}")
+
+    summary_path = save_graded_answers(manager, graded)
+    print("\nMock interview complete!")
+    if summary_path:
+        print(f"Feedback summary saved to {summary_path}")
+
+
 def run():
     """Main entry point to the interview preparation system."""
     # Create output directory
@@ -256,19 +306,22 @@ def run():
     print("What would you like to do?")
     print("1. Run research and generate interview questions")
     print("2. Practice interview with AI")
-    print("3. Exit")
+    print("3. Mock interview (feedback on all answers at the end)")
+    print("4. Exit")
 
-    choice = input("\nEnter your choice (1-3): ")
+    choice = input("\nEnter your choice (1-4): ")
 
     if choice == "1":
         run_research()
     elif choice == "2":
         run_practice()
     elif choice == "3":
+        run_mock_interview()
+    elif choice == "4":
         print("Exiting...")
         sys.exit(0)
     else:
-        print("Invalid choice. Please enter 1, 2, or 3.")
+        print("Invalid choice. Please enter 1, 2, 3, or 4.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from crewai import Crew
+from .crew_factory import CrewFactory, get_crew_factory
+from .utils.interview_manager import InterviewManager
+from .utils.resilience import kickoff_with_retry
+
+# Executor condiviso: la preparazione di un turno è breve, non serve un
+# thread dedicato per ogni sessione
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="feedback-prefetch")
+
+
+@dataclass
+class PreparedTurn:
+    """A practice question with its feedback crew ready to run."""
+    question: str
+    crew: Crew
+    inputs: Dict[str, str]
+
+    def feedback_inputs(self, answer: str) -> Dict[str, str]:
+        """Bind the user's answer, the only input known at submit time."""
+        return {**self.inputs, 'user_answer': answer}
+
+    def kickoff(self, answer: str) -> Any:
+        """Run the feedback crew on ``answer``."""
+        return kickoff_with_retry(self.crew, self.feedback_inputs(answer))
+
+
+class FeedbackPrefetcher:
+    """Prepare the next practice turn while the user is still busy.
+
+    Picking the question, copying the feedback crew and binding the prompt
+    inputs happen in the background, so submit -> feedback only pays for the
+    LLM call. At most one turn is prepared at a time.
+    """
+
+    def __init__(self, factory: Optional[CrewFactory] = None):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._pending: Optional[Future] = None
+
+    def _prepare(self, question: Optional[str], base_inputs: Dict[str, str]) -> Optional[PreparedTurn]:
+        if not question:
+            return None
+        factory = self._factory or get_crew_factory()
+        inputs = {**base_inputs, 'job_position_report': question}
+        return PreparedTurn(question=question, crew=factory.feedback_crew(), inputs=inputs)
+
+    def prefetch(self, question: str, base_inputs: Dict[str, str]) -> None:
+        """Start preparing the feedback turn for a known question."""
+        with self._lock:
+            self._pending = _prefetch_executor.submit(
+                self._prepare, question, dict(base_inputs))
+
+    def prefetch_next(self, manager: InterviewManager, base_inputs: Dict[str, str]) -> None:
+        """Pick the next question from ``manager`` and prepare its turn."""
+        def pick_and_prepare() -> Optional[PreparedTurn]:
+            return self._prepare(manager.get_random_question(), base_inputs)
+
+        with self._lock:
+            self._pending = _prefetch_executor.submit(pick_and_prepare)
+
+    def next_turn(self) -> Optional[PreparedTurn]:
+        """Wait for the turn started by ``prefetch_next`` (None if no question)."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending.result() if pending is not None else None
+
+    def take(self, question: str, base_inputs: Dict[str, str]) -> PreparedTurn:
+        """Return the prepared turn for ``question``, building it if needed."""
+        with self._lock:
+            pending, self._pending = self._pending, None
+
+        if pending is not None:
+            try:
+                turn = pending.result()
+            except Exception as e:
+                print(f"Warning: feedback prefetch failed: {e}")
+                turn = None
+            expected = {**base_inputs, 'job_position_report': question}
+            if turn is not None and turn.question == question and turn.inputs == expected:
+                return turn
+
+        return self._prepare(question, base_inputs)
+
+
+# Numero massimo di chiamate di feedback contemporanee in modalità simulazione
+DEFAULT_FEEDBACK_WORKERS = 4
+
+
+@dataclass
+class GradedAnswer:
+    """Outcome of one feedback call in a batch."""
+    question: str
+    answer: str
+    feedback: Optional[str] = None
+    error: Optional[str] = None
+
+
+def grade_answers(answers: List[Tuple[str, str]], base_inputs: Dict[str, str],
+                  max_workers: int = DEFAULT_FEEDBACK_WORKERS,
+                  factory: Optional[CrewFactory] = None) -> List[GradedAnswer]:
+    """Run the feedback crews for all (question, answer) pairs concurrently.
+
+    Each pair gets its own crew copy; at most ``max_workers`` LLM calls run at
+    the same time. Results keep the order of ``answers``; a failed call is
+    reported in ``error`` without stopping the others.
+    """
+    factory = factory or get_crew_factory()
+
+    def grade(question: str, answer: str) -> GradedAnswer:
+        inputs = {**base_inputs, 'job_position_report': question, 'user_answer': answer}
+        try:
+            result = kickoff_with_retry(factory.feedback_crew(), inputs)
+            return GradedAnswer(question, answer, feedback=result.raw)
+        except Exception as e:
+            print(f"Error in feedback generation: {e}")
+            return GradedAnswer(question, answer, error=str(e))
+
+    if not answers:
+        return []
+
+    workers = max(1, min(max_workers, len(answers)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feedback-batch") as executor:
+        futures = [executor.submit(grade, question, answer) for question, answer in answers]
+        return [future.result() for future in futures]
+
+
+async def grade_answers_async(answers: List[Tuple[str, str]], base_inputs: Dict[str, str],
+                              max_concurrency: int = DEFAULT_FEEDBACK_WORKERS,
+                              factory: Optional[CrewFactory] = None) -> List[GradedAnswer]:
+    """Asyncio version of ``grade_answers`` for callers running an event loop."""
+    factory = factory or get_crew_factory()
+    results = await factory.prep().feedback_many(answers, base_inputs, max_concurrency)
+
+    graded = []
+    for (question, answer), result in zip(answers, results):
+        if isinstance(result, BaseException):
+            print(f"Error in feedback generation: {result}")
+            graded.append(GradedAnswer(question, answer, error=str(result) or type(result).__name__))
+        else:
+            graded.append(GradedAnswer(question, answer, feedback=result))
+    return graded
+
+
+def save_graded_answers(manager: InterviewManager, graded: List[GradedAnswer]) -> Optional[str]:
+    """Save every graded answer and return the feedback summary path."""
+    items = []
+    for question_num, item in enumerate(graded, start=1):
+        feedback = item.feedback if item.error is None else \
+            f"Si è verificato un errore durante la generazione del feedback: {item.error}"
+        items.append((question_num, item.question, item.answer, feedback))
+    manager.save_feedback_many(items)
+    return manager.generate_feedback_summary()
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import asyncio
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+from interview_prep.crew_factory import get_crew_factory
+from interview_prep.jobs import RESEARCH_INPUTS, get_job_runner
+from interview_prep.utils.interview_manager import InterviewManager
+from interview_prep.utils.schemas import Feedback, parse_output
+from interview_prep.utils.sessions import get_session_dir
+from interview_prep.utils.storage import get_store
+
+# Sessione usata dalle richieste che non ne indicano una
+DEFAULT_SESSION_ID = "api"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Dimensione massima del corpo di una richiesta JSON
+MAX_BODY_BYTES = 1024 * 1024
+
+REQUIRED_RESEARCH_FIELDS = ('company', 'interviewer', 'job_position', 'industry', 'job_description')
+REQUIRED_FEEDBACK_FIELDS = ('question', 'answer', 'company', 'interviewer', 'job_position', 'industry')
+
+
+class ServiceError(Exception):
+    """Error returned to the client with an HTTP status."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _require(body: Dict[str, Any], fields: Tuple[str, ...]) -> None:
+    missing = [field for field in fields if not str(body.get(field) or "").strip()]
+    if missing:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}")
+
+
+class InterviewPrepService:
+    """JSON API over the research jobs, the question banks and feedback.
+
+    Research runs as a background job (identical in-flight requests share
+    one crew run, across sessions); questions are read from the store;
+    feedback runs inline through the async crew API, with its timeout.
+    """
+
+    def __init__(self):
+        self.runner = get_job_runner()
+        self.store = get_store()
+
+    def _manager(self, session_id: str) -> InterviewManager:
+        return InterviewManager(output_dir=get_session_dir(session_id),
+                                store=self.store, session_id=session_id)
+
+    def submit_research(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Start (or join) a research job."""
+        _require(body, REQUIRED_RESEARCH_FIELDS)
+        session_id = body.get('session_id') or DEFAULT_SESSION_ID
+        inputs = {name: str(body.get(name) or "") for name in RESEARCH_INPUTS}
+        inputs['country'] = inputs['country'] or "Italy"
+
+        job_id = self.runner.submit_research(
+            inputs, get_session_dir(session_id),
+            force_refresh=bool(body.get('force_refresh')), session_id=session_id)
+        job = self.runner.get(job_id)
+        return {"job_id": job_id, "status": job["status"],
+                "coalesced": job.get("requests", 1) > 1}
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Return the state of a research job."""
+        job = self.runner.get(job_id)
+        if job is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+        job.pop("traceback", None)
+        # Le altre sessioni unite al job non riguardano il client
+        job.pop("joined", None)
+        if job.get("result"):
+            job["result"] = {key: value for key, value in job["result"].items()
+                             if key != "sessions"}
+        return job
+
+    def get_questions(self, job_position: Optional[str], session_id: Optional[str]) -> Dict[str, Any]:
+        """Return the questions generated for a job position."""
+        if not job_position:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Missing parameter: job_position")
+        manager = self._manager(session_id or DEFAULT_SESSION_ID)
+        if not manager.load_questions(job_position):
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No questions for position: {job_position}")
+        return {"job_position": job_position,
+                "questions": [{"text": text, **meta}
+                              for text, meta in zip(manager.questions, manager.question_meta)]}
+
+    def feedback(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate (and optionally save) the feedback on an answer."""
+        _require(body, REQUIRED_FEEDBACK_FIELDS)
+        base_inputs = {name: str(body[name])
+                       for name in ('company', 'interviewer', 'job_position', 'industry')}
+        try:
+            feedback = asyncio.run(get_crew_factory().prep().feedback(
+                str(body['question']), str(body['answer']), base_inputs))
+        except asyncio.TimeoutError:
+            raise ServiceError(HTTPStatus.GATEWAY_TIMEOUT, "Feedback generation timed out")
+
+        structured = parse_output(Feedback, feedback)
+        response = {"question": body['question'],
+                    "feedback": structured.to_markdown() if structured is not None else feedback}
+        if structured is not None:
+            response["feedback_sections"] = structured.model_dump()
+        if body.get('question_num') is not None:
+            manager = self._manager(body.get('session_id') or DEFAULT_SESSION_ID)
+            manager.save_feedback(int(body['question_num']), str(body['question']),
+                                  str(body['answer']), feedback)
+            response["question_num"] = int(body['question_num'])
+        return response
+
+
+def make_handler(service: InterviewPrepService):
+    """Build the request handler class bound to ``service``."""
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "InterviewPrep/0.1"
+
+        def _send_json(self, status: HTTPStatus, payload: Any) -> None:
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+            if not isinstance(body, dict):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+            return body
+
+        def _handle(self, method: str) -> None:
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split('/') if part]
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                if method == "GET" and parts == ["health"]:
+                    result, status = {"status": "ok"}, HTTPStatus.OK
+                elif method == "POST" and parts == ["research"]:
+                    result, status = service.submit_research(self._read_json()), HTTPStatus.ACCEPTED
+                elif method == "GET" and len(parts) == 2 and parts[0] == "research":
+                    result, status = service.get_job(parts[1]), HTTPStatus.OK
+                elif method == "GET" and parts == ["questions"]:
+                    result = service.get_questions(query.get("job_position"), query.get("session_id"))
+                    status = HTTPStatus.OK
+                elif method == "POST" and parts == ["feedback"]:
+                    result, status = service.feedback(self._read_json()), HTTPStatus.OK
+                else:
+                    raise ServiceError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+            except ServiceError as e:
+                self._send_json(e.status, {"error": str(e)})
+                return
+            except ValueError as e:
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+                return
+            except Exception as e:
+                traceback.print_exc()
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._send_json(status, result)
+
+        def do_GET(self) -> None:
+            self._handle("GET")
+
+        def do_POST(self) -> None:
+            self._handle("POST")
+
+    return Handler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Serve the JSON API until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(InterviewPrepService()))
+    server.daemon_threads = True
+    print(f"Interview prep service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+
+
+def run_service():
+    """Entry point: ``serve [port]`` (host and port also from SERVICE_HOST/SERVICE_PORT)."""
+    load_dotenv()
+    host = os.getenv("SERVICE_HOST", DEFAULT_HOST)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv("SERVICE_PORT", DEFAULT_PORT))
+    serve(host, port)
+
+
+if __name__ == "__main__":
+    run_service()
@@ -1,19 +1,283 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Type
+from crewai import Crew
 from crewai.tools import BaseTool
-from typing import Type
 from pydantic import BaseModel, Field
 
+KNOWLEDGE_DIR = "knowledge"
+OUTPUT_DIR = "output"
+RESEARCH_CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache", "research")
 
-class MyCustomToolInput(BaseModel):
-    """Input schema for MyCustomTool."""
-    argument: str = Field(..., description="Description of the argument.")
+KNOWLEDGE_EXTENSIONS = ('.md', '.txt')
+# Negli output si indicizzano solo i report di ricerca (non domande e feedback)
+REPORT_SUFFIX = "_report.md"
+# Indici per sessione tenuti in memoria (i meno usati di recente vengono scartati)
+MAX_SESSION_INDEXES = 16
 
-class MyCustomTool(BaseTool):
-    name: str = "Name of my tool"
+# Parametri standard di BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_CHUNK_CHARS = 1200
+DEFAULT_TOP_K = 4
+# Le sorgenti vengono riscandite al massimo ogni REFRESH_SECONDS
+REFRESH_SECONDS = 5.0
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset("""
+a ad al alla alle allo ai agli all che chi con da dal dalla dai de del della delle dei degli di e ed
+gli i il in la le lo nel nella nei negli non o per su sul sulla tra fra un una uno è sono come
+the of and or to in on at for by with is are was be an as from that this it its
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and single characters."""
+    return [token for token in _TOKEN_PATTERN.findall(text.casefold())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    """A passage of an indexed document."""
+    source: str
+    heading: str
+    text: str
+
+
+def split_chunks(source: str, text: str) -> List[Chunk]:
+    """Split a markdown/text document into passages of at most MAX_CHUNK_CHARS.
+
+    Passages never cross a heading, so each one keeps its section title.
+    """
+    chunks = []
+    heading = ""
+    buffer: List[str] = []
+
+    def flush():
+        if buffer:
+            chunks.append(Chunk(source, heading, "\n\n".join(buffer)))
+            buffer.clear()
+
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if paragraph.startswith('#'):
+            flush()
+            first_line, _, rest = paragraph.partition('\n')
+            heading = first_line.lstrip('#').strip()
+            paragraph = rest.strip()
+            if not paragraph:
+                continue
+        while len(paragraph) > MAX_CHUNK_CHARS:
+            flush()
+            cut = paragraph.rfind(' ', 0, MAX_CHUNK_CHARS)
+            cut = cut if cut > 0 else MAX_CHUNK_CHARS
+            buffer.append(paragraph[:cut])
+            flush()
+            paragraph = paragraph[cut:].strip()
+        if buffer and sum(len(part) for part in buffer) + len(paragraph) > MAX_CHUNK_CHARS:
+            flush()
+        buffer.append(paragraph)
+    flush()
+    return chunks
+
+
+class KnowledgeIndex:
+    """In-memory BM25 inverted index over local knowledge files and research reports.
+
+    Only the knowledge directory, the shared research cache and the reports
+    of ``session_dir`` (if given) are indexed: other sessions' outputs stay
+    private. Sources are rescanned lazily (at most every REFRESH_SECONDS);
+    only the files whose size or mtime changed are re-indexed.
+    """
+
+    def __init__(self, knowledge_dir: str = KNOWLEDGE_DIR,
+                 research_cache_dir: str = RESEARCH_CACHE_DIR,
+                 session_dir: Optional[str] = None):
+        self.knowledge_dir = knowledge_dir
+        self.research_cache_dir = research_cache_dir
+        self.session_dir = session_dir
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._files: Dict[str, Tuple[Tuple[int, int], List[int]]] = {}
+        self._chunks: Dict[int, Chunk] = {}
+        self._lengths: Dict[int, int] = {}
+        self._terms: Dict[int, Counter] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def _source_files(self) -> List[str]:
+        files = []
+        for root, _, names in os.walk(self.knowledge_dir):
+            files.extend(os.path.join(root, name) for name in names
+                         if name.endswith(KNOWLEDGE_EXTENSIONS))
+        if self.session_dir:
+            for root, dirs, names in os.walk(self.session_dir):
+                # Le cache (pagine, ricerche) non sono report
+                dirs[:] = [name for name in dirs if name != ".cache"]
+                files.extend(os.path.join(root, name) for name in names
+                             if name.endswith(REPORT_SUFFIX))
+        if os.path.isdir(self.research_cache_dir):
+            files.extend(os.path.join(self.research_cache_dir, name)
+                         for name in os.listdir(self.research_cache_dir) if name.endswith(".json"))
+        return files
+
+    @staticmethod
+    def _read(path: str) -> Tuple[str, str]:
+        """Return (source label, text) of a file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            if not path.endswith(".json"):
+                return path, f.read()
+            entry = json.load(f)
+        task_name = entry.get("metadata", {}).get("task", "research")
+        return f"research cache ({task_name})", entry.get("content") or ""
+
+    def _remove_file(self, path: str) -> None:
+        _, chunk_ids = self._files.pop(path)
+        for chunk_id in chunk_ids:
+            for term in self._terms.pop(chunk_id):
+                postings = self._postings[term]
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(chunk_id)
+            del self._chunks[chunk_id]
+
+    def _add_file(self, path: str, signature: Tuple[int, int]) -> None:
+        try:
+            source, text = self._read(path)
+        except (OSError, ValueError, UnicodeDecodeError):
+            return
+        # Il nome del file (es. "Acme_Srl_report.md") dice di chi parla il report
+        title = "" if path.endswith(".json") else \
+            os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+        chunk_ids = []
+        for chunk in split_chunks(source, text):
+            terms = Counter(tokenize(f"{title}\n{chunk.heading}\n{chunk.text}"))
+            if not terms:
+                continue
+            chunk_id = self._next_id
+            self._next_id += 1
+            self._chunks[chunk_id] = chunk
+            self._terms[chunk_id] = terms
+            self._lengths[chunk_id] = sum(terms.values())
+            self._total_length += self._lengths[chunk_id]
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[chunk_id] = count
+            chunk_ids.append(chunk_id)
+        self._files[path] = (signature, chunk_ids)
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-index new, changed and deleted source files."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < REFRESH_SECONDS:
+                return
+            seen = set()
+            for path in self._source_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                seen.add(path)
+                indexed = self._files.get(path)
+                if indexed is not None and indexed[0] == signature:
+                    continue
+                if indexed is not None:
+                    self._remove_file(path)
+                self._add_file(path, signature)
+            for path in [path for path in self._files if path not in seen]:
+                self._remove_file(path)
+            self._last_refresh = time.monotonic()
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[float, Chunk]]:
+        """Return the ``top_k`` passages best matching ``query`` (BM25)."""
+        self.refresh()
+        with self._lock:
+            if not self._chunks:
+                return []
+            count = len(self._chunks)
+            average_length = self._total_length / count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + \
+                        idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [(score, self._chunks[chunk_id]) for chunk_id, score in best]
+
+
+_indexes: "OrderedDict[Optional[str], KnowledgeIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index(session_dir: Optional[str] = None) -> KnowledgeIndex:
+    """Return the knowledge index of a session (shared sources only if None)."""
+    key = os.path.normpath(session_dir) if session_dir else None
+    with _index_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = KnowledgeIndex(session_dir=key)
+            while len(_indexes) > MAX_SESSION_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+        return index
+
+
+class LocalKnowledgeToolInput(BaseModel):
+    """Input schema for LocalKnowledgeTool."""
+    query: str = Field(..., description="Parole chiave da cercare (es. nome dell'azienda o della persona).")
+
+
+class LocalKnowledgeTool(BaseTool):
+    name: str = "Search local knowledge base"
     description: str = (
-        "Clear description for what this tool is useful for, your agent will need this information to use it."
+        "Cerca nella knowledge base locale e nei report di ricerca già prodotti "
+        "(aziende e intervistatori già analizzati). È immediata: usala prima di cercare sul web."
     )
-    args_schema: Type[BaseModel] = MyCustomToolInput
+    args_schema: Type[BaseModel] = LocalKnowledgeToolInput
+    top_k: int = DEFAULT_TOP_K
+    # Directory della sessione i cui report si possono consultare
+    session_dir: Optional[str] = None
+
+    def _run(self, query: str) -> str:
+        results = get_knowledge_index(self.session_dir).search(query, self.top_k)
+        if not results:
+            return "Nessun risultato nella knowledge base locale: cerca sul web."
+        return "\n\n---\n\n".join(
+            f"Fonte: {chunk.source}" + (f" — {chunk.heading}" if chunk.heading else "")
+            + f" (punteggio {score:.2f})\n{chunk.text}"
+            for score, chunk in results)
+
+
+def bind_session(crew: Crew, session_dir: Optional[str]) -> None:
+    """Point the LocalKnowledgeTool of a crew copy at ``session_dir``.
+
+    Crew copies share their tools with the template, so agents and tasks
+    get new tool lists with a session-bound copy of the tool.
+    """
+    def bound(tools):
+        return [tool.model_copy(update={"session_dir": session_dir})
+                if isinstance(tool, LocalKnowledgeTool) else tool
+                for tool in tools]
 
-    def _run(self, argument: str) -> str:
-        # Implementation goes here
-        return "this is an example of a tool output, ignore it and move along."
+    for crew_agent in crew.agents:
+        if crew_agent.tools:
+            crew_agent.tools = bound(crew_agent.tools)
+    for crew_task in crew.tasks:
+        if crew_task.tools:
+            crew_task.tools = bound(crew_task.tools)
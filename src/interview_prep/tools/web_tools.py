@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from urllib.parse import urlparse
+import requests
+from bs4 import BeautifulSoup
+from pydantic import Field
+from requests.adapters import HTTPAdapter
+from crewai_tools import SerperDevTool, ScrapeWebsiteTool
+from ..utils.content_extractor import DEFAULT_PAGE_TOKEN_BUDGET, extract_content
+from ..utils.research_cache import ResearchCache
+
+# I risultati di ricerca cambiano lentamente; le pagine scadono prima ma
+# vengono rivalidate con ETag/Last-Modified invece di essere riscaricate
+SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+PAGE_CACHE_TTL_SECONDS = 6 * 60 * 60
+MAX_CACHED_SEARCHES = 500
+MAX_CACHED_PAGES = 500
+
+# Limiti di frequenza (richieste al secondo e burst), sovrascrivibili da env
+SERPER_RATE_PER_SECOND = float(os.getenv("SERPER_RATE_PER_SECOND", "5"))
+SERPER_BURST = int(os.getenv("SERPER_BURST", "10"))
+SCRAPE_RATE_PER_SECOND = float(os.getenv("SCRAPE_RATE_PER_SECOND", "2"))
+SCRAPE_BURST = int(os.getenv("SCRAPE_BURST", "4"))
+
+HTTP_POOL_SIZE = 16
+SEARCH_TIMEOUT_SECONDS = 10
+SCRAPE_TIMEOUT_SECONDS = 15
+
+T = TypeVar('T')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SingleFlight:
+    """Run identical concurrent calls once and share the result."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        """Return ``func()``, or the result of the in-flight call with the same key."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_session: Optional[requests.Session] = None
+_search_cache: Optional[ResearchCache] = None
+_page_cache: Optional[ResearchCache] = None
+_serper_bucket = TokenBucket(SERPER_RATE_PER_SECOND, SERPER_BURST)
+_host_buckets: Dict[str, TokenBucket] = {}
+_inflight = SingleFlight()
+_shared_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide HTTP session (keep-alive connection pool)."""
+    global _session
+    if _session is None:
+        with _shared_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _get_caches() -> tuple:
+    global _search_cache, _page_cache
+    if _search_cache is None:
+        with _shared_lock:
+            if _search_cache is None:
+                _page_cache = ResearchCache(os.path.join("output", ".cache", "pages"),
+                                            ttl_seconds=PAGE_CACHE_TTL_SECONDS,
+                                            max_entries=MAX_CACHED_PAGES)
+                _search_cache = ResearchCache(os.path.join("output", ".cache", "search"),
+                                              ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+                                              max_entries=MAX_CACHED_SEARCHES)
+    return _search_cache, _page_cache
+
+
+def _host_bucket(url: str) -> TokenBucket:
+    """Rate limiter of the host serving ``url`` (one per host, to be polite)."""
+    host = urlparse(url).netloc.lower()
+    with _shared_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            bucket = _host_buckets[host] = TokenBucket(SCRAPE_RATE_PER_SECOND, SCRAPE_BURST)
+        return bucket
+
+
+def _page_key(url: str) -> str:
+    # Niente normalizzazione: il percorso di un URL distingue le maiuscole
+    return hashlib.sha256(f"page\x1f{url.strip()}".encode("utf-8")).hexdigest()
+
+
+def fetch_page(url: str, headers: Optional[Dict[str, str]] = None,
+               cookies: Optional[Dict[str, str]] = None, refresh: bool = False) -> str:
+    """Return the HTML of ``url`` through the shared page cache.
+
+    A fresh cached copy is returned as is; an expired one is revalidated
+    with If-None-Match/If-Modified-Since and reused on 304. Concurrent
+    fetches of the same URL share one request. Only 200 responses are
+    cached. With ``refresh`` the page is always downloaded again.
+    """
+    _, cache = _get_caches()
+    key = _page_key(url)
+    entry = None if refresh else cache.get_entry(key)
+    if entry is not None and cache.is_fresh(entry):
+        return entry["content"]
+
+    def download() -> str:
+        request_headers = dict(headers or {})
+        metadata = (entry or {}).get("metadata", {})
+        if metadata.get("etag"):
+            request_headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            request_headers["If-Modified-Since"] = metadata["last_modified"]
+
+        _host_bucket(url).acquire()
+        response = get_http_session().get(url, headers=request_headers, cookies=cookies or {},
+                                          timeout=SCRAPE_TIMEOUT_SECONDS)
+        if response.status_code == 304 and entry is not None:
+            # Pagina invariata: si rinnova solo la validità della copia
+            cache.set(key, entry["content"], metadata=metadata)
+            return entry["content"]
+
+        response.encoding = response.apparent_encoding
+        if response.status_code == 200:
+            metadata = {"url": url}
+            if response.headers.get("ETag"):
+                metadata["etag"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                metadata["last_modified"] = response.headers["Last-Modified"]
+            cache.set(key, response.text, metadata=metadata)
+        return response.text
+
+    return _inflight.do(key, download)
+
+
+def html_to_text(html: str) -> str:
+    """Plain text of an HTML page, whitespace collapsed like ScrapeWebsiteTool."""
+    text = BeautifulSoup(html, "html.parser").get_text(" ")
+    text = re.sub("[ \t]+", " ", text)
+    return re.sub("\\s+\n\\s+", "\n", text)
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool with a shared disk cache, pooled connections and rate limit.
+
+    Identical queries (same type, result count and locale) are answered
+    from the cache for a day; concurrent identical queries share one call.
+    With ``refresh`` the cache is bypassed but still updated.
+    """
+    refresh: bool = False
+
+    def _make_api_request(self, search_query: str, search_type: str) -> dict:
+        search_cache, _ = _get_caches()
+        key = search_cache.make_key("serper", [
+            search_type, search_query, str(self.n_results), self.country, self.location, self.locale])
+        cached = None if self.refresh else search_cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        def search() -> dict:
+            payload: Dict[str, Any] = {"q": search_query, "num": self.n_results}
+            if self.country:
+                payload["gl"] = self.country
+            if self.location:
+                payload["location"] = self.location
+            if self.locale:
+                payload["hl"] = self.locale
+
+            _serper_bucket.acquire()
+            response = get_http_session().post(
+                self._get_search_url(search_type),
+                headers={"X-API-KEY": os.environ["SERPER_API_KEY"],
+                         "content-type": "application/json"},
+                json=payload, timeout=SEARCH_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            results = response.json()
+            if not results:
+                raise ValueError("Empty response from Serper API")
+            search_cache.set(key, json.dumps(results), metadata={"query": search_query})
+            return results
+
+        return _inflight.do(key, search)
+
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """ScrapeWebsiteTool reading pages through the shared cache (see fetch_page).
+
+    Pages are trimmed by extract_content before reaching the agent: only
+    the sections most relevant to ``keywords`` are kept, within
+    ``max_page_tokens``. ``max_page_tokens=0`` returns the whole page text.
+    With ``refresh`` pages are downloaded again instead of read from the cache.
+    """
+    keywords: List[str] = Field(default_factory=list)
+    max_page_tokens: int = DEFAULT_PAGE_TOKEN_BUDGET
+    refresh: bool = False
+
+    def with_keywords(self, keywords: List[str]) -> "CachedScrapeWebsiteTool":
+        """Copy of the tool ranking page sections against ``keywords``."""
+        return self.model_copy(update={"keywords": [keyword for keyword in keywords if keyword]})
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        html = fetch_page(website_url, headers=self.headers, cookies=self.cookies,
+                          refresh=self.refresh)
+        if self.max_page_tokens <= 0:
+            return html_to_text(html)
+        return extract_content(html, self.keywords, self.max_page_tokens)
@@ -0,0 +1,168 @@
+import re
+import hashlib
+from dataclasses import dataclass, field
+from typing import Iterable, List, Set
+from bs4 import BeautifulSoup
+from .metrics import CHARS_PER_TOKEN
+
+# Token massimi di una pagina letta dall'agente di ricerca
+DEFAULT_PAGE_TOKEN_BUDGET = 1500
+
+# Elementi che non contengono mai contenuto utile
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe',
+                    'form', 'button', 'select', 'nav', 'footer', 'aside']
+# id/class tipici di menu, banner e widget
+BOILERPLATE_PATTERN = re.compile(
+    r'(^|[\s_-])(nav|navbar|menu|breadcrumbs?|footer|masthead|sidebar|cookies?|consent|banner|'
+    r'newsletter|subscribe|share|social|popup|modal|advert|ads?|promo|related|comments?|skip)'
+    r'($|[\s_-])', re.IGNORECASE)
+# Mai rimossi per id/class: contengono la pagina (es. <body class="has-sidebar">)
+CONTENT_ROOT_TAGS = ['html', 'body', 'main', 'article']
+# Un contenitore con più di questa quota del testo della pagina non è un widget
+MAX_BOILERPLATE_SHARE = 0.5
+# Elementi senza testo leggibile, tolti anche dal testo semplice di ripiego
+NON_TEXT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe']
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4']
+BLOCK_TAGS = HEADING_TAGS + ['h5', 'h6', 'p', 'li', 'td', 'th', 'blockquote', 'pre', 'dd', 'dt',
+                             'figcaption', 'summary']
+
+# Blocchi più corti (senza parole chiave) sono quasi sempre etichette o link
+MIN_BLOCK_WORDS = 5
+MIN_TERM_LENGTH = 3
+# Sotto questa lunghezza una sezione tagliata non dice più nulla
+MIN_TRUNCATED_CHARS = 200
+
+_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass
+class _Section:
+    """A heading and the blocks under it, in page order."""
+    position: int
+    heading: str = ""
+    blocks: List[str] = field(default_factory=list)
+    score: float = 0.0
+
+    def text(self) -> str:
+        lines = [f"## {self.heading}"] if self.heading else []
+        return "\n".join(lines + self.blocks)
+
+
+def keyword_terms(keywords: Iterable[str]) -> Set[str]:
+    """Lowercase terms of the keywords (short words are dropped)."""
+    return {word for keyword in keywords if keyword
+            for word in _WORD_PATTERN.findall(keyword.casefold())
+            if len(word) >= MIN_TERM_LENGTH}
+
+
+def _is_boilerplate(element) -> bool:
+    attrs = getattr(element, 'attrs', None) or {}
+    names = " ".join([attrs.get('id') or ""] + list(attrs.get('class') or []))
+    if attrs.get('role') in ('navigation', 'banner', 'contentinfo', 'dialog'):
+        return True
+    return bool(BOILERPLATE_PATTERN.search(names))
+
+
+def _text_length(element) -> int:
+    return sum(len(text) for text in element.stripped_strings)
+
+
+def _text_lines(element) -> List[tuple]:
+    """One (False, line) block per non-empty line of text."""
+    text = element.get_text("\n")
+    return [(False, " ".join(line.split())) for line in text.splitlines() if line.strip()]
+
+
+def _blocks(html: str) -> List[tuple]:
+    """(is_heading, text) blocks of the page, boilerplate removed."""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+    # L'euristica su id/class vale solo per contenitori piccoli: le classi dei
+    # wrapper (es. "enable-search-modal" sul body) non dicono nulla del contenuto
+    page_chars = _text_length(soup)
+    for element in soup.find_all(_is_boilerplate):
+        if element.decomposed or element.name in CONTENT_ROOT_TAGS:
+            continue
+        if element.find(CONTENT_ROOT_TAGS) is not None:
+            continue
+        if _text_length(element) > MAX_BOILERPLATE_SHARE * page_chars:
+            continue
+        element.decompose()
+
+    root = soup.find('main') or soup.find('article') or soup.body or soup
+    blocks = []
+    for element in root.find_all(BLOCK_TAGS):
+        # Solo i blocchi più interni: il testo dei contenitori sarebbe duplicato
+        if element.find(BLOCK_TAGS) is not None:
+            continue
+        text = " ".join(element.get_text(" ").split())
+        if text:
+            blocks.append((element.name in HEADING_TAGS, text))
+
+    if not blocks:
+        # Pagina senza struttura (o testo semplice): una riga per blocco
+        blocks = _text_lines(root)
+    if not blocks:
+        # Non è rimasto nulla: meglio il testo semplice della pagina che niente
+        soup = BeautifulSoup(html, "html.parser")
+        for element in soup.find_all(NON_TEXT_TAGS):
+            element.decompose()
+        blocks = _text_lines(soup)
+    return blocks
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(" ".join(_WORD_PATTERN.findall(text.casefold())).encode("utf-8")).hexdigest()
+
+
+def extract_content(html: str, keywords: Iterable[str] = (),
+                    max_tokens: int = DEFAULT_PAGE_TOKEN_BUDGET) -> str:
+    """Return the relevant text of a page within a token budget.
+
+    Boilerplate (navigation, banners, scripts, footers) is removed and
+    repeated blocks are kept once. The remaining sections, split at
+    headings, are ranked by how often they mention the keyword terms
+    (earlier sections win ties) and kept, in page order, until the budget
+    is spent. Without keywords the page is simply kept from the top.
+    """
+    terms = keyword_terms(keywords)
+    seen: Set[str] = set()
+    sections = [_Section(position=0)]
+
+    for is_heading, text in _blocks(html):
+        fingerprint = _fingerprint(text)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+
+        words = _WORD_PATTERN.findall(text.casefold())
+        hits = sum(1 for word in words if word in terms)
+        if is_heading:
+            sections.append(_Section(position=len(sections), heading=text, score=2.0 * hits))
+            continue
+        if len(words) < MIN_BLOCK_WORDS and not hits:
+            continue
+        section = sections[-1]
+        section.blocks.append(text)
+        section.score += hits
+
+    sections = [section for section in sections if section.blocks]
+    budget = max(1, max_tokens) * CHARS_PER_TOKEN
+    ranked = sorted(sections, key=lambda section: (-section.score, section.position))
+
+    kept = []
+    for section in ranked:
+        text = section.text()
+        if len(text) > budget:
+            if kept and (section.score == 0 or budget < MIN_TRUNCATED_CHARS):
+                continue
+            # Sezione troppo lunga: si tiene l'inizio, tagliato a fine parola
+            text = text[:budget].rsplit(" ", 1)[0] + " …"
+        kept.append((section.position, text))
+        budget -= len(text) + 2
+        if budget <= 0:
+            break
+
+    return "\n\n".join(text for _, text in sorted(kept))
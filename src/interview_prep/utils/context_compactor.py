@@ -0,0 +1,160 @@
+import os
+import re
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set
+from .content_extractor import keyword_terms
+from .metrics import CHARS_PER_TOKEN
+from .research_cache import DEFAULT_TTL_SECONDS, ResearchCache
+
+# Separatore usato da CrewAI tra gli output dei task nel context
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+_HEADING_PATTERN = re.compile(r'^\s{0,3}#{1,6}\s+')
+_LIST_ITEM_PATTERN = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+(?=[A-ZÀ-Ý0-9"“(])')
+_FACT_PATTERN = re.compile(r'\d')
+_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass
+class _Unit:
+    """A sentence or list item, with the heading of its section."""
+    position: int
+    heading: Optional[str]
+    text: str
+    score: float = 0.0
+
+
+def _units(text: str) -> List[_Unit]:
+    units: List[_Unit] = []
+    heading = None
+    first_in_section = True
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if _HEADING_PATTERN.match(line):
+            heading = line.strip()
+            first_in_section = True
+            continue
+        if _LIST_ITEM_PATTERN.match(line):
+            parts = [line.rstrip()]
+        else:
+            parts = _SENTENCE_PATTERN.split(line.strip())
+        for part in parts:
+            unit = _Unit(position=len(units), heading=heading, text=part)
+            # La prima frase di una sezione di solito ne riassume il contenuto
+            unit.score = 1.5 if first_in_section else 0.0
+            first_in_section = False
+            units.append(unit)
+    return units
+
+
+def compact_markdown(text: str, keywords: Iterable[str] = (), max_tokens: int = 1000) -> str:
+    """Extract the key facts of a markdown report within ``max_tokens``.
+
+    Sentences and list items are scored by keyword mentions, numbers and
+    dates (usually facts) and being first in their section; the best ones
+    are kept in their original order, under their section headings. Texts
+    already within the budget are returned unchanged.
+    """
+    budget = max(1, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= budget:
+        return text
+
+    terms: Set[str] = keyword_terms(keywords)
+    units = _units(text)
+    for unit in units:
+        words = _WORD_PATTERN.findall(unit.text.casefold())
+        unit.score += 2.0 * sum(1 for word in words if word in terms)
+        if _FACT_PATTERN.search(unit.text):
+            unit.score += 0.5
+        if len(words) < 4:
+            unit.score -= 1.0
+
+    selected: Set[int] = set()
+    headings: Set[str] = set()
+    used = 0
+    for unit in sorted(units, key=lambda unit: (-unit.score, unit.position)):
+        cost = len(unit.text) + 1
+        if unit.heading and unit.heading not in headings:
+            cost += len(unit.heading) + 2
+        if used + cost > budget:
+            continue
+        selected.add(unit.position)
+        if unit.heading:
+            headings.add(unit.heading)
+        used += cost
+
+    lines: List[str] = []
+    current_heading = None
+    for unit in units:
+        if unit.position not in selected:
+            continue
+        if unit.heading != current_heading:
+            current_heading = unit.heading
+            if unit.heading:
+                lines.extend(["", unit.heading] if lines else [unit.heading])
+        lines.append(unit.text)
+    return "\n".join(lines)
+
+
+class ContextCompactor:
+    """Compact upstream task outputs into a token budget, caching the results.
+
+    Compacted texts are stored in a ResearchCache next to the research
+    outputs, keyed by the hash of the original text, the budget and the
+    keywords, so cached and fresh research outputs share the same entry.
+    """
+
+    def __init__(self, cache: Optional[ResearchCache] = None):
+        self.cache = cache or ResearchCache(os.path.join("output", ".cache", "context"),
+                                            ttl_seconds=DEFAULT_TTL_SECONDS)
+
+    def compact(self, text: str, keywords: Iterable[str], max_tokens: int) -> str:
+        """Compact one output (see compact_markdown), through the cache."""
+        if len(text) <= max(1, max_tokens) * CHARS_PER_TOKEN:
+            return text
+        keywords = list(keywords)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        key = self.cache.make_key("context", [digest, str(max_tokens),
+                                              " ".join(sorted(keyword_terms(keywords)))])
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        compacted = compact_markdown(text, keywords, max_tokens)
+        self.cache.set(key, compacted, metadata={'tokens': str(max_tokens)})
+        return compacted
+
+    def compact_context(self, outputs: List[str], keywords: Iterable[str], max_tokens: int) -> str:
+        """Join the outputs as CrewAI does, with ``max_tokens`` shared among them.
+
+        Outputs shorter than their share leave the rest of it to the others.
+        """
+        keywords = list(keywords)
+        budgets = {}
+        remaining = max_tokens
+        # Dal più corto: quello che non usa passa agli output successivi
+        order = sorted(range(len(outputs)), key=lambda index: len(outputs[index]))
+        for position, index in enumerate(order):
+            share = remaining // (len(outputs) - position)
+            needed = -(-len(outputs[index]) // CHARS_PER_TOKEN)
+            budgets[index] = min(share, needed)
+            remaining -= budgets[index]
+        return CONTEXT_DIVIDER.join(self.compact(output, keywords, budgets[index])
+                                    for index, output in enumerate(outputs))
+
+
+_compactor: Optional[ContextCompactor] = None
+_compactor_lock = threading.Lock()
+
+
+def get_context_compactor() -> ContextCompactor:
+    """Return the process-wide ContextCompactor."""
+    global _compactor
+    if _compactor is None:
+        with _compactor_lock:
+            if _compactor is None:
+                _compactor = ContextCompactor()
+    return _compactor
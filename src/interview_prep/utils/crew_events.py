@@ -0,0 +1,254 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from crewai import Crew
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallCompletedEvent,
+    LLMCallFailedEvent,
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+    TaskCompletedEvent,
+    TaskFailedEvent,
+    TaskStartedEvent,
+    ToolUsageErrorEvent,
+    ToolUsageFinishedEvent,
+    ToolUsageStartedEvent,
+)
+from .resilience import kickoff_with_retry
+
+
+@dataclass
+class CrewEvent:
+    """A crew event routed to the run that produced it."""
+    kind: str
+    task_name: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+class _Watch:
+    def __init__(self, crew: Crew, callback: Callable[[CrewEvent], None]):
+        self.callback = callback
+        self.task_ids = {id(task) for task in crew.tasks}
+
+
+class CrewEventRouter:
+    """Route CrewAI's global event bus to per-run callbacks.
+
+    The event bus is process-wide, so concurrent sessions would see each
+    other's events. Task events are matched on the task objects of the
+    watched crew; LLM and tool events carry no task, so they are matched on
+    the thread that started the task (sync and async tasks run their LLM and
+    tool calls on the thread that executes them). A crew can be watched by
+    several callbacks at once (e.g. progress and metrics).
+
+    Event kinds: task_started, task_completed, task_failed, chunk,
+    llm_call_started, llm_call_completed, llm_call_failed, tool_started,
+    tool_finished, tool_error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._registered = False
+        self._watches: Dict[int, _Watch] = {}
+        # thread ident -> (task name, watches) del task in esecuzione
+        self._threads: Dict[int, Tuple[Optional[str], List[_Watch]]] = {}
+
+    def _register(self) -> None:
+        """Subscribe to the event bus once per process."""
+        with self._lock:
+            if self._registered:
+                return
+            crewai_event_bus.on(TaskStartedEvent)(self._on_task_started)
+            crewai_event_bus.on(TaskCompletedEvent)(self._on_task_completed)
+            crewai_event_bus.on(TaskFailedEvent)(self._on_task_failed)
+            crewai_event_bus.on(LLMStreamChunkEvent)(self._on_chunk)
+            crewai_event_bus.on(LLMCallStartedEvent)(self._on_llm_started)
+            crewai_event_bus.on(LLMCallCompletedEvent)(self._on_llm_completed)
+            crewai_event_bus.on(LLMCallFailedEvent)(self._on_llm_failed)
+            crewai_event_bus.on(ToolUsageStartedEvent)(self._on_tool_started)
+            crewai_event_bus.on(ToolUsageFinishedEvent)(self._on_tool_finished)
+            crewai_event_bus.on(ToolUsageErrorEvent)(self._on_tool_error)
+            self._registered = True
+
+    @contextmanager
+    def watch(self, crew: Crew, callback: Callable[[CrewEvent], None]) -> Iterator[None]:
+        """Deliver the events of ``crew`` to ``callback`` inside the block."""
+        self._register()
+        watch = _Watch(crew, callback)
+        with self._lock:
+            self._watches[id(watch)] = watch
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._watches.pop(id(watch), None)
+                for ident, (task_name, watches) in list(self._threads.items()):
+                    remaining = [owner for owner in watches if owner is not watch]
+                    if remaining:
+                        self._threads[ident] = (task_name, remaining)
+                    else:
+                        del self._threads[ident]
+
+    def _find_task_watches(self, task: Any) -> List[_Watch]:
+        with self._lock:
+            return [watch for watch in self._watches.values() if id(task) in watch.task_ids]
+
+    def _dispatch(self, watch: _Watch, event: CrewEvent) -> None:
+        try:
+            watch.callback(event)
+        except Exception as e:
+            # Un subscriber difettoso non deve interrompere l'esecuzione della crew
+            print(f"Warning: crew event callback failed: {e}")
+
+    def _on_task_started(self, source: Any, event: Any) -> None:
+        task = getattr(event, 'task', None) or source
+        watches = self._find_task_watches(task)
+        if not watches:
+            return
+        task_name = getattr(task, 'name', None)
+        with self._lock:
+            self._threads[threading.get_ident()] = (task_name, watches)
+        for watch in watches:
+            self._dispatch(watch, CrewEvent('task_started', task_name))
+
+    def _finish_task(self, source: Any, event: Any, kind: str, data: Dict[str, Any]) -> None:
+        task = getattr(event, 'task', None) or source
+        watches = self._find_task_watches(task)
+        if not watches:
+            return
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+        for watch in watches:
+            self._dispatch(watch, CrewEvent(kind, getattr(task, 'name', None), data))
+
+    def _on_task_completed(self, source: Any, event: Any) -> None:
+        self._finish_task(source, event, 'task_completed',
+                          {'output': getattr(event, 'output', None)})
+
+    def _on_task_failed(self, source: Any, event: Any) -> None:
+        self._finish_task(source, event, 'task_failed',
+                          {'error': getattr(event, 'error', None)})
+
+    def _dispatch_current(self, kind: str, data: Dict[str, Any]) -> None:
+        """Deliver an event to the watches of the task running on this thread."""
+        with self._lock:
+            current = self._threads.get(threading.get_ident())
+        if current is None:
+            return
+        task_name, watches = current
+        for watch in watches:
+            self._dispatch(watch, CrewEvent(kind, task_name, data))
+
+    def _on_chunk(self, source: Any, event: Any) -> None:
+        self._dispatch_current('chunk', {'chunk': event.chunk})
+
+    def _on_llm_started(self, source: Any, event: Any) -> None:
+        self._dispatch_current('llm_call_started', {
+            'model': getattr(source, 'model', None),
+            'messages': event.messages,
+        })
+
+    def _on_llm_completed(self, source: Any, event: Any) -> None:
+        self._dispatch_current('llm_call_completed', {
+            'model': getattr(source, 'model', None),
+            'response': event.response,
+        })
+
+    def _on_llm_failed(self, source: Any, event: Any) -> None:
+        self._dispatch_current('llm_call_failed', {
+            'model': getattr(source, 'model', None),
+            'error': event.error,
+        })
+
+    def _on_tool_started(self, source: Any, event: Any) -> None:
+        self._dispatch_current('tool_started', {
+            'tool_name': event.tool_name,
+            'agent_role': event.agent_role,
+        })
+
+    def _on_tool_finished(self, source: Any, event: Any) -> None:
+        self._dispatch_current('tool_finished', {
+            'tool_name': event.tool_name,
+            'agent_role': event.agent_role,
+            'duration': (event.finished_at - event.started_at).total_seconds(),
+            'from_cache': event.from_cache,
+        })
+
+    def _on_tool_error(self, source: Any, event: Any) -> None:
+        self._dispatch_current('tool_error', {
+            'tool_name': event.tool_name,
+            'agent_role': event.agent_role,
+            'error': event.error,
+        })
+
+
+_router: Optional[CrewEventRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_event_router() -> CrewEventRouter:
+    """Return the process-wide CrewEventRouter."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = CrewEventRouter()
+    return _router
+
+
+def enable_streaming(crew: Crew) -> None:
+    """Turn on token streaming for the LLMs of the crew's agents."""
+    for crew_agent in crew.agents:
+        llm = getattr(crew_agent, 'llm', None)
+        if llm is not None and hasattr(llm, 'stream'):
+            llm.stream = True
+
+
+def stream_kickoff(crew: Crew, inputs: Dict[str, Any],
+                   run: Optional[Callable[[], Any]] = None,
+                   on_complete: Optional[Callable[[Any], None]] = None,
+                   metrics_kind: Optional[str] = None) -> Iterator[CrewEvent]:
+    """Run a crew in a background thread and yield its events as they arrive.
+
+    ``run`` replaces the default ``kickoff_with_retry(crew, inputs)`` call (e.g.
+    to go through ``kickoff_research``). ``on_complete`` runs in the worker
+    thread with the result, so outputs are saved even if the caller stops
+    consuming the events. The last event is ``done`` (``data['result']``)
+    or ``error`` (``data['error']``). With ``metrics_kind`` the run's metrics
+    are collected and also added to ``done`` as ``data['metrics']``.
+    """
+    events: "queue.Queue[CrewEvent]" = queue.Queue()
+    enable_streaming(crew)
+    if run is None:
+        def run():
+            return kickoff_with_retry(crew, inputs)
+
+    def worker():
+        try:
+            metrics = None
+            if metrics_kind is None:
+                result = run()
+            else:
+                # Import locale: metrics dipende da questo modulo
+                from .metrics import collect_metrics
+                with collect_metrics(crew, metrics_kind) as collector:
+                    result = run()
+                metrics = collector.run
+            if on_complete is not None:
+                on_complete(result)
+            events.put(CrewEvent('done', data={'result': result, 'metrics': metrics}))
+        except Exception as e:
+            events.put(CrewEvent('error', data={'error': e}))
+
+    with get_event_router().watch(crew, events.put):
+        threading.Thread(target=worker, daemon=True).start()
+        while True:
+            event = events.get()
+            yield event
+            if event.kind in ('done', 'error'):
+                break
@@ -0,0 +1,31 @@
+import os
+import uuid
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+@contextmanager
+def atomic_open(path: str, encoding: str = 'utf-8') -> Iterator[IO[str]]:
+    """Open ``path`` for writing so readers never see a partial file.
+
+    Content goes to a temporary file in the same directory, which replaces
+    ``path`` only when the block completes; on error the original file is
+    left untouched.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, content: str, encoding: str = 'utf-8') -> None:
+    """Write ``content`` to ``path`` atomically."""
+    with atomic_open(path, encoding=encoding) as f:
+        f.write(content)
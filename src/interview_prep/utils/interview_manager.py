@@ -2,17 +2,55 @@ import os
 import re
 import json
 import random
-from typing import List, Dict, Optional, Set
+import shutil
+import hashlib
+import functools
+from typing import List, Dict, Optional, Set, Tuple
+from .question_parser import load_questions_file, parse_questions
+from .schemas import Feedback, QuestionList, parse_output
+from .fileio import atomic_open, atomic_write_text
+from .sessions import session_lock
+from .storage import REPORT_COMPANY, REPORT_INTERVIEWER, SQLiteStore
+
+# Append-only index of saved feedback, used to build the summary
+SUMMARY_INDEX_FILE = ".summary_index.jsonl"
+# Fingerprint of the feedback files included in the last summary
+SUMMARY_SIGNATURE_FILE = ".summary_signature"
+FEEDBACK_FILE_PATTERN = re.compile(r'^question_(\d+)_feedback\.md$')
+
+
+def _locked(method):
+    """Run a method while holding the lock of the manager's output directory."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with session_lock(self.output_dir):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class InterviewManager:
     """Manager for the interview process."""
 
-    def __init__(self, output_dir="output"):
+    def __init__(self, output_dir="output", seed: Optional[int] = None,
+                 store: Optional[SQLiteStore] = None, session_id: str = ""):
         self.output_dir = output_dir
+        # Optional database: saves are mirrored there and questions are
+        # looked up by key before falling back to the markdown files
+        self.store = store
+        self.session_id = session_id
         self.questions: List[str] = []
+        # Metadata for each question (e.g. category), parallel to self.questions
+        self.question_meta: List[Dict[str, str]] = []
         # Keep track of questions we've already asked
         self.asked_questions: Set[int] = set()
+        # Index of the last question returned by get_random_question
+        self.last_question_index: Optional[int] = None
+        # Sampling state: pools of not-yet-asked indices, grouped for weighting
+        self._rng = random.Random(seed)
+        self._weights: Optional[Dict[str, float]] = None
+        self._weight_by = "category"
+        self._pools: Optional[Dict[str, List[int]]] = None
+        self._pools_key = None
         os.makedirs(output_dir, exist_ok=True)
         os.makedirs(os.path.join(output_dir, "feedback"), exist_ok=True)
         os.makedirs(os.path.join(output_dir, ".session"), exist_ok=True)
@@ -29,8 +67,45 @@ class InterviewManager:
             sanitized = sanitized[:max_length]
         return sanitized
 
+    def _use_questions(self, questions: QuestionList, source: str) -> bool:
+        """Load the questions of a structured question list."""
+        self.questions = [q.text for q in questions.questions]
+        self.question_meta = [
+            {"category": q.category, "difficulty": q.difficulty} if q.category
+            else {"difficulty": q.difficulty} for q in questions.questions]
+        self.asked_questions = set()
+        self._pools = None
+        print(f"Loaded {len(self.questions)} questions from {source}")
+        return len(self.questions) > 0
+
     def load_questions(self, job_position: str) -> bool:
-        """Load questions from the markdown file."""
+        """Load questions from the store, the JSON file or the markdown file.
+
+        Structured question lists (JSON) are used as they are; markdown is
+        only parsed for reports saved before the structured format.
+        """
+        if self.store is not None:
+            structured = parse_output(
+                QuestionList, self.store.get_question_bank(job_position, session_id=self.session_id))
+            if structured is not None:
+                return self._use_questions(structured, "the store")
+            rows = self.store.get_questions(job_position, session_id=self.session_id)
+            if rows:
+                self.questions = [text for text, _ in rows]
+                self.question_meta = [
+                    {"category": category} if category else {} for _, category in rows]
+                self.asked_questions = set()
+                self._pools = None
+                print(f"Loaded {len(self.questions)} questions from the store")
+                return True
+
+        json_path = os.path.join(self.output_dir, self.sanitize_filename(f"{job_position}_questions.json"))
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                structured = parse_output(QuestionList, f.read())
+            if structured is not None:
+                return self._use_questions(structured, json_path)
+
         # Try both possible filename patterns
         possible_filenames = [
             self.sanitize_filename(f"{job_position}_questions.md"),
@@ -56,39 +131,23 @@ class InterviewManager:
             return False
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Parse questions from markdown using different patterns
-            # Try to match numbered list (1. Question), bullet points (- Question), and questions with headers or inside quotations
-            numbered_pattern = re.compile(r'^\d+\.\s+(.+)$', re.MULTILINE)
-            bullet_pattern = re.compile(r'^[-*]\s+(.+)$', re.MULTILINE)
-            quoted_pattern = re.compile(
-                r'["""]([^"""]+)["""]', re.MULTILINE)  # Match quoted questions
-
-            # Find all matches
-            numbered_matches = numbered_pattern.findall(content)
-            bullet_matches = bullet_pattern.findall(content)
-            quoted_matches = quoted_pattern.findall(content)
+            # Single pass over the file; the result is cached until it changes
+            parsed = load_questions_file(file_path)
 
             # Log results for debugging
-            print(f"Found {len(numbered_matches)} numbered questions")
-            print(f"Found {len(bullet_matches)} bullet point questions")
-            print(f"Found {len(quoted_matches)} quoted questions")
+            print(f"Found {len(parsed.numbered)} numbered questions")
+            print(f"Found {len(parsed.bullet)} bullet point questions")
+            print(f"Found {len(parsed.quoted)} quoted questions")
 
             # Use whichever pattern found more matches
-            if len(numbered_matches) >= max(len(bullet_matches), len(quoted_matches)):
-                self.questions = numbered_matches
-            elif len(bullet_matches) >= len(quoted_matches):
-                self.questions = bullet_matches
-            else:
-                self.questions = quoted_matches
-
-            # Filter out empty questions and trim whitespace
-            self.questions = [q.strip() for q in self.questions if q.strip()]
+            selected = parsed.best()
+            self.questions = [q.text for q in selected]
+            self.question_meta = [
+                {"category": q.category} if q.category else {} for q in selected]
 
             # Reset asked questions
             self.asked_questions = set()
+            self._pools = None
 
             print(f"Loaded {len(self.questions)} questions from {file_path}")
             return len(self.questions) > 0
@@ -96,110 +155,269 @@ class InterviewManager:
             print(f"Error loading questions: {e}")
             return False
 
+    def configure_sampling(self, seed: Optional[int] = None,
+                           weights: Optional[Dict[str, float]] = None,
+                           weight_by: str = "category") -> None:
+        """Configure how get_random_question draws questions.
+
+        Args:
+            seed: Seed for reproducible sessions (None for a random one)
+            weights: Relative weight of each group of questions; groups not
+                listed weigh 1.0. None draws uniformly among all questions.
+            weight_by: Metadata key that defines the groups (e.g. "category"
+                or "difficulty")
+        """
+        self._rng = random.Random(seed)
+        self._weights = weights
+        self._weight_by = weight_by
+        self._pools = None
+
+    def _build_pools(self) -> None:
+        """Rebuild the pools of not-yet-asked question indices."""
+        self._pools = {}
+        for i in range(len(self.questions)):
+            if i in self.asked_questions:
+                continue
+            group = ""
+            if self._weights:
+                meta = self.question_meta[i] if i < len(self.question_meta) else {}
+                group = meta.get(self._weight_by, "")
+            self._pools.setdefault(group, []).append(i)
+        self._pools_key = (id(self.questions), len(self.questions), id(self.asked_questions))
+
+    def _pools_in_sync(self) -> bool:
+        """Check the pools still match questions and asked_questions.
+
+        Both lists can be replaced from outside (the Streamlit app syncs them
+        from the session state), in which case the pools are rebuilt.
+        """
+        if self._pools is None:
+            return False
+        if self._pools_key != (id(self.questions), len(self.questions), id(self.asked_questions)):
+            return False
+        remaining = sum(len(pool) for pool in self._pools.values())
+        return remaining == len(self.questions) - len(self.asked_questions)
+
     def get_random_question(self) -> Optional[str]:
-        """Get a random question that hasn't been asked yet."""
+        """Get a random question that hasn't been asked yet.
+
+        Draws in O(1) from pools of remaining indices (swap-remove), so
+        duplicate question texts are tracked by index, not by value.
+        """
         if not self.questions:
             return None
 
-        # Create a list of available questions (not yet asked)
-        available_questions = [q for i, q in enumerate(self.questions)
-                               if i not in self.asked_questions]
+        if not self._pools_in_sync():
+            self._build_pools()
 
-        if not available_questions:
+        groups = [group for group, pool in self._pools.items() if pool]
+        if not groups:
             print("All questions have been asked!")
             return None
 
-        # Select a random question from available ones
-        question = random.choice(available_questions)
+        # Scegli prima il gruppo (pesato) e poi una domanda uniforme al suo interno
+        group = groups[0]
+        if len(groups) > 1:
+            weights = [self._weights.get(g, 1.0) for g in groups] if self._weights else None
+            if weights is None or sum(weights) <= 0:
+                weights = [len(self._pools[g]) for g in groups]
+            group = self._rng.choices(groups, weights=weights)[0]
+
+        pool = self._pools[group]
+        position = self._rng.randrange(len(pool))
+        pool[position], pool[-1] = pool[-1], pool[position]
+        question_index = pool.pop()
 
-        # Find the index of this question in the original list to track it
-        question_index = self.questions.index(question)
         self.asked_questions.add(question_index)
+        self.last_question_index = question_index
 
-        return question
+        return self.questions[question_index]
 
     def get_all_questions(self) -> List[str]:
         """Get all loaded questions."""
         return self.questions
 
+    @_locked
     def save_company_report(self, content: str, company: str) -> str:
         """Save the company research report."""
         file_name = self.sanitize_filename(f"{company}_report.md")
         file_path = os.path.join(self.output_dir, file_name)
 
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with atomic_open(file_path) as f:
             f.write(content)
 
+        if self.store is not None:
+            self.store.save_report(REPORT_COMPANY, company, content, self.session_id)
+
         print(f"Company report saved to {file_path}")
         return file_path
 
+    @_locked
     def save_interviewer_report(self, content: str, interviewer: str) -> str:
         """Save the interviewer research report."""
         file_name = self.sanitize_filename(f"{interviewer}_report.md")
         file_path = os.path.join(self.output_dir, file_name)
 
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with atomic_open(file_path) as f:
             f.write(content)
 
+        if self.store is not None:
+            self.store.save_report(REPORT_INTERVIEWER, interviewer, content, self.session_id)
+
         print(f"Interviewer report saved to {file_path}")
         return file_path
 
+    @_locked
     def save_questions(self, content: str, job_position: str) -> str:
-        """Save the interview questions."""
+        """Save the interview questions.
+
+        A structured question list (JSON) is saved as is, next to the
+        markdown rendered from it; free-text reports are saved unchanged.
+        """
         file_name = self.sanitize_filename(f"{job_position}_questions.md")
         file_path = os.path.join(self.output_dir, file_name)
+        json_path = os.path.join(self.output_dir, self.sanitize_filename(f"{job_position}_questions.json"))
+        structured = parse_output(QuestionList, content)
 
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if structured is not None:
+            content = structured.model_dump_json()
+            atomic_write_text(json_path, content)
+            questions = [(q.text, q.category) for q in structured.questions]
+        else:
+            # Un JSON rimasto da un salvataggio precedente avrebbe la precedenza in load_questions
+            if os.path.exists(json_path):
+                os.remove(json_path)
+            questions = [(q.text, q.category) for q in parse_questions(content.splitlines()).best()]
+
+        with atomic_open(file_path) as f:
+            f.write(structured.to_markdown() if structured is not None else content)
+
+        if self.store is not None:
+            self.store.save_question_bank(job_position, content, questions, self.session_id)
 
         print(f"Questions saved to {file_path}")
         return file_path
 
+    @_locked
     def save_feedback(self, question_num: int, question: str, answer: str, feedback: str) -> str:
         """Save feedback for a question."""
+        file_path = self._write_feedback_file(question_num, question, answer, feedback)
+        if self.store is not None:
+            self.store.save_feedback(question_num, question, answer, feedback, self.session_id)
+
+        print(f"Feedback saved to {file_path}")
+        return file_path
+
+    @_locked
+    def save_feedback_many(self, items: List[Tuple[int, str, str, str]]) -> List[str]:
+        """Save several (question_num, question, answer, feedback) items.
+
+        The store, if any, receives all of them in a single bulk insert.
+        """
+        paths = [self._write_feedback_file(*item) for item in items]
+        if self.store is not None:
+            self.store.save_feedback_many(items, self.session_id)
+
+        print(f"Saved {len(paths)} feedback files to {os.path.join(self.output_dir, 'feedback')}")
+        return paths
+
+    def _write_feedback_file(self, question_num: int, question: str, answer: str, feedback: str) -> str:
+        """Write the markdown file for one feedback and index it."""
         feedback_dir = os.path.join(self.output_dir, "feedback")
         os.makedirs(feedback_dir, exist_ok=True)
 
         file_name = f"question_{question_num}_feedback.md"
         file_path = os.path.join(feedback_dir, file_name)
 
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with atomic_open(file_path) as f:
             # Title includes the actual question
             f.write(f"# Domanda {question_num}: {question}\n\n")
             f.write(f"**La tua risposta:**\n\n{answer}\n\n")
 
-            # Process the feedback based on its format
-            if feedback.startswith("1."):
-                # If feedback is in a numbered list format (1., 2., etc.)
-                import re
-                sections = re.split(r'\d+\.\s+', feedback)
-
-                # Remove empty first section if it exists
-                if sections and not sections[0].strip():
-                    sections = sections[1:]
-
-                # Map the sections to appropriate headers
-                section_titles = [
-                    "Punti di forza",
-                    "Aree di miglioramento",
-                    "Suggerimenti specifici",
-                    "Approcci alternativi"
-                ]
-
-                f.write("## Feedback\n\n")
-
-                # Write each section with appropriate header
-                for i, (title, content) in enumerate(zip(section_titles, sections)):
-                    if content.strip():
-                        f.write(f"### {title}\n")
-                        f.write(content.strip() + "\n\n")
+            structured = parse_output(Feedback, feedback)
+            if structured is not None:
+                f.write(f"## Feedback\n\n{structured.to_markdown()}")
             else:
-                # If feedback is already structured or in a different format, keep it as is
+                # Feedback in testo libero (es. messaggi di errore), scritto così com'è
                 f.write(f"## Feedback\n\n{feedback}\n")
 
-        print(f"Feedback saved to {file_path}")
+        self._append_summary_index(feedback_dir, question_num, question, file_name)
         return file_path
 
+    def _append_summary_index(self, feedback_dir: str, question_num: int,
+                              question: str, file_name: str) -> None:
+        """Record a saved feedback file in the append-only summary index."""
+        stat = os.stat(os.path.join(feedback_dir, file_name))
+        entry = {
+            "question_num": question_num,
+            "question": question,
+            "file": file_name,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        with open(os.path.join(feedback_dir, SUMMARY_INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _load_summary_entries(self, feedback_dir: str) -> List[Dict]:
+        """Return the feedback files to summarize, sorted by question number.
+
+        Titles come from the summary index; only files missing from it (or
+        changed since they were indexed) are opened to read their title, and
+        those are appended to the index so the next summary won't open them.
+        """
+        indexed: Dict[str, Dict] = {}
+        index_lines = 0
+        index_path = os.path.join(feedback_dir, SUMMARY_INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    index_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # riga troncata da una scrittura interrotta
+                    # Una domanda salvata di nuovo sostituisce la voce precedente
+                    indexed[entry["file"]] = entry
+
+        entries = []
+        repaired = []
+        with os.scandir(feedback_dir) as it:
+            for dir_entry in it:
+                match = FEEDBACK_FILE_PATTERN.match(dir_entry.name)
+                if not match or not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+                entry = indexed.get(dir_entry.name)
+                if entry is None or entry.get("mtime_ns") != stat.st_mtime_ns \
+                        or entry.get("size") != stat.st_size:
+                    with open(dir_entry.path, 'r', encoding='utf-8') as qf:
+                        first_line = qf.readline().strip()
+                    question = first_line[first_line.find(":")+1:].strip() \
+                        if first_line.startswith("# Domanda") else None
+                    entry = {
+                        "question_num": int(match.group(1)),
+                        "question": question,
+                        "file": dir_entry.name,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                    }
+                    repaired.append(entry)
+                entries.append(entry)
+
+        if index_lines + len(repaired) > 2 * len(entries) + 32:
+            # Compact the index: keep only the entries of the current files
+            with atomic_open(index_path) as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        elif repaired:
+            with open(index_path, 'a', encoding='utf-8') as f:
+                for entry in repaired:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        entries.sort(key=lambda entry: entry["question_num"])
+        return entries
+
+    @_locked
     def generate_feedback_summary(self) -> str:
         """Generate a summary of all feedback files.
 
@@ -213,50 +431,45 @@ class InterviewManager:
             print(f"Feedback directory not found: {feedback_dir}")
             return None
 
-        # Get all question feedback files
-        feedback_files = []
-        for file in os.listdir(feedback_dir):
-            if file.startswith("question_") and file.endswith("_feedback.md"):
-                feedback_files.append(file)
+        feedback_entries = self._load_summary_entries(feedback_dir)
 
-        if not feedback_files:
+        if not feedback_entries:
             print("No feedback files found to summarize")
             return None
 
-        # Sort files by question number
-        feedback_files.sort(key=lambda x: int(x.split('_')[1]))
-
-        # Write the summary file
-        with open(summary_file, 'w', encoding='utf-8') as f:
+        # Nothing changed since the last summary: keep the existing file
+        signature = hashlib.sha256(json.dumps(
+            [[e["file"], e["question"], e["mtime_ns"], e["size"]] for e in feedback_entries]
+        ).encode('utf-8')).hexdigest()
+        signature_file = os.path.join(feedback_dir, SUMMARY_SIGNATURE_FILE)
+        if os.path.exists(summary_file) and os.path.exists(signature_file):
+            with open(signature_file, 'r', encoding='utf-8') as f:
+                if f.read().strip() == signature:
+                    print(f"Feedback summary is up to date at {summary_file}")
+                    return summary_file
+
+        # Write the summary file (to a temporary file, swapped in at the end)
+        with atomic_open(summary_file) as f:
             # Header
             f.write("# Riepilogo del Feedback - Simulazione di Colloquio\n\n")
 
-            # Table of contents
+            # Table of contents, from the index: no feedback file is opened here
             f.write("## Indice\n\n")
-            for i, file in enumerate(feedback_files):
-                # Extract question from filename
-                with open(os.path.join(feedback_dir, file), 'r', encoding='utf-8') as qf:
-                    first_line = qf.readline().strip()
-                    if first_line.startswith("# Domanda"):
-                        question = first_line[first_line.find(":")+1:].strip()
-                    else:
-                        question = f"Domanda {i+1}"
-
+            for i, entry in enumerate(feedback_entries):
+                question = entry["question"] or f"Domanda {i+1}"
                 # Create TOC entry with link
                 f.write(f"{i+1}. [{question}](#domanda-{i+1})\n")
 
             f.write("\n---\n\n")
 
-            # Compile all feedback
-            for i, file in enumerate(feedback_files):
-                file_path = os.path.join(feedback_dir, file)
-
-                with open(file_path, 'r', encoding='utf-8') as qf:
-                    content = qf.read()
+            # Compile all feedback, streaming each file once
+            for i, entry in enumerate(feedback_entries):
+                file_path = os.path.join(feedback_dir, entry["file"])
 
                 # Add anchor for the TOC link
                 f.write(f"<a id='domanda-{i+1}'></a>\n")
-                f.write(content)
+                with open(file_path, 'r', encoding='utf-8') as qf:
+                    shutil.copyfileobj(qf, f)
                 f.write("\n\n---\n\n")
 
             # Conclusion with general tips
@@ -270,5 +483,7 @@ class InterviewManager:
             f.write(
                 "5. **Mostra entusiasmo**: Comunica la tua passione per il ruolo e la missione dell'azienda.\n")
 
+        atomic_write_text(signature_file, signature)
+
         print(f"Feedback summary generated at {summary_file}")
         return summary_file
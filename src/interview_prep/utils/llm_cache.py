@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+from crewai import BaseLLM
+
+DEFAULT_MAX_ENTRIES = 1000
+# Soglia usata con INTERVIEW_LLM_CACHE_SIMILARITY=on (di default il confronto è solo esatto)
+DEFAULT_SEMANTIC_THRESHOLD = 0.92
+# Oltre questa lunghezza due risposte simili possono dire cose diverse: solo confronto esatto
+MAX_SEMANTIC_WORDS = 20
+EMBEDDING_DIMENSIONS = 512
+POLICIES = ("lru", "lfu")
+
+# Parte "semantica" dei prompt: la risposta dell'utente nel feedback_task
+# (vedi tasks.yaml). Il resto del prompt deve coincidere esattamente.
+FEEDBACK_ANSWER_PATTERN = re.compile(
+    r"Risposta dell'utente: (.*?)\s*\n\s*Fornisci un feedback", re.DOTALL)
+
+_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Parole che cambiano il senso di una risposta: devono coincidere perché due
+# risposte siano confrontate per similarità ("Sì, l'ho fatto" / "No, non l'ho fatto")
+POLARITY_WORDS = frozenset("""
+sì si no non mai nessun nessuno nessuna niente nulla né
+yes not never none nothing neither nor
+""".split())
+
+
+def embed_text(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """Normalized hashed bag-of-words embedding (words and word bigrams).
+
+    Computed locally with a stable hash, so vectors are comparable across
+    processes. Good enough to match short or templated answers that differ
+    only in case, punctuation or a word or two.
+    """
+    words = _WORD_PATTERN.findall(text.casefold())
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    vector = [0.0] * dimensions
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+def _cosine(first: List[float], second: List[float]) -> float:
+    return sum(a * b for a, b in zip(first, second))
+
+
+@dataclass
+class _Entry:
+    response: str
+    scope: Optional[str] = None
+    vector: Optional[List[float]] = None
+    hits: int = 0
+    last_used: float = 0.0
+
+
+class LLMResponseCache:
+    """Bounded in-memory cache of LLM responses, shared by every crew of the process.
+
+    Lookups are exact on the rendered messages plus the model parameters.
+    When ``semantic_threshold`` is set and a prompt matches one of
+    ``semantic_patterns``, a short captured text (e.g. the user's answer, at
+    most MAX_SEMANTIC_WORDS words) is also compared by embedding similarity
+    with the cached prompts whose remaining text and negations are
+    identical, and a response is reused above the threshold.
+    Beyond ``max_entries`` the least recently (``lru``) or least frequently
+    (``lfu``) used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, policy: str = "lru",
+                 semantic_threshold: Optional[float] = None,
+                 semantic_patterns: Sequence[Pattern] = (FEEDBACK_ANSWER_PATTERN,)):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy: {policy} (use one of {', '.join(POLICIES)})")
+        self.max_entries = max(1, max_entries)
+        self.policy = policy
+        self.semantic_threshold = semantic_threshold
+        self.semantic_patterns = list(semantic_patterns)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._scopes: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def exact_key(params: Dict[str, Any], messages: List[Dict[str, Any]]) -> str:
+        """Key of a call: model parameters plus every message."""
+        payload = json.dumps({"params": params, "messages": messages},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _semantic_parts(self, params: Dict[str, Any],
+                        messages: List[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        """(scope key, semantic text) of a prompt, None if no pattern matches."""
+        if self.semantic_threshold is None:
+            return None
+        for pattern in self.semantic_patterns:
+            for index, message in enumerate(messages):
+                content = str(message.get("content") or "")
+                match = pattern.search(content)
+                if match is None:
+                    continue
+                words = _WORD_PATTERN.findall(match.group(1).casefold())
+                if len(words) > MAX_SEMANTIC_WORDS:
+                    return None
+                # Lo scope è il prompt con il testo semantico tolto, più le sue negazioni
+                masked = content[:match.start(1)] + "\x00" + content[match.end(1):]
+                scoped = messages[:index] + [{**message, "content": masked}] + messages[index + 1:]
+                polarity = sorted(set(words) & POLARITY_WORDS)
+                return self.exact_key({**params, "pattern": pattern.pattern, "polarity": polarity},
+                                      scoped), match.group(1)
+        return None
+
+    def get(self, params: Dict[str, Any], messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Return a cached response for the call, exact or semantic."""
+        key = self.exact_key(params, messages)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return self._touch(key, entry)
+
+        parts = self._semantic_parts(params, messages)
+        if parts is not None:
+            scope, text = parts
+            vector = embed_text(text)
+            with self._lock:
+                best_key, best_score = None, self.semantic_threshold
+                for candidate in self._scopes.get(scope, []):
+                    score = _cosine(vector, self._entries[candidate].vector)
+                    if score >= best_score:
+                        best_key, best_score = candidate, score
+                if best_key is not None:
+                    self.stats["semantic_hits"] += 1
+                    return self._touch(best_key, self._entries[best_key])
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _touch(self, key: str, entry: _Entry) -> str:
+        entry.hits += 1
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(key)
+        return entry.response
+
+    def set(self, params: Dict[str, Any], messages: List[Dict[str, Any]], response: str) -> None:
+        """Store the response of a call, evicting entries beyond ``max_entries``."""
+        key = self.exact_key(params, messages)
+        entry = _Entry(response=response, last_used=time.monotonic())
+        parts = self._semantic_parts(params, messages)
+        if parts is not None:
+            entry.scope, text = parts
+            entry.vector = embed_text(text)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            if entry.scope is not None:
+                self._scopes.setdefault(entry.scope, []).append(key)
+            while len(self._entries) > self.max_entries:
+                if self.policy == "lru":
+                    victim = next(iter(self._entries))
+                else:
+                    # La voce appena inserita non ha ancora avuto occasione di essere usata
+                    victim = min((k for k in self._entries if k != key),
+                                 key=lambda k: (self._entries[k].hits, self._entries[k].last_used))
+                self._remove(victim)
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if entry.scope is not None:
+            keys = self._scopes.get(entry.scope, [])
+            if key in keys:
+                keys.remove(key)
+            if not keys:
+                self._scopes.pop(entry.scope, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachedLLM(BaseLLM):
+    """LLM wrapper answering repeated prompts from an LLMResponseCache.
+
+    Calls with function calling (``available_functions``) always go to the
+    wrapped LLM. Stop words and streaming are those of the wrapped LLM; a
+    copy of the wrapper (as made by ``Agent.copy()``) copies the wrapped LLM
+    too, so per-agent settings never leak between crews. With ``refresh``
+    every call goes to the wrapped LLM and its response replaces the cached one.
+    """
+
+    def __init__(self, llm: Any, cache: LLMResponseCache, refresh: bool = False):
+        self.llm = llm
+        self.cache = cache
+        self.refresh = refresh
+        stop = llm.stop
+        super().__init__(model=llm.model, temperature=getattr(llm, 'temperature', None))
+        # BaseLLM azzera stop, che qui è quello dell'LLM avvolto
+        self.llm.stop = stop
+
+    # stop e stream vengono impostati da CrewAI e da enable_streaming sull'LLM dell'agente
+    @property
+    def stop(self) -> List[str]:
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value: List[str]) -> None:
+        self.llm.stop = value
+
+    @property
+    def stream(self) -> bool:
+        return getattr(self.llm, 'stream', False)
+
+    @stream.setter
+    def stream(self, value: bool) -> None:
+        if hasattr(self.llm, 'stream'):
+            self.llm.stream = value
+
+    def __copy__(self) -> "CachedLLM":
+        return CachedLLM(copy(self.llm), self.cache, self.refresh)
+
+    def _params(self) -> Dict[str, Any]:
+        return {
+            "model": self.llm.model,
+            "temperature": getattr(self.llm, 'temperature', None),
+            "top_p": getattr(self.llm, 'top_p', None),
+            "max_tokens": getattr(self.llm, 'max_tokens', None),
+            "stop": sorted(self.llm.stop or []),
+        }
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        if available_functions:
+            return self.llm.call(messages, tools=tools, callbacks=callbacks,
+                                 available_functions=available_functions)
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        params = {**self._params(), "tools": tools}
+        cached = None if self.refresh else self.cache.get(params, messages)
+        if cached is not None:
+            return cached
+
+        response = self.llm.call(messages, tools=tools, callbacks=callbacks)
+        if isinstance(response, str) and response.strip():
+            self.cache.set(params, messages, response)
+        return response
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the process-wide response cache, None if disabled.
+
+    Configured by INTERVIEW_LLM_CACHE ("off" disables it),
+    INTERVIEW_LLM_CACHE_SIZE, INTERVIEW_LLM_CACHE_POLICY (lru or lfu) and
+    INTERVIEW_LLM_CACHE_SIMILARITY (a threshold, or "on" for the default
+    one, enables matching of short near-duplicate answers; exact matches
+    only when unset).
+    """
+    global _cache
+    if os.getenv("INTERVIEW_LLM_CACHE", "on").lower() in ("off", "0", "false", "no"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                similarity = os.getenv("INTERVIEW_LLM_CACHE_SIMILARITY", "off").lower()
+                if similarity in ("off", "none", "0", "false", "no", ""):
+                    threshold = None
+                elif similarity in ("on", "true", "yes"):
+                    threshold = DEFAULT_SEMANTIC_THRESHOLD
+                else:
+                    threshold = float(similarity)
+                _cache = LLMResponseCache(
+                    max_entries=int(os.getenv("INTERVIEW_LLM_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+                    policy=os.getenv("INTERVIEW_LLM_CACHE_POLICY", "lru").lower(),
+                    semantic_threshold=threshold)
+    return _cache
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from crewai import Crew
+from .crew_events import CrewEvent, get_event_router
+from .fileio import atomic_write_text
+
+DEFAULT_METRICS_DIR = os.path.join("output", ".metrics")
+
+# Prezzi in dollari per 1K token (prompt, completion); i modelli non in
+# elenco hanno costo stimato 0. Aggiornare quando cambiano i listini.
+MODEL_PRICES_PER_1K: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4.1-mini": (0.0004, 0.0016),
+    "gpt-4.1": (0.002, 0.008),
+}
+
+# Stima grossolana usata quando il provider non riporta i token per chiamata
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(content: Any) -> int:
+    """Rough token count of a prompt (string or message list) or response."""
+    if content is None:
+        return 0
+    if isinstance(content, list):
+        return sum(estimate_tokens(message.get("content") if isinstance(message, dict) else message)
+                   for message in content)
+    return len(str(content)) // CHARS_PER_TOKEN
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated cost in dollars of the given token counts on ``model``."""
+    name = (model or "").split("/")[-1]
+    # Il nome più lungo che corrisponde vince (gpt-4o-mini prima di gpt-4o)
+    for prefix in sorted(MODEL_PRICES_PER_1K, key=len, reverse=True):
+        if name.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICES_PER_1K[prefix]
+            return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+    return 0.0
+
+
+@dataclass
+class ToolMetrics:
+    """Calls made by a task to one tool."""
+    calls: int = 0
+    errors: int = 0
+    cached: int = 0
+    total_s: float = 0.0
+
+
+@dataclass
+class TaskMetrics:
+    """Timing, LLM and tool usage of one task in a crew run.
+
+    Token counts are estimated from prompt and response sizes; the run's
+    exact totals, when the provider reports them, are in RunMetrics.usage.
+    """
+    task_name: str
+    agent: str = ""
+    status: str = "pending"
+    queued_s: float = 0.0
+    wall_s: float = 0.0
+    llm_calls: int = 0
+    llm_errors: int = 0
+    llm_s: float = 0.0
+    model: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    tool_calls: int = 0
+    tool_s: float = 0.0
+    tools: Dict[str, ToolMetrics] = field(default_factory=dict)
+    # Istanti interni, non esportati
+    _started_at: Optional[float] = field(default=None, repr=False)
+    _llm_started_at: Optional[float] = field(default=None, repr=False)
+
+
+@dataclass
+class RunMetrics:
+    """Metrics of one crew run."""
+    run_id: str
+    kind: str
+    started_at: float
+    wall_s: float = 0.0
+    status: str = "running"
+    tasks: List[TaskMetrics] = field(default_factory=list)
+    usage: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(task.cost_usd for task in self.tasks)
+
+    def per_agent(self) -> Dict[str, Dict[str, float]]:
+        """Totals of the task metrics grouped by agent."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for task in self.tasks:
+            agent = totals.setdefault(task.agent or "unknown", {
+                "tasks": 0, "wall_s": 0.0, "llm_calls": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "tool_calls": 0, "tool_s": 0.0, "cost_usd": 0.0})
+            agent["tasks"] += 1
+            for key in ("wall_s", "llm_calls", "prompt_tokens", "completion_tokens",
+                        "tool_calls", "tool_s", "cost_usd"):
+                agent[key] += getattr(task, key)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form of the run (without internal fields)."""
+        tasks = []
+        for task in self.tasks:
+            data = asdict(task)
+            data.pop("_started_at", None)
+            data.pop("_llm_started_at", None)
+            tasks.append(data)
+        return {
+            "run_id": self.run_id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "status": self.status,
+            "cost_usd": self.cost_usd,
+            "usage": self.usage,
+            "tasks": tasks,
+            "agents": self.per_agent(),
+        }
+
+
+class MetricsCollector:
+    """Build RunMetrics from the routed events of a crew run."""
+
+    def __init__(self, crew: Crew, kind: str):
+        self._lock = threading.Lock()
+        self.run = RunMetrics(run_id=uuid.uuid4().hex, kind=kind, started_at=time.time())
+        self._tasks: Dict[str, TaskMetrics] = {}
+        for crew_task in crew.tasks:
+            agent = crew_task.agent.role.strip() if crew_task.agent else ""
+            metrics = TaskMetrics(task_name=crew_task.name, agent=agent)
+            self._tasks[crew_task.name] = metrics
+            self.run.tasks.append(metrics)
+
+    def on_event(self, event: CrewEvent) -> None:
+        """Crew event callback."""
+        now = event.timestamp
+        with self._lock:
+            task = self._tasks.get(event.task_name)
+            if task is None:
+                return
+            if event.kind == "task_started":
+                task.status = "running"
+                task.queued_s = now - self.run.started_at
+                task._started_at = now
+            elif event.kind in ("task_completed", "task_failed"):
+                task.status = "completed" if event.kind == "task_completed" else "failed"
+                if task._started_at is not None:
+                    task.wall_s = now - task._started_at
+            elif event.kind == "llm_call_started":
+                task.llm_calls += 1
+                task.model = event.data.get("model") or task.model
+                task.prompt_tokens += estimate_tokens(event.data.get("messages"))
+                task._llm_started_at = now
+            elif event.kind in ("llm_call_completed", "llm_call_failed"):
+                if event.kind == "llm_call_completed":
+                    task.completion_tokens += estimate_tokens(event.data.get("response"))
+                else:
+                    task.llm_errors += 1
+                if task._llm_started_at is not None:
+                    task.llm_s += now - task._llm_started_at
+                    task._llm_started_at = None
+                task.cost_usd = estimate_cost(task.model, task.prompt_tokens, task.completion_tokens)
+            elif event.kind in ("tool_finished", "tool_error"):
+                tool = task.tools.setdefault(event.data.get("tool_name") or "unknown", ToolMetrics())
+                tool.calls += 1
+                task.tool_calls += 1
+                if event.kind == "tool_error":
+                    tool.errors += 1
+                else:
+                    duration = float(event.data.get("duration") or 0.0)
+                    tool.total_s += duration
+                    task.tool_s += duration
+                    if event.data.get("from_cache"):
+                        tool.cached += 1
+
+    def finish(self, crew: Crew, status: str) -> RunMetrics:
+        """Close the run, adding the crew's exact token usage if available."""
+        with self._lock:
+            self.run.wall_s = time.time() - self.run.started_at
+            self.run.status = status
+            for task in self.run.tasks:
+                # Task non eseguiti (es. serviti dalla cache delle ricerche)
+                if task.status == "pending":
+                    task.status = "skipped"
+            usage = getattr(crew, "usage_metrics", None)
+            if usage is not None:
+                self.run.usage = {
+                    "total_tokens": usage.total_tokens,
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "successful_requests": usage.successful_requests,
+                }
+        return self.run
+
+
+class JsonLinesSink:
+    """Append every run as one JSON line."""
+
+    def __init__(self, path: str = os.path.join(DEFAULT_METRICS_DIR, "runs.jsonl")):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, run: RunMetrics) -> None:
+        line = json.dumps(run.to_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+class PrometheusTextSink:
+    """Keep cumulative counters and expose them in Prometheus text format.
+
+    The file is rewritten atomically after every run, so it can be served by
+    the node exporter textfile collector.
+    """
+
+    def __init__(self, path: str = os.path.join(DEFAULT_METRICS_DIR, "interview_prep.prom")):
+        self.path = path
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _add(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def write(self, run: RunMetrics) -> None:
+        with self._lock:
+            self._add("interview_prep_runs_total", 1, kind=run.kind, status=run.status)
+            self._add("interview_prep_run_seconds_total", run.wall_s, kind=run.kind)
+            for task in run.tasks:
+                labels = {"kind": run.kind, "task": task.task_name, "agent": task.agent}
+                self._add("interview_prep_task_runs_total", 1, status=task.status, **labels)
+                self._add("interview_prep_task_seconds_total", task.wall_s, **labels)
+                self._add("interview_prep_task_queue_seconds_total", task.queued_s, **labels)
+                self._add("interview_prep_llm_calls_total", task.llm_calls, **labels)
+                self._add("interview_prep_llm_seconds_total", task.llm_s, **labels)
+                self._add("interview_prep_prompt_tokens_total", task.prompt_tokens, **labels)
+                self._add("interview_prep_completion_tokens_total", task.completion_tokens, **labels)
+                self._add("interview_prep_cost_usd_total", task.cost_usd, **labels)
+                for tool_name, tool in task.tools.items():
+                    self._add("interview_prep_tool_calls_total", tool.calls, tool=tool_name, **labels)
+                    self._add("interview_prep_tool_errors_total", tool.errors, tool=tool_name, **labels)
+                    self._add("interview_prep_tool_seconds_total", tool.total_s, tool=tool_name, **labels)
+            atomic_write_text(self.path, self.render())
+
+    def render(self) -> str:
+        """Current counters in Prometheus text exposition format."""
+        lines = []
+        for name in sorted({name for name, _ in self._counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric != name:
+                    continue
+                label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_sinks: Optional[List[Any]] = None
+_sinks_lock = threading.Lock()
+
+
+def get_metrics_sinks() -> List[Any]:
+    """Return the configured sinks (INTERVIEW_METRICS_SINKS, default "jsonl").
+
+    The variable is a comma-separated list of "jsonl" and "prometheus";
+    "none" disables metrics export.
+    """
+    global _sinks
+    if _sinks is None:
+        with _sinks_lock:
+            if _sinks is None:
+                names = os.getenv("INTERVIEW_METRICS_SINKS", "jsonl")
+                sinks = []
+                for name in (part.strip().lower() for part in names.split(",")):
+                    if name == "jsonl":
+                        sinks.append(JsonLinesSink())
+                    elif name == "prometheus":
+                        sinks.append(PrometheusTextSink())
+                    elif name and name != "none":
+                        print(f"Warning: unknown metrics sink '{name}'")
+                _sinks = sinks
+    return _sinks
+
+
+@contextmanager
+def collect_metrics(crew: Crew, kind: str,
+                    sinks: Optional[List[Any]] = None) -> Iterator[MetricsCollector]:
+    """Collect the metrics of the crew run inside the block.
+
+    The finished RunMetrics (``collector.run``) is written to ``sinks``
+    (the configured ones by default), even if the run fails.
+    """
+    collector = MetricsCollector(crew, kind)
+    status = "failed"
+    try:
+        with get_event_router().watch(crew, collector.on_event):
+            yield collector
+        status = "completed"
+    finally:
+        run = collector.finish(crew, status)
+        for sink in (get_metrics_sinks() if sinks is None else sinks):
+            try:
+                sink.write(run)
+            except Exception as e:
+                print(f"Warning: could not write metrics: {e}")
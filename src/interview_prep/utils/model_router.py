@@ -0,0 +1,211 @@
+import os
+import threading
+from contextlib import contextmanager
+from copy import copy
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import yaml
+from crewai import LLM, BaseLLM
+from crewai.tasks.task_output import TaskOutput
+from .question_parser import parse_questions
+from .schemas import QuestionList
+
+DEFAULT_MODELS_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "models.yaml")
+
+# Parametri copiati dall'LLM dell'agente nei client degli altri modelli
+_INHERITED_LLM_PARAMS = ('temperature', 'timeout', 'max_tokens', 'api_key', 'base_url',
+                         'api_base', 'api_version')
+
+
+@dataclass
+class ModelRoute:
+    """Model choice and output validation of a task or agent."""
+    model: Optional[str] = None
+    escalate_to: Optional[str] = None
+    max_retries: Optional[int] = None
+    long_input: Dict[str, Any] = field(default_factory=dict)
+    validation: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ModelRoute":
+        """Build a route from its YAML value (a model name or a mapping)."""
+        if config is None or isinstance(config, str):
+            return cls(model=config)
+        return cls(model=config.get('model'), escalate_to=config.get('escalate_to'),
+                   max_retries=config.get('max_retries'),
+                   long_input=config.get('long_input') or {},
+                   validation=config.get('validation') or {})
+
+    def select(self, inputs: Dict[str, Any], escalated: bool = False) -> Optional[str]:
+        """Model for a run with ``inputs`` (``escalated`` after a failed validation)."""
+        if escalated and self.escalate_to:
+            return self.escalate_to
+        if self.long_input:
+            value = str(inputs.get(self.long_input.get('field'), "") or "")
+            if len(value) >= int(self.long_input.get('min_chars', 0)):
+                return self.long_input.get('model') or self.model
+        return self.model
+
+
+def build_guardrail(validation: Dict[str, Any]) -> Optional[Callable[[TaskOutput], Tuple[bool, Any]]]:
+    """Task guardrail for a route's ``validation`` settings (None if there are none).
+
+    Supported checks: ``min_chars`` (length of the output) and
+    ``min_questions`` (questions of a structured QuestionList output, or
+    found by the question parser in a free-text one).
+    """
+    min_chars = int(validation.get('min_chars') or 0)
+    min_questions = int(validation.get('min_questions') or 0)
+    if not min_chars and not min_questions:
+        return None
+
+    def guardrail(output: TaskOutput) -> Tuple[bool, Any]:
+        raw = (output.raw or "").strip()
+        if len(raw) < min_chars:
+            return False, f"La risposta è troppo breve ({len(raw)} caratteri, minimo {min_chars})."
+        if min_questions:
+            if isinstance(output.pydantic, QuestionList):
+                found = len(output.pydantic.questions)
+            else:
+                found = len(parse_questions(raw.splitlines()).best())
+            if found < min_questions:
+                return False, (f"Trovate solo {found} domande, ne servono almeno {min_questions} "
+                               "in un elenco numerato.")
+        # Restituire il TaskOutput evita a CrewAI di riconvertire il testo nel modello
+        return True, output
+    return guardrail
+
+
+class ModelRouter:
+    """Per-task and per-agent model selection from config/models.yaml."""
+
+    def __init__(self, config_path: str = DEFAULT_MODELS_CONFIG):
+        config: Dict[str, Any] = {}
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        self.default = ModelRoute.from_config(config.get('default'))
+        self.agents = {name: ModelRoute.from_config(value)
+                       for name, value in (config.get('agents') or {}).items()}
+        self.tasks = {name: ModelRoute.from_config(value)
+                      for name, value in (config.get('tasks') or {}).items()}
+
+    def task_route(self, task_name: Optional[str]) -> ModelRoute:
+        return self.tasks.get(task_name or "", ModelRoute())
+
+    def select(self, task_name: Optional[str], agent_name: Optional[str],
+               inputs: Optional[Dict[str, Any]] = None, escalated: bool = False) -> Optional[str]:
+        """Model for a task run: task route, then agent route, then default."""
+        inputs = inputs or {}
+        for route in (self.task_route(task_name), self.agents.get(agent_name or ""), self.default):
+            if route is not None:
+                model = route.select(inputs, escalated)
+                if model:
+                    return model
+        return None
+
+
+_local = threading.local()
+
+
+@contextmanager
+def routed_model(model: Optional[str], label: str) -> Iterator[None]:
+    """Make RoutedLLM calls in this thread use ``model`` (``label`` is logged)."""
+    previous = getattr(_local, 'route', None)
+    _local.route = (model, label) if model else None
+    try:
+        yield
+    finally:
+        _local.route = previous
+
+
+class RoutedLLM(BaseLLM):
+    """LLM sending each call to the model routed for the current task.
+
+    The route is set per thread by the running task (see ``routed_model``);
+    without one, calls go to the agent's own LLM. The clients of the other
+    models inherit the agent LLM's parameters.
+    """
+
+    def __init__(self, llm: LLM, agent_name: str = ""):
+        self.llm = llm
+        self.agent_name = agent_name
+        self._clients: Dict[str, LLM] = {}
+        self._clients_lock = threading.Lock()
+        # INTERVIEW_MODEL_ROUTING_DEBUG=1 stampa il modello scelto per ogni chiamata
+        self.debug = os.getenv("INTERVIEW_MODEL_ROUTING_DEBUG", "").lower() in ("1", "true", "yes")
+        stop = llm.stop
+        super().__init__(model=llm.model, temperature=llm.temperature)
+        self.llm.stop = stop
+
+    @property
+    def model(self) -> str:
+        route = getattr(_local, 'route', None)
+        return route[0] if route else self.llm.model
+
+    @model.setter
+    def model(self, value: str) -> None:
+        pass  # il modello è quello dell'LLM avvolto o della rotta corrente
+
+    @property
+    def stop(self):
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value) -> None:
+        self.llm.stop = value
+
+    @property
+    def stream(self) -> bool:
+        return self.llm.stream
+
+    @stream.setter
+    def stream(self, value: bool) -> None:
+        self.llm.stream = value
+
+    def __copy__(self) -> "RoutedLLM":
+        return RoutedLLM(copy(self.llm), self.agent_name)
+
+    def _client(self, model: str) -> LLM:
+        if model == self.llm.model:
+            return self.llm
+        with self._clients_lock:
+            client = self._clients.get(model)
+            if client is None:
+                params = {name: getattr(self.llm, name) for name in _INHERITED_LLM_PARAMS
+                          if getattr(self.llm, name, None) is not None}
+                client = self._clients[model] = LLM(model=model, **params)
+        client.stop = self.llm.stop
+        client.stream = self.llm.stream
+        return client
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        route = getattr(_local, 'route', None)
+        model, label = route if route else (self.llm.model, self.agent_name)
+        if self.debug:
+            print(f"Model routing: {label} -> {model}")
+        return self._client(model).call(messages, tools=tools, callbacks=callbacks,
+                                        available_functions=available_functions)
+
+    def supports_function_calling(self) -> bool:
+        return self._client(self.model).supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self._client(self.model).get_context_window_size()
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the router for INTERVIEW_MODELS_CONFIG (default config/models.yaml)."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(os.getenv("INTERVIEW_MODELS_CONFIG", DEFAULT_MODELS_CONFIG))
+    return _router
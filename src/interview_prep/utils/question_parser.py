@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+# Pattern applicati riga per riga, in un solo passaggio sul file
+NUMBERED_PATTERN = re.compile(r'^\d+\.\s+(.+)$')
+BULLET_PATTERN = re.compile(r'^[-*]\s+(.+)$')
+QUOTED_PATTERN = re.compile(r'"([^"]+)"')
+HEADER_PATTERN = re.compile(r'^#{1,6}\s+(.+?)\s*#*$')
+# Righe interamente in grassetto, usate spesso dall'LLM come titoli di sezione
+BOLD_HEADER_PATTERN = re.compile(r'^\*\*(.+?)\*\*:?$')
+
+# Numero di file analizzati tenuti in cache
+MAX_CACHED_FILES = 64
+
+
+@dataclass(frozen=True)
+class ParsedQuestion:
+    """A question extracted from markdown, with its section header."""
+    text: str
+    category: str = ""
+
+
+@dataclass(frozen=True)
+class ParsedQuestions:
+    """Questions found by each list style in a markdown document."""
+    numbered: Tuple[ParsedQuestion, ...]
+    bullet: Tuple[ParsedQuestion, ...]
+    quoted: Tuple[ParsedQuestion, ...]
+
+    def best(self) -> Tuple[ParsedQuestion, ...]:
+        """Return the style that found the most questions (numbered first)."""
+        if len(self.numbered) >= max(len(self.bullet), len(self.quoted)):
+            return self.numbered
+        if len(self.bullet) >= len(self.quoted):
+            return self.bullet
+        return self.quoted
+
+
+def _clean_header(text: str) -> str:
+    return text.strip().strip('*').strip().rstrip(':').strip()
+
+
+def parse_questions(lines: Iterable[str]) -> ParsedQuestions:
+    """Extract numbered, bullet and quoted questions in a single pass.
+
+    Markdown headers (and lines that are entirely bold) open a new section;
+    every question records the title of the section it appears in.
+    """
+    numbered: List[ParsedQuestion] = []
+    bullet: List[ParsedQuestion] = []
+    quoted: List[ParsedQuestion] = []
+    category = ""
+
+    for raw_line in lines:
+        line = raw_line.rstrip('\r\n')
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        header = HEADER_PATTERN.match(line) or BOLD_HEADER_PATTERN.match(stripped)
+        if header:
+            category = _clean_header(header.group(1))
+            continue
+
+        match = NUMBERED_PATTERN.match(line)
+        if match and match.group(1).strip():
+            numbered.append(ParsedQuestion(match.group(1).strip(), category))
+        else:
+            match = BULLET_PATTERN.match(line)
+            if match and match.group(1).strip():
+                bullet.append(ParsedQuestion(match.group(1).strip(), category))
+
+        if '"' in line:
+            for text in QUOTED_PATTERN.findall(line):
+                if text.strip():
+                    quoted.append(ParsedQuestion(text.strip(), category))
+
+    return ParsedQuestions(tuple(numbered), tuple(bullet), tuple(quoted))
+
+
+_cache: "OrderedDict[str, Tuple[Tuple[int, int], ParsedQuestions]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_questions_file(file_path: str) -> ParsedQuestions:
+    """Parse a questions file, reusing the result while the file is unchanged.
+
+    The cache key is the absolute path; an entry is valid as long as the
+    file's mtime and size match, so repeated loads don't touch the content.
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            _cache.move_to_end(path)
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        parsed = parse_questions(f)
+
+    with _cache_lock:
+        _cache[path] = (signature, parsed)
+        _cache.move_to_end(path)
+        while len(_cache) > MAX_CACHED_FILES:
+            _cache.popitem(last=False)
+
+    return parsed
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# Le ricerche su azienda e intervistatore cambiano lentamente: un giorno di
+# validità evita di ripetere le stesse chiamate LLM/Serper tra candidati diversi
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 200
+
+
+class ResearchCache:
+    """Persistent, size-bounded LRU cache for research task outputs.
+
+    Each entry is a JSON file named after the hash of its normalized key.
+    The file mtime is refreshed on every hit, so eviction simply drops the
+    least recently used files once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join("output", ".cache", "research"),
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize(value: Optional[str]) -> str:
+        """Normalize a key component (case, surrounding and repeated spaces)."""
+        return " ".join(str(value or "").split()).casefold()
+
+    def make_key(self, kind: str, parts: Iterable[Optional[str]]) -> str:
+        """Build a content-addressed key from a kind and its components."""
+        normalized = [kind] + [self.normalize(part) for part in parts]
+        return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+    def company_key(self, company: str, country: str, industry: str) -> str:
+        """Key for a company research report."""
+        return self.make_key("company", [company, country, industry])
+
+    def person_key(self, interviewer: str, company: str) -> str:
+        """Key for an interviewer research report."""
+        return self.make_key("person", [interviewer, company])
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for ``key``, even if expired.
+
+        Expired entries are still useful to revalidate a cached HTTP
+        response (ETag/Last-Modified) instead of downloading it again.
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """True if ``entry`` is younger than the cache TTL."""
+        return time.time() - entry.get("created_at", 0) <= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached content for ``key`` if present and not expired."""
+        path = self._path(key)
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+
+        if not self.is_fresh(entry):
+            self.invalidate(key)
+            return None
+
+        # Aggiorna l'mtime: è il timestamp usato per l'eviction LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("content")
+
+    def set(self, key: str, content: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        """Store ``content`` under ``key`` and evict old entries if needed."""
+        entry = {
+            "created_at": time.time(),
+            "metadata": metadata or {},
+            "content": content,
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry (no-op if missing)."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries beyond ``max_entries``."""
+        with self._lock:
+            entries = []
+            for file in os.listdir(self.cache_dir):
+                if not file.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, file)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+
+            overflow = len(entries) - self.max_entries
+            if overflow <= 0:
+                return
+
+            entries.sort()
+            for _, path in entries[:overflow]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
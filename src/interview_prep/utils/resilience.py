@@ -0,0 +1,319 @@
+import os
+import time
+import random
+import threading
+from copy import copy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import requests
+from crewai import BaseLLM, Crew
+from crewai.crews.crew_output import CrewOutput
+from litellm import exceptions as litellm_exceptions
+
+# Tempo massimo di una singola chiamata LLM (secondi), se l'LLM non ne ha uno
+DEFAULT_CALL_TIMEOUT = 120.0
+DEFAULT_CALL_ATTEMPTS = 4
+DEFAULT_TASK_ATTEMPTS = 2
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 30.0
+# Fallimenti consecutivi che aprono il circuito, e per quanto resta aperto
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 60.0
+
+TRANSIENT_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504, 529})
+
+_TRANSIENT_ERRORS = (
+    litellm_exceptions.RateLimitError,
+    litellm_exceptions.Timeout,
+    litellm_exceptions.APIConnectionError,
+    litellm_exceptions.ServiceUnavailableError,
+    litellm_exceptions.InternalServerError,
+    requests.ConnectionError,
+    requests.Timeout,
+    ConnectionError,
+)
+
+
+class CircuitOpenError(TimeoutError):
+    """Raised without calling the provider while its circuit is open.
+
+    It derives from TimeoutError because CrewAI agents propagate that error
+    without retrying the task.
+    """
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open: provider unavailable, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether ``error`` is a rate limit or a temporary provider/network failure."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS_CODES
+    return isinstance(error, _TRANSIENT_ERRORS)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by the provider's Retry-After header, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Timeouts and retry limits of LLM calls and crew runs."""
+    call_timeout: float = DEFAULT_CALL_TIMEOUT
+    call_attempts: int = DEFAULT_CALL_ATTEMPTS
+    task_attempts: int = DEFAULT_TASK_ATTEMPTS
+    base_delay: float = BASE_DELAY_SECONDS
+    max_delay: float = MAX_DELAY_SECONDS
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Wait before retry number ``attempt`` (1-based): exponential, full jitter.
+
+        A Retry-After sent with the error is honoured, up to ``max_delay``.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        requested = _retry_after(error) if error is not None else None
+        if requested is not None:
+            delay = max(delay, min(self.max_delay, requested))
+        return delay
+
+
+class CircuitBreaker:
+    """Fail fast while a provider keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and calls raise CircuitOpenError for ``reset_seconds``; then a
+    single probe call is let through (half open) and its outcome closes or
+    reopens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_seconds: float = DEFAULT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go to the provider."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_seconds or self._probing:
+                raise CircuitOpenError(self.name, max(0.0, self.reset_seconds - elapsed))
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"Circuit for {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed transiently.
+
+        The breaker state is left as it is; a half-open circuit lets the
+        next call probe the provider again.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if not self._probing:
+                    print(f"Circuit for {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker of a provider/model.
+
+    Configured by INTERVIEW_CIRCUIT_FAILURES and INTERVIEW_CIRCUIT_RESET_SECONDS.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("INTERVIEW_CIRCUIT_FAILURES", DEFAULT_FAILURE_THRESHOLD)),
+                reset_seconds=float(os.getenv("INTERVIEW_CIRCUIT_RESET_SECONDS", DEFAULT_RESET_SECONDS)))
+        return breaker
+
+
+_policy: Optional[RetryPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide retry policy.
+
+    Configured by INTERVIEW_LLM_TIMEOUT (seconds per LLM call),
+    INTERVIEW_LLM_ATTEMPTS (attempts per LLM call) and
+    INTERVIEW_TASK_ATTEMPTS (runs of the unfinished tasks of a crew).
+    """
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = RetryPolicy(
+                    call_timeout=float(os.getenv("INTERVIEW_LLM_TIMEOUT", DEFAULT_CALL_TIMEOUT)),
+                    call_attempts=max(1, int(os.getenv("INTERVIEW_LLM_ATTEMPTS", DEFAULT_CALL_ATTEMPTS))),
+                    task_attempts=max(1, int(os.getenv("INTERVIEW_TASK_ATTEMPTS", DEFAULT_TASK_ATTEMPTS))))
+    return _policy
+
+
+class ResilientLLM(BaseLLM):
+    """LLM wrapper retrying transient failures behind a per-model circuit breaker.
+
+    Rate limits and temporary provider or network errors are retried with
+    jittered exponential backoff; other errors are raised at once. The
+    breaker is shared by every wrapper calling the same model.
+    """
+
+    def __init__(self, llm: Any, policy: Optional[RetryPolicy] = None):
+        self.llm = llm
+        self.policy = policy or get_retry_policy()
+        stop = llm.stop
+        super().__init__(model=llm.model, temperature=getattr(llm, 'temperature', None))
+        # BaseLLM azzera stop, che qui è quello dell'LLM avvolto
+        self.llm.stop = stop
+
+    @property
+    def model(self) -> str:
+        # L'LLM avvolto può cambiare modello a ogni chiamata (vedi RoutedLLM)
+        return self.llm.model
+
+    @model.setter
+    def model(self, value: str) -> None:
+        pass
+
+    @property
+    def stop(self) -> List[str]:
+        return self.llm.stop
+
+    @stop.setter
+    def stop(self, value: List[str]) -> None:
+        self.llm.stop = value
+
+    @property
+    def stream(self) -> bool:
+        return getattr(self.llm, 'stream', False)
+
+    @stream.setter
+    def stream(self, value: bool) -> None:
+        if hasattr(self.llm, 'stream'):
+            self.llm.stream = value
+
+    def __copy__(self) -> "ResilientLLM":
+        return ResilientLLM(copy(self.llm), self.policy)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        model = self.llm.model
+        breaker = get_circuit_breaker(model)
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                response = self.llm.call(messages, tools=tools, callbacks=callbacks,
+                                         available_functions=available_functions)
+            except Exception as e:
+                if not is_transient(e):
+                    # Errore di autenticazione o richiesta non valida: non dice nulla sulla
+                    # disponibilità del provider, lo stato del circuito non cambia
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.policy.call_attempts:
+                    raise
+                delay = self.policy.delay(attempt, e)
+                print(f"LLM call to {model} failed ({type(e).__name__}), "
+                      f"retry {attempt}/{self.policy.call_attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return response
+
+    def supports_function_calling(self) -> bool:
+        return self.llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.llm.get_context_window_size()
+
+
+def kickoff_with_retry(crew: Crew, inputs: Dict[str, Any],
+                       policy: Optional[RetryPolicy] = None) -> CrewOutput:
+    """Run a crew, re-running only its unfinished tasks after a transient failure.
+
+    Tasks that completed keep their output, which stays available as
+    context for the tasks run again. The result covers all the crew's tasks.
+    """
+    policy = policy or get_retry_policy()
+    tasks = list(crew.tasks)
+    token_usage = None
+    attempt = 0
+    try:
+        while crew.tasks:
+            attempt += 1
+            try:
+                token_usage = crew.kickoff(inputs=inputs).token_usage
+                break
+            except Exception as e:
+                if not is_transient(e) or attempt >= policy.task_attempts:
+                    raise
+                # I task asincroni ancora in corso potrebbero completare ora
+                for crew_task in crew.tasks:
+                    wait_idle = getattr(crew_task, 'wait_idle', None)
+                    if wait_idle is not None:
+                        wait_idle()
+                pending = [crew_task for crew_task in crew.tasks if crew_task.output is None]
+                delay = policy.delay(attempt, e)
+                print(f"Crew run failed ({type(e).__name__}: {e}); "
+                      f"{len(crew.tasks) - len(pending)} task(s) kept, "
+                      f"retrying {len(pending)} in {delay:.1f}s")
+                crew.tasks = pending
+                if pending:
+                    time.sleep(delay)
+    finally:
+        crew.tasks = tasks
+
+    # Come in CrewAI, il risultato della crew è l'output dell'ultimo task
+    final = tasks[-1].output
+    return CrewOutput(raw=final.raw, pydantic=final.pydantic, json_dict=final.json_dict,
+                      tasks_output=[crew_task.output for crew_task in tasks],
+                      token_usage=token_usage)
@@ -0,0 +1,102 @@
+from typing import List, Literal, Optional, Type, TypeVar, Union
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator, model_validator
+
+Difficulty = Literal["facile", "media", "difficile"]
+
+# Sinonimi accettati per la difficoltà (l'LLM a volte risponde in inglese)
+_DIFFICULTY_ALIASES = {
+    "easy": "facile", "bassa": "facile",
+    "medium": "media", "intermedia": "media", "medio": "media",
+    "hard": "difficile", "alta": "difficile",
+}
+
+# Sezioni del feedback: campo del modello e titolo nel markdown
+FEEDBACK_SECTIONS = [
+    ("strengths", "Punti di forza"),
+    ("improvements", "Aree di miglioramento"),
+    ("suggestions", "Suggerimenti specifici"),
+    ("alternatives", "Approcci alternativi"),
+]
+
+M = TypeVar('M', bound=BaseModel)
+
+
+class InterviewQuestion(BaseModel):
+    """A question the interviewer could ask, with its category and difficulty."""
+    text: str = Field(..., description="Testo della domanda, in italiano")
+    category: str = Field("", description="Categoria della domanda (es. Cultura e adattamento al Team)")
+    difficulty: Difficulty = Field("media", description="Difficoltà: facile, media o difficile")
+
+    @field_validator('difficulty', mode='before')
+    @classmethod
+    def _normalize_difficulty(cls, value):
+        value = str(value or "media").strip().lower()
+        return _DIFFICULTY_ALIASES.get(value, value)
+
+
+class QuestionList(BaseModel):
+    """Structured output of define_questions_task."""
+    questions: List[InterviewQuestion] = Field(..., description="Domande del colloquio, raggruppate per categoria")
+
+    def to_markdown(self) -> str:
+        """Questions report grouped by category, numbered across categories."""
+        lines = ["# Domande per il colloquio"]
+        category = None
+        for number, question in enumerate(self.questions, start=1):
+            if question.category != category:
+                category = question.category
+                lines += ["", f"## {category}" if category else "## Altre domande", ""]
+            lines.append(f"{number}. {question.text}")
+            lines.append(f"   *Difficoltà: {question.difficulty}*")
+        return "\n".join(lines) + "\n"
+
+
+class Feedback(BaseModel):
+    """Structured output of feedback_task.
+
+    Unknown keys and an all-empty feedback are rejected, so that other JSON
+    objects (e.g. an error payload) are not taken for an empty feedback.
+    """
+    model_config = ConfigDict(extra='forbid')
+
+    strengths: List[str] = Field(default_factory=list, description="Cosa è stato buono nella risposta")
+    improvements: List[str] = Field(default_factory=list, description="Cosa potrebbe essere migliorato")
+    suggestions: List[str] = Field(default_factory=list, description="Suggerimenti specifici per migliorare la risposta")
+    alternatives: List[str] = Field(default_factory=list, description="Modi alternativi per affrontare la domanda")
+
+    @model_validator(mode='after')
+    def _require_content(self) -> "Feedback":
+        if not any(getattr(self, name) for name, _ in FEEDBACK_SECTIONS):
+            raise ValueError("Il feedback non contiene nessuna sezione")
+        return self
+
+    def to_markdown(self) -> str:
+        """One ``###`` section per non-empty field, as bullet lists."""
+        sections = []
+        for name, title in FEEDBACK_SECTIONS:
+            items = getattr(self, name)
+            if items:
+                sections.append(f"### {title}\n" + "\n".join(f"- {item}" for item in items))
+        return "\n\n".join(sections) + "\n"
+
+
+def parse_output(model: Type[M], raw: Union[str, M, None]) -> Optional[M]:
+    """Structured output serialized in ``raw``, None for free-text outputs.
+
+    Outputs saved before the structured format (or not converted by the
+    LLM) are markdown, and callers fall back to using them as text.
+    """
+    if isinstance(raw, model):
+        return raw
+    if not raw or not str(raw).lstrip().startswith('{'):
+        return None
+    try:
+        return model.model_validate_json(raw)
+    except ValidationError:
+        return None
+
+
+def feedback_markdown(feedback: str) -> str:
+    """Markdown to show for a feedback output (structured or free text)."""
+    structured = parse_output(Feedback, feedback)
+    return structured.to_markdown() if structured is not None else feedback
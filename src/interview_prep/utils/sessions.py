@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from typing import Dict, List, Optional
+from .fileio import atomic_write_text
+from .storage import SQLiteStore
+
+SESSIONS_DIR = os.path.join("output", "sessions")
+SESSION_META_FILE = os.path.join(".session", "meta.json")
+
+# I dati di una sessione scadono un giorno dopo il suo inizio...
+DEFAULT_SESSION_TTL_SECONDS = 24 * 60 * 60
+# ...ma non finché è stata usata nell'ultima ora
+SESSION_IDLE_GRACE_SECONDS = 60 * 60
+GC_INTERVAL_SECONDS = 15 * 60
+
+_SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+
+def session_lock(path: str) -> threading.RLock:
+    """Return the lock that serializes writes to an output directory."""
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.RLock()
+        return lock
+
+
+def get_session_dir(session_id: str, start_time: Optional[float] = None,
+                    base_dir: str = SESSIONS_DIR) -> str:
+    """Return (and create) the private output directory of a session.
+
+    The first call records ``start_time`` in the session metadata; every
+    call marks the session as recently used.
+    """
+    if not _SESSION_ID_PATTERN.match(session_id or ""):
+        raise ValueError(f"Invalid session id: {session_id!r}")
+
+    session_dir = os.path.join(base_dir, session_id)
+    os.makedirs(os.path.join(session_dir, "feedback"), exist_ok=True)
+    os.makedirs(os.path.join(session_dir, ".session"), exist_ok=True)
+
+    meta_path = os.path.join(session_dir, SESSION_META_FILE)
+    if os.path.exists(meta_path):
+        os.utime(meta_path)
+    else:
+        with session_lock(session_dir):
+            if not os.path.exists(meta_path):
+                atomic_write_text(meta_path, json.dumps({
+                    "session_id": session_id,
+                    "start_time": start_time or time.time(),
+                }))
+    return session_dir
+
+
+def clear_session_dir(session_dir: str) -> None:
+    """Delete everything a session has written, keeping its metadata."""
+    with session_lock(session_dir):
+        for filename in os.listdir(session_dir):
+            path = os.path.join(session_dir, filename)
+            if filename == ".session":
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        os.makedirs(os.path.join(session_dir, "feedback"), exist_ok=True)
+
+
+def _session_times(session_dir: str) -> Optional[tuple]:
+    """Return (start_time, last_seen) of a session directory."""
+    meta_path = os.path.join(session_dir, SESSION_META_FILE)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            start_time = float(json.load(f)["start_time"])
+        return start_time, os.path.getmtime(meta_path)
+    except (OSError, ValueError, KeyError, TypeError):
+        # Directory senza metadati validi: si usa la data di modifica
+        try:
+            mtime = os.path.getmtime(session_dir)
+        except OSError:
+            return None
+        return mtime, mtime
+
+
+def expire_sessions(ttl_seconds: int = DEFAULT_SESSION_TTL_SECONDS,
+                    base_dir: str = SESSIONS_DIR,
+                    store: Optional[SQLiteStore] = None,
+                    now: Optional[float] = None) -> List[str]:
+    """Delete the data of expired sessions and return their ids.
+
+    A session expires ``ttl_seconds`` after its start time, unless it was
+    used recently or is writing right now (its lock is held).
+    """
+    if not os.path.isdir(base_dir):
+        return []
+
+    now = now or time.time()
+    expired = []
+    for session_id in os.listdir(base_dir):
+        session_dir = os.path.join(base_dir, session_id)
+        if not os.path.isdir(session_dir):
+            continue
+        times = _session_times(session_dir)
+        if times is None:
+            continue
+        start_time, last_seen = times
+        if start_time + ttl_seconds > now or last_seen + SESSION_IDLE_GRACE_SECONDS > now:
+            continue
+
+        lock = session_lock(session_dir)
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(session_dir, ignore_errors=True)
+            if store is not None:
+                store.delete_session(session_id)
+            expired.append(session_id)
+        except Exception as e:
+            print(f"Warning: Could not expire session {session_id}: {e}")
+        finally:
+            lock.release()
+        with _locks_guard:
+            _locks.pop(os.path.abspath(session_dir), None)
+
+    if expired:
+        print(f"Expired {len(expired)} sessions")
+    return expired
+
+
+_gc_thread: Optional[threading.Thread] = None
+_gc_lock = threading.Lock()
+
+
+def start_session_gc(ttl_seconds: int = DEFAULT_SESSION_TTL_SECONDS,
+                     interval_seconds: int = GC_INTERVAL_SECONDS,
+                     base_dir: str = SESSIONS_DIR,
+                     store: Optional[SQLiteStore] = None) -> None:
+    """Start the background thread that expires old sessions (once per process)."""
+    global _gc_thread
+
+    def loop():
+        while True:
+            try:
+                expire_sessions(ttl_seconds, base_dir, store)
+            except Exception as e:
+                print(f"Warning: session cleanup failed: {e}")
+            time.sleep(interval_seconds)
+
+    with _gc_lock:
+        if _gc_thread is None:
+            _gc_thread = threading.Thread(target=loop, name="session-gc", daemon=True)
+            _gc_thread.start()
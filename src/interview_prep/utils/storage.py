@@ -0,0 +1,306 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_PATH = os.path.join("output", ".store", "interview_prep.db")
+
+REPORT_COMPANY = "company"
+REPORT_INTERVIEWER = "interviewer"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    company TEXT,
+    interviewer TEXT,
+    job_position TEXT,
+    industry TEXT,
+    country TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    subject_key TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (session_id, kind, subject_key)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_lookup ON reports(kind, subject_key, created_at);
+
+CREATE TABLE IF NOT EXISTS question_banks (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL DEFAULT '',
+    job_position TEXT NOT NULL,
+    position_key TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (session_id, position_key)
+);
+CREATE INDEX IF NOT EXISTS idx_banks_lookup ON question_banks(position_key, created_at);
+
+CREATE TABLE IF NOT EXISTS questions (
+    bank_id INTEGER NOT NULL REFERENCES question_banks(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (bank_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL DEFAULT '',
+    question_num INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (session_id, question_num)
+);
+"""
+
+SESSION_FIELDS = ("company", "interviewer", "job_position", "industry", "country")
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Normalize a lookup key (case, surrounding and repeated spaces)."""
+    return " ".join(str(value or "").split()).casefold()
+
+
+class SQLiteStore:
+    """SQLite storage for sessions, reports, question banks and feedback.
+
+    The database runs in WAL mode, so the Streamlit sessions, the research
+    jobs and the CLI can read while another thread writes. Each thread gets
+    its own connection. Lookups go through indexed keys (normalized company,
+    interviewer and job position) instead of guessing file names.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self.transaction() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a transaction on this thread's connection."""
+        conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    # Sessions
+
+    def save_session(self, session_id: str, info: Dict[str, str]) -> None:
+        """Create or update the details of a session."""
+        now = time.time()
+        values = [info.get(field) for field in SESSION_FIELDS]
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO sessions (id, {', '.join(SESSION_FIELDS)}, created_at, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in SESSION_FIELDS)}, ?, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET "
+                f"{', '.join(f'{field} = excluded.{field}' for field in SESSION_FIELDS)}, "
+                f"updated_at = excluded.updated_at",
+                [session_id, *values, now, now])
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a session's details, or None."""
+        row = self._connect().execute(
+            "SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_session(self) -> Optional[Dict[str, Any]]:
+        """Return the most recently updated session, or None."""
+        row = self._connect().execute(
+            "SELECT * FROM sessions ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return dict(row) if row else None
+
+    def delete_session(self, session_id: str) -> None:
+        """Delete a session and everything saved under it."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM feedback WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM question_banks WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM reports WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # Reports
+
+    def save_report(self, kind: str, subject: str, content: str,
+                    session_id: str = "") -> None:
+        """Save a research report (``kind`` is "company" or "interviewer")."""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO reports (session_id, kind, subject, subject_key, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id, kind, subject_key) DO UPDATE SET "
+                "subject = excluded.subject, content = excluded.content, "
+                "created_at = excluded.created_at",
+                (session_id or "", kind, subject, normalize_key(subject), content, time.time()))
+
+    def get_report(self, kind: str, subject: str,
+                   session_id: Optional[str] = None) -> Optional[str]:
+        """Return the latest report for ``subject`` (within a session if given)."""
+        query = "SELECT content FROM reports WHERE kind = ? AND subject_key = ?"
+        params: List[Any] = [kind, normalize_key(subject)]
+        if session_id is not None:
+            query += " AND session_id = ?"
+            params.append(session_id)
+        row = self._connect().execute(
+            query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return row["content"] if row else None
+
+    # Question banks
+
+    def save_question_bank(self, job_position: str, content: str,
+                           questions: Iterable[Tuple[str, str]],
+                           session_id: str = "") -> int:
+        """Save a questions report and its parsed (text, category) rows."""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO question_banks (session_id, job_position, position_key, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id, position_key) DO UPDATE SET "
+                "job_position = excluded.job_position, content = excluded.content, "
+                "created_at = excluded.created_at",
+                (session_id or "", job_position, normalize_key(job_position), content, time.time()))
+            bank_id = conn.execute(
+                "SELECT id FROM question_banks WHERE session_id = ? AND position_key = ?",
+                (session_id or "", normalize_key(job_position))).fetchone()["id"]
+            conn.execute("DELETE FROM questions WHERE bank_id = ?", (bank_id,))
+            conn.executemany(
+                "INSERT INTO questions (bank_id, position, text, category) VALUES (?, ?, ?, ?)",
+                ((bank_id, position, text, category or "")
+                 for position, (text, category) in enumerate(questions)))
+        return bank_id
+
+    def _find_bank(self, job_position: str, session_id: Optional[str]) -> Optional[sqlite3.Row]:
+        query = "SELECT * FROM question_banks WHERE position_key = ?"
+        params: List[Any] = [normalize_key(job_position)]
+        if session_id is not None:
+            query += " AND session_id = ?"
+            params.append(session_id)
+        return self._connect().execute(
+            query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+
+    def get_question_bank(self, job_position: str,
+                          session_id: Optional[str] = None) -> Optional[str]:
+        """Return the latest questions report for a job position."""
+        row = self._find_bank(job_position, session_id)
+        return row["content"] if row else None
+
+    def get_questions(self, job_position: str,
+                      session_id: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Return the (text, category) questions of the latest bank for a position."""
+        bank = self._find_bank(job_position, session_id)
+        if bank is None:
+            return []
+        rows = self._connect().execute(
+            "SELECT text, category FROM questions WHERE bank_id = ? ORDER BY position",
+            (bank["id"],)).fetchall()
+        return [(row["text"], row["category"]) for row in rows]
+
+    # Feedback
+
+    def save_feedback_many(self, rows: Iterable[Tuple[int, str, str, str]],
+                           session_id: str = "") -> None:
+        """Save several (question_num, question, answer, feedback) rows at once."""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO feedback (session_id, question_num, question, answer, feedback, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id, question_num) DO UPDATE SET "
+                "question = excluded.question, answer = excluded.answer, "
+                "feedback = excluded.feedback, created_at = excluded.created_at",
+                ((session_id or "", num, question, answer, feedback, now)
+                 for num, question, answer, feedback in rows))
+
+    def save_feedback(self, question_num: int, question: str, answer: str,
+                      feedback: str, session_id: str = "") -> None:
+        """Save the feedback on one answer."""
+        self.save_feedback_many([(question_num, question, answer, feedback)], session_id)
+
+    def list_feedback(self, session_id: str = "") -> List[Dict[str, Any]]:
+        """Return a session's feedback, ordered by question number."""
+        rows = self._connect().execute(
+            "SELECT question_num, question, answer, feedback FROM feedback "
+            "WHERE session_id = ? ORDER BY question_num", (session_id or "",)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Export
+
+    def export_markdown(self, output_dir: str, session_id: str = "") -> List[str]:
+        """Write a session's data as the usual markdown files in ``output_dir``.
+
+        Produces the same files InterviewManager writes (reports, questions,
+        feedback and the feedback summary) and returns their paths.
+        """
+        from .interview_manager import InterviewManager
+
+        manager = InterviewManager(output_dir=output_dir)
+        conn = self._connect()
+        files = []
+
+        for row in conn.execute(
+                "SELECT kind, subject, content FROM reports WHERE session_id = ? ORDER BY created_at",
+                (session_id or "",)):
+            if row["kind"] == REPORT_COMPANY:
+                files.append(manager.save_company_report(row["content"], row["subject"]))
+            elif row["kind"] == REPORT_INTERVIEWER:
+                files.append(manager.save_interviewer_report(row["content"], row["subject"]))
+
+        for row in conn.execute(
+                "SELECT job_position, content FROM question_banks WHERE session_id = ? ORDER BY created_at",
+                (session_id or "",)):
+            files.append(manager.save_questions(row["content"], row["job_position"]))
+
+        feedback = self.list_feedback(session_id)
+        for item in feedback:
+            files.append(manager.save_feedback(
+                item["question_num"], item["question"], item["answer"], item["feedback"]))
+        if feedback:
+            summary = manager.generate_feedback_summary()
+            if summary:
+                files.append(summary)
+
+        return files
+
+
+_store: Optional[SQLiteStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SQLiteStore:
+    """Return the process-wide SQLiteStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteStore()
+    return _store
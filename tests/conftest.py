@@ -0,0 +1,10 @@
+import os
+import sys
+
+# I test girano offline: niente telemetria, chiave finta e nessuna cache delle risposte
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-tests")
+os.environ.setdefault("INTERVIEW_LLM_CACHE", "off")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
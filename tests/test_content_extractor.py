@@ -0,0 +1,29 @@
+from interview_prep.utils.content_extractor import extract_content
+
+ARTICLE = ("Acme Srl ha chiuso il 2024 con ricavi in crescita del venti per cento "
+           "grazie ai nuovi contratti nel settore energetico.")
+
+
+def test_wrapper_classes_do_not_remove_the_page():
+    html = f"""<html><body class="home enable-search-modal footer-top-visible has-sidebar">
+    <div id="page" class="site has-sidebar">
+      <div class="menu-primary"><a href="/">Home</a> <a href="/chi-siamo">Chi siamo</a></div>
+      <div class="entry-content"><h2>Risultati</h2><p>{ARTICLE}</p></div>
+      <div class="cookie-banner"><p>Questo sito usa cookie tecnici e di profilazione per offrirti servizi.</p></div>
+    </div></body></html>"""
+    text = extract_content(html, ["Acme"])
+    assert ARTICLE in text
+    assert "cookie" not in text
+    assert "Chi siamo" not in text
+
+
+def test_container_holding_most_of_the_page_is_kept():
+    html = f'<html><body><div class="modal-wrapper"><p>{ARTICLE}</p></div></body></html>'
+    assert ARTICLE in extract_content(html)
+
+
+def test_plain_page_text_when_nothing_survives():
+    html = f'<html><body><footer>{ARTICLE}</footer><script>var x = 1;</script></body></html>'
+    text = extract_content(html)
+    assert ARTICLE in text
+    assert "var x" not in text
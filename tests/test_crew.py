@@ -0,0 +1,75 @@
+import threading
+from crewai import BaseLLM
+from interview_prep.crew import InterviewPrepCrew, _bind_force_refresh
+from interview_prep.crew_factory import CrewFactory
+from interview_prep.tools.web_tools import CachedScrapeWebsiteTool, CachedSerperDevTool
+
+INPUTS = {
+    'company': "Acme Srl",
+    'interviewer': "Mario Rossi",
+    'job_position': "Backend Engineer",
+    'industry': "Software",
+    'country': "Italy",
+    'job_description': "Sviluppo di servizi in Python.",
+}
+
+
+class FailingCompanyLLM(BaseLLM):
+    """Offline LLM that answers at once but fails the company research."""
+
+    def __init__(self):
+        super().__init__(model="fake-llm")
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        if not isinstance(messages, str):
+            messages = "\n".join(str(message.get("content", "")) for message in messages)
+        if "Conduci una ricerca approfondita" in messages:
+            raise RuntimeError("company search failed")
+        return "Thought: I now know the final answer\nFinal Answer: Report di prova."
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 8192
+
+
+def test_failed_async_research_task_does_not_hang_the_crew(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    crew = InterviewPrepCrew().research_crew(parallel=True)
+    assert crew.tasks[0].async_execution
+    llm = FailingCompanyLLM()
+    for crew_agent in list(crew.agents) + [crew_task.agent for crew_task in crew.tasks]:
+        crew_agent.llm = llm
+
+    outcome = {}
+
+    def run():
+        try:
+            crew.kickoff(inputs=INPUTS)
+        except Exception as e:
+            outcome['error'] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=60)
+
+    assert not worker.is_alive(), "the crew kept waiting for the failed async task"
+    assert isinstance(outcome.get('error'), RuntimeError)
+
+
+def test_force_refresh_binds_refreshing_web_tools_to_the_crew_copy():
+    factory = CrewFactory()
+    crew = factory.research_crew()
+    _bind_force_refresh(crew)
+    other = factory.research_crew()
+
+    def web_tools(crew):
+        return [tool for crew_task in crew.tasks for tool in crew_task.tools
+                if isinstance(tool, (CachedSerperDevTool, CachedScrapeWebsiteTool))]
+
+    assert web_tools(crew) and all(tool.refresh for tool in web_tools(crew))
+    assert not any(tool.refresh for tool in web_tools(other))
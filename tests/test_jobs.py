@@ -0,0 +1,93 @@
+import os
+import time
+import threading
+from interview_prep.jobs import JOB_COMPLETED, JOB_FAILED, JobRunner, research_coalesce_key
+
+
+def _finish(runner, job_id):
+    deadline = time.time() + 10
+    while runner.get(job_id)["status"] not in (JOB_COMPLETED, JOB_FAILED):
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+
+
+def _fail(ctx):
+    raise RuntimeError("boom")
+
+
+def test_finished_jobs_beyond_the_limit_are_pruned(tmp_path):
+    runner = JobRunner(jobs_dir=str(tmp_path), max_finished=2)
+    job_ids = []
+    for work in (lambda ctx: {}, _fail, lambda ctx: {}):
+        job_ids.append(runner.submit("test", {}, work))
+        _finish(runner, job_ids[-1])
+
+    assert runner.prune() == 1
+    assert runner.get(job_ids[0]) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), f"{job_ids[0]}.json"))
+    assert runner.get(job_ids[1])["status"] == JOB_FAILED
+    assert runner.get(job_ids[2])["status"] == JOB_COMPLETED
+
+
+def test_expired_jobs_are_pruned_but_running_jobs_are_kept(tmp_path):
+    # File lasciato da un processo precedente
+    stale_path = os.path.join(str(tmp_path), "stale.json")
+    with open(stale_path, 'w', encoding='utf-8') as f:
+        f.write('{"id": "stale", "status": "completed"}')
+    old = time.time() - 3600
+    os.utime(stale_path, (old, old))
+
+    runner = JobRunner(jobs_dir=str(tmp_path), finished_ttl=60)
+    assert not os.path.exists(stale_path)
+
+    release = threading.Event()
+    running_id = runner.submit("test", {}, lambda ctx: release.wait(10) and {})
+    done_id = runner.submit("test", {}, lambda ctx: {})
+    _finish(runner, done_id)
+
+    runner.finished_ttl = 0
+    time.sleep(0.01)
+    assert runner.prune() == 1
+    assert runner.get(done_id) is None
+    assert runner.get(running_id) is not None
+
+    release.set()
+    _finish(runner, running_id)
+
+
+def test_research_requests_with_the_same_inputs_share_a_key():
+    inputs = {'company': "Acme", 'interviewer': "Mario Rossi", 'job_position': "Data Engineer",
+              'industry': "Tech", 'country': "Italy", 'job_description': "Pipeline dati"}
+    same_inputs = dict(inputs, company="  acme ", job_description="pipeline  DATI")
+    assert research_coalesce_key(inputs) == research_coalesce_key(same_inputs)
+    assert research_coalesce_key(inputs) != research_coalesce_key(dict(inputs, country="Spain"))
+    # Le domande nascono dalla job description: con un'altra servono altre domande
+    assert research_coalesce_key(inputs) != research_coalesce_key(
+        dict(inputs, job_description="Altra descrizione"))
+
+
+def test_joined_requests_reach_the_job_and_replace_starts_a_new_one(tmp_path):
+    runner = JobRunner(jobs_dir=str(tmp_path))
+    release = threading.Event()
+
+    def work(ctx):
+        release.wait(10)
+        return {"sessions": [params["session_id"] for params in ctx.close_joins()]}
+
+    first_id = runner.submit("test", {"session_id": "a"}, work, coalesce_key="k")
+    joined_id = runner.submit("test", {"session_id": "b"}, work, coalesce_key="k")
+    forced_id = runner.submit("test", {"session_id": "c"}, work, coalesce_key="k", replace=True)
+    later_id = runner.submit("test", {"session_id": "d"}, work, coalesce_key="k")
+    release.set()
+    for job_id in (first_id, forced_id):
+        _finish(runner, job_id)
+
+    assert joined_id == first_id
+    assert later_id == forced_id
+    assert runner.get(first_id)["result"] == {"sessions": ["b"]}
+    assert runner.get(forced_id)["result"] == {"sessions": ["d"]}
+
+    # Dopo la fine del job una richiesta uguale ne avvia uno nuovo
+    next_id = runner.submit("test", {"session_id": "e"}, lambda ctx: {}, coalesce_key="k")
+    assert next_id not in (first_id, forced_id)
+    _finish(runner, next_id)
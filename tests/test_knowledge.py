@@ -0,0 +1,41 @@
+import os
+from interview_prep.crew_factory import CrewFactory
+from interview_prep.tools.custom_tool import KnowledgeIndex, LocalKnowledgeTool
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_index_only_sees_the_current_session_reports(tmp_path):
+    sessions = os.path.join(str(tmp_path), "output", "sessions")
+    _write(os.path.join(sessions, "mine", "Acme_report.md"), "# Acme\n\nAcme produce razzi.")
+    _write(os.path.join(sessions, "other", "Globex_report.md"), "# Globex\n\nGlobex produce robot.")
+    _write(os.path.join(str(tmp_path), "knowledge", "notes.md"), "# Note\n\nRobot e razzi.")
+
+    index = KnowledgeIndex(knowledge_dir=os.path.join(str(tmp_path), "knowledge"),
+                           research_cache_dir=os.path.join(str(tmp_path), "output", ".cache", "research"),
+                           session_dir=os.path.join(sessions, "mine"))
+    sources = {chunk.source for _, chunk in index.search("Acme Globex robot razzi", top_k=10)}
+
+    assert os.path.join(sessions, "mine", "Acme_report.md") in sources
+    assert os.path.join(str(tmp_path), "knowledge", "notes.md") in sources
+    assert not any("Globex" in source for source in sources)
+
+
+def test_research_crew_binds_the_knowledge_tool_to_the_session(tmp_path):
+    factory = CrewFactory()
+    crew = factory.research_crew(session_dir=str(tmp_path))
+    # Le copie condividono gli strumenti del template: la sessione non deve passare alle altre
+    other = factory.research_crew()
+
+    def knowledge_tools(crew):
+        owners = list(crew.agents) + list(crew.tasks)
+        return [tool for owner in owners for tool in owner.tools or []
+                if isinstance(tool, LocalKnowledgeTool)]
+
+    assert knowledge_tools(crew)
+    assert all(tool.session_dir == str(tmp_path) for tool in knowledge_tools(crew))
+    assert all(tool.session_dir is None for tool in knowledge_tools(other))
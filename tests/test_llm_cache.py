@@ -0,0 +1,55 @@
+from interview_prep.utils.llm_cache import DEFAULT_SEMANTIC_THRESHOLD, CachedLLM, LLMResponseCache
+
+PARAMS = {"model": "gpt-4o-mini"}
+
+
+def _prompt(answer):
+    return [{"role": "user", "content": f"Domanda: Hai gestito un team?\n"
+                                        f"Risposta dell'utente: {answer}\n\nFornisci un feedback"}]
+
+
+def test_semantic_matching_is_off_by_default():
+    cache = LLMResponseCache()
+    cache.set(PARAMS, _prompt("Non lo so"), "FEEDBACK-A")
+    assert cache.get(PARAMS, _prompt("Non lo so")) == "FEEDBACK-A"
+    assert cache.get(PARAMS, _prompt("non lo so.")) is None
+
+
+def test_short_near_duplicate_answers_share_the_feedback():
+    cache = LLMResponseCache(semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD)
+    cache.set(PARAMS, _prompt("Non lo so"), "FEEDBACK-A")
+    assert cache.get(PARAMS, _prompt("non lo so.")) == "FEEDBACK-A"
+    assert cache.get(PARAMS, _prompt("Lo so")) is None
+
+
+def test_long_answer_and_its_negation_do_not_match():
+    cache = LLMResponseCache(semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD)
+    answer = ("ho gestito un team di cinque sviluppatori per due anni, organizzando sprint, "
+              "revisioni del codice e colloqui individuali con ogni persona del gruppo")
+    cache.set(PARAMS, _prompt(f"Sì, {answer}"), "FEEDBACK-A")
+    negated = f"No, {answer.replace('ho gestito', 'non ho mai gestito')}"
+    assert cache.get(PARAMS, _prompt(negated)) is None
+
+
+class _CountingLLM:
+    model = "gpt-4o-mini"
+    temperature = None
+    stop = []
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        self.calls += 1
+        return f"RISPOSTA-{self.calls}"
+
+
+def test_refresh_bypasses_and_overwrites_the_cached_response():
+    cache = LLMResponseCache()
+    llm = CachedLLM(_CountingLLM(), cache)
+    assert llm.call("Ciao") == "RISPOSTA-1"
+    assert llm.call("Ciao") == "RISPOSTA-1"
+
+    refreshing = CachedLLM(llm.llm, cache, refresh=True)
+    assert refreshing.call("Ciao") == "RISPOSTA-2"
+    assert llm.call("Ciao") == "RISPOSTA-2"
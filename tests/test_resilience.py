@@ -0,0 +1,54 @@
+import pytest
+from litellm import exceptions as litellm_exceptions
+from interview_prep.utils.resilience import CircuitBreaker, CircuitOpenError, ResilientLLM, RetryPolicy
+
+
+class _ScriptedLLM:
+    """Fake LLM raising the queued errors, then answering."""
+    temperature = None
+
+    def __init__(self, model, errors):
+        self.model = model
+        self.stop = []
+        self.errors = list(errors)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def _open_breaker(monkeypatch, name):
+    breaker = CircuitBreaker(name, failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    monkeypatch.setattr("interview_prep.utils.resilience.get_circuit_breaker", lambda model: breaker)
+    return breaker
+
+
+def test_non_transient_error_does_not_close_a_half_open_circuit(monkeypatch):
+    breaker = _open_breaker(monkeypatch, "test-model")
+    assert breaker.state == "half_open"
+    llm = ResilientLLM(_ScriptedLLM("test-model", [ValueError("invalid request")]),
+                       RetryPolicy(call_attempts=1))
+
+    with pytest.raises(ValueError):
+        llm.call("Ciao")
+    assert breaker.state == "half_open"
+
+    # Il probe successivo può ancora andare al provider
+    assert llm.call("Ciao") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_non_transient_error_keeps_the_failure_count(monkeypatch):
+    breaker = CircuitBreaker("counting-model", failure_threshold=2, reset_seconds=60)
+    monkeypatch.setattr("interview_prep.utils.resilience.get_circuit_breaker", lambda model: breaker)
+    rate_limit = litellm_exceptions.RateLimitError("slow down", llm_provider="openai", model="counting-model")
+    llm = ResilientLLM(_ScriptedLLM("counting-model", [rate_limit, ValueError("invalid request"), rate_limit]),
+                       RetryPolicy(call_attempts=1))
+
+    for _ in range(3):
+        with pytest.raises(Exception):
+            llm.call("Ciao")
+    with pytest.raises(CircuitOpenError):
+        llm.call("Ciao")
@@ -0,0 +1,21 @@
+import json
+from interview_prep.utils.schemas import Feedback, feedback_markdown, parse_output
+
+
+def test_feedback_is_rendered_as_markdown():
+    raw = Feedback(strengths=["Chiara"], suggestions=["Aggiungi un esempio"]).model_dump_json()
+    assert feedback_markdown(raw) == ("### Punti di forza\n- Chiara\n\n"
+                                      "### Suggerimenti specifici\n- Aggiungi un esempio\n")
+
+
+def test_empty_object_is_not_a_feedback():
+    assert parse_output(Feedback, "{}") is None
+    assert parse_output(Feedback, json.dumps({key: [] for key in Feedback.model_fields})) is None
+    assert feedback_markdown("{}") == "{}"
+
+
+def test_other_json_objects_are_not_a_feedback():
+    error = json.dumps({"error": "rate limit exceeded", "code": 429})
+    assert parse_output(Feedback, error) is None
+    assert feedback_markdown(error) == error
+    assert parse_output(Feedback, json.dumps({"strengths": ["Chiara"], "error": "x"})) is None